@@ -0,0 +1,16 @@
+"""
+URL configuration of the ASGI entry point (AuctionApp/asgi.py).
+
+The same routes as AuctionApp/urls.py, except that the read-heavy pages are
+served by their async views. WSGI keeps the sync ones: there every async
+view would run through async_to_sync, which only adds overhead.
+"""
+from django.contrib import admin
+from django.urls import include, path
+
+from auctions.urls import async_urlpatterns
+
+urlpatterns = [
+    path("admin/", admin.site.urls),
+    path("", include(async_urlpatterns))
+]
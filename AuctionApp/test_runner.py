@@ -0,0 +1,15 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner that enforces query budgets, so a view over its budget fails its test."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._query_budget_enforce = settings.QUERY_BUDGET_ENFORCE
+        settings.QUERY_BUDGET_ENFORCE = True
+
+    def teardown_test_environment(self, **kwargs):
+        settings.QUERY_BUDGET_ENFORCE = self._query_budget_enforce
+        super().teardown_test_environment(**kwargs)
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import User, Category, AuctionListing, Watchlist, Comment, Bid, Notification
+from .models import (User, Category, AuctionListing, Watchlist, Comment, Bid, BidArchive, Notification,
+                     OutgoingEmail, ProxyBid)
 
 # Register your models here.
 
@@ -9,4 +10,7 @@ admin.site.register(AuctionListing)
 admin.site.register(Watchlist)
 admin.site.register(Comment)
 admin.site.register(Bid)
-admin.site.register(Notification)
\ No newline at end of file
+admin.site.register(BidArchive)
+admin.site.register(ProxyBid)
+admin.site.register(Notification)
+admin.site.register(OutgoingEmail)
\ No newline at end of file
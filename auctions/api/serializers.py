@@ -0,0 +1,57 @@
+from rest_framework import serializers
+
+from ..models import AuctionListing
+
+# Columns of the values() fast paths below: list endpoints serialize plain
+# dicts straight from the database instead of building model instances.
+LISTING_VALUES = ('id', 'title', 'description', 'starting_price', 'current_price', 'bid_count',
+                  'image_url', 'ends_at', 'created', 'updated')
+LISTING_VALUE_EXPRESSIONS = {'category_name': 'category__name', 'owner_name': 'owner__username'}
+BID_VALUES = ('id', 'amount', 'created')
+BID_VALUE_EXPRESSIONS = {'bidder_name': 'bidder__username'}
+NOTIFICATION_VALUES = ('id', 'is_read', 'created', 'listing_id')
+NOTIFICATION_VALUE_EXPRESSIONS = {'listing_title': 'listing__title'}
+
+
+class ListingSerializer(serializers.Serializer):
+    """A listing card, serialized from a row of LISTING_VALUES."""
+    id = serializers.IntegerField()
+    title = serializers.CharField()
+    description = serializers.CharField(allow_null=True)
+    starting_price = serializers.DecimalField(max_digits=12, decimal_places=2)
+    current_price = serializers.DecimalField(max_digits=12, decimal_places=2)
+    bid_count = serializers.IntegerField()
+    image_url = serializers.URLField(allow_null=True)
+    category = serializers.CharField(source='category_name', allow_null=True)
+    owner = serializers.CharField(source='owner_name')
+    ends_at = serializers.DateTimeField(allow_null=True)
+    created = serializers.DateTimeField()
+    updated = serializers.DateTimeField()
+
+
+class ListingDetailSerializer(serializers.ModelSerializer):
+    """A full listing, serialized from an instance loaded with select_related."""
+    category = serializers.CharField(source='category.name', default=None)
+    owner = serializers.CharField(source='owner.username')
+    high_bidder = serializers.CharField(source='high_bidder.username', default=None)
+
+    class Meta:
+        model = AuctionListing
+        fields = ['id', 'title', 'description', 'starting_price', 'current_price', 'bid_count',
+                  'high_bidder', 'image_url', 'category', 'owner', 'is_active', 'ends_at',
+                  'created', 'updated', 'version']
+
+
+class BidSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    amount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    bidder = serializers.CharField(source='bidder_name')
+    created = serializers.DateTimeField()
+
+
+class NotificationSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    listing = serializers.IntegerField(source='listing_id')
+    listing_title = serializers.CharField()
+    is_read = serializers.BooleanField()
+    created = serializers.DateTimeField()
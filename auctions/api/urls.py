@@ -0,0 +1,14 @@
+from django.urls import path
+
+from ..utils import query_budget
+from . import views
+
+app_name = 'api_v1'
+
+urlpatterns = [
+    path('listings/', query_budget(4)(views.ListingList.as_view()), name='listing_list'),
+    path('listings/<int:listing_id>/', query_budget(3)(views.ListingDetail.as_view()), name='listing_detail'),
+    path('listings/<int:listing_id>/bids/', query_budget(4)(views.ListingBids.as_view()), name='listing_bids'),
+    path('watchlist/', query_budget(4)(views.WatchlistListings.as_view()), name='watchlist'),
+    path('notifications/', query_budget(4)(views.NotificationList.as_view()), name='notifications'),
+]
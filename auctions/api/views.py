@@ -0,0 +1,140 @@
+from abc import ABCMeta, abstractmethod
+
+from django.db.models import Count, F, Max, Q
+from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from ..models import AuctionListing, Bid, Notification, Watchlist
+from ..utils.conditional import respond_conditionally
+from .pagination import KeysetPagination
+from .serializers import (BID_VALUE_EXPRESSIONS, BID_VALUES, LISTING_VALUE_EXPRESSIONS, LISTING_VALUES,
+                          NOTIFICATION_VALUE_EXPRESSIONS, NOTIFICATION_VALUES, BidSerializer,
+                          ListingDetailSerializer, ListingSerializer, NotificationSerializer)
+
+
+def _values(queryset, fields, expressions):
+    return queryset.values(*fields, **{name: F(path) for name, path in expressions.items()})
+
+
+class ConditionalAPIView(APIView, metaclass=ABCMeta):
+    """
+    Read-only API view answering conditional GETs.
+
+    Subclasses compute cheap validators in get_validators(), at most one
+    query, and build the body in get_body(). If the client's If-None-Match
+    or If-Modified-Since still matches, the answer is 304 Not Modified
+    without running get_body() at all.
+    """
+
+    @abstractmethod
+    def get_validators(self, request, **kwargs):
+        """Return (state, last_modified): any value that changes with the data, and its datetime."""
+
+    @abstractmethod
+    def get_body(self, request, **kwargs):
+        """Return the data of a full response."""
+
+    def get(self, request, **kwargs):
+        state, last_modified = self.get_validators(request, **kwargs)
+        # the same URL serves different users different data
+        state = (request.get_full_path(), request.user.pk, state)
+        response = respond_conditionally(request, state, last_modified,
+                                         lambda: Response(self.get_body(request, **kwargs)))
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
+
+class ListingList(ConditionalAPIView):
+    """Active listings, newest first, optionally filtered with ?category=<name>."""
+    pagination_class = KeysetPagination
+
+    def get_queryset(self, request):
+        listings = AuctionListing.objects.filter(is_active=True)
+        category = request.query_params.get('category')
+        if category:
+            listings = listings.filter(category__name=category)
+        return listings
+
+    def get_validators(self, request, **kwargs):
+        # bids, edits and closes all move `updated`; Count catches deletions,
+        # and the category's own `updated` catches renames, as fragment_key() does
+        state = self.get_queryset(request).aggregate(
+            last=Max('updated'), renamed=Max('category__updated'), n=Count('id'))
+        last_modified = max(filter(None, (state['last'], state['renamed'])), default=None)
+        return (state['n'], state['last'], state['renamed']), last_modified
+
+    def get_body(self, request, **kwargs):
+        paginator = self.pagination_class()
+        rows = paginator.paginate_queryset(
+            _values(self.get_queryset(request), LISTING_VALUES, LISTING_VALUE_EXPRESSIONS), request, self)
+        return paginator.get_paginated_response(ListingSerializer(rows, many=True).data).data
+
+
+class ListingDetail(ConditionalAPIView):
+    def get_validators(self, request, listing_id, **kwargs):
+        self.listing = get_object_or_404(
+            AuctionListing.objects.select_related('category', 'owner', 'high_bidder'), pk=listing_id)
+        renamed = self.listing.category.updated if self.listing.category_id else None
+        last_modified = max(filter(None, (self.listing.updated, renamed)), default=None)
+        return (self.listing.version, self.listing.updated, renamed), last_modified
+
+    def get_body(self, request, **kwargs):
+        return ListingDetailSerializer(self.listing).data
+
+
+class ListingBids(ConditionalAPIView):
+    """Bid history of a listing, newest first."""
+    pagination_class = KeysetPagination
+
+    def get_validators(self, request, listing_id, **kwargs):
+        # every bid bumps the listing's version and `updated`, and so does
+        # closing the auction, which hides its bids until they are archived
+        listing = get_object_or_404(AuctionListing.objects.only('version', 'updated'), pk=listing_id)
+        return (listing.version,), listing.updated
+
+    def get_body(self, request, listing_id, **kwargs):
+        paginator = self.pagination_class()
+        rows = paginator.paginate_queryset(
+            _values(Bid.objects.live().filter(listing_id=listing_id), BID_VALUES, BID_VALUE_EXPRESSIONS), request, self)
+        return paginator.get_paginated_response(BidSerializer(rows, many=True).data).data
+
+
+class WatchlistListings(ConditionalAPIView):
+    """Listings on the authenticated user's watchlist."""
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_validators(self, request, **kwargs):
+        state = Watchlist.objects.filter(user=request.user).aggregate(
+            added=Max('created'), changed=Max('listing__updated'), renamed=Max('listing__category__updated'),
+            n=Count('id'))
+        last_modified = max(filter(None, (state['added'], state['changed'], state['renamed'])), default=None)
+        return (state['n'], state['added'], state['changed'], state['renamed']), last_modified
+
+    def get_body(self, request, **kwargs):
+        listings = AuctionListing.objects.filter(whatchedListings__user=request.user)
+        paginator = self.pagination_class()
+        rows = paginator.paginate_queryset(
+            _values(listings, LISTING_VALUES, LISTING_VALUE_EXPRESSIONS), request, self)
+        return paginator.get_paginated_response(ListingSerializer(rows, many=True).data).data
+
+
+class NotificationList(ConditionalAPIView):
+    """The authenticated user's notifications, newest first. Reading them here does not mark them read."""
+    permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+
+    def get_validators(self, request, **kwargs):
+        state = Notification.objects.filter(user=request.user).aggregate(
+            last=Max('created'), n=Count('id'), unread=Count('id', filter=Q(is_read=False)))
+        return (state['n'], state['unread'], state['last']), state['last']
+
+    def get_body(self, request, **kwargs):
+        notifications = Notification.objects.filter(user=request.user)
+        paginator = self.pagination_class()
+        rows = paginator.paginate_queryset(
+            _values(notifications, NOTIFICATION_VALUES, NOTIFICATION_VALUE_EXPRESSIONS), request, self)
+        return paginator.get_paginated_response(NotificationSerializer(rows, many=True).data).data
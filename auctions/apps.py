@@ -1,5 +1,16 @@
 from django.apps import AppConfig
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
 
 
 class AuctionsConfig(AppConfig):
     name = 'auctions'
+
+    def ready(self):
+        from .models import Notification, Watchlist
+        from .utils.instrumentation import install_query_recorder
+        from .utils.utils import notification_deleted, watchlist_changed
+        connection_created.connect(install_query_recorder, dispatch_uid='auctions_query_recorder')
+        post_save.connect(watchlist_changed, sender=Watchlist, dispatch_uid='auctions_watchlist_saved')
+        post_delete.connect(watchlist_changed, sender=Watchlist, dispatch_uid='auctions_watchlist_deleted')
+        post_delete.connect(notification_deleted, sender=Notification, dispatch_uid='auctions_notification_deleted')
@@ -1,5 +1,8 @@
+from decimal import Decimal
+
 from django import forms
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from .models import AuctionListing, Bid, Category
 
 
@@ -8,11 +11,18 @@ class ListingForm(forms.ModelForm):
         super().__init__(*args, **kwargs)
         self.fields['category'].empty_label = "Select a category"
         self.fields['is_active'].label = "Active List"
+        self.fields['ends_at'].label = "Auction ends (optional)"
         self.fields['is_active'].widget.attrs.update({
             'class': 'checkbox-input'
         })
         # Add validation for starting_price
-        self.fields['starting_price'].validators = [MinValueValidator(0.01)]
+        self.fields['starting_price'].validators.append(MinValueValidator(Decimal('0.01')))
+
+    def clean_ends_at(self):
+        ends_at = self.cleaned_data.get('ends_at')
+        if ends_at is not None and ends_at <= timezone.now():
+            raise forms.ValidationError("The auction must end in the future")
+        return ends_at
 
     def clean(self):
         cleaned_data = super().clean()
@@ -28,19 +38,24 @@ class ListingForm(forms.ModelForm):
 
     class Meta:
         model = AuctionListing
-        fields = ["title", "description", "starting_price", "image_url", "category", "is_active"]
+        fields = ["title", "description", "starting_price", "image_url", "category", "ends_at", "is_active"]
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Enter title'}),
             'description': forms.Textarea(attrs={'class': 'form-control', 'placeholder': 'Enter description'}),
             'starting_price': forms.NumberInput(
-                attrs={'class': 'form-control', 'placeholder': 'Enter starting price', 'min': '0.01'}),
+                attrs={'class': 'form-control', 'placeholder': 'Enter starting price', 'min': '0.01', 'step': '0.01'}),
             'image_url': forms.URLInput(attrs={'class': 'form-control', 'placeholder': 'Enter image URL (optional)'}),
             'category': forms.Select(attrs={'class': 'form-group'}),
+            'ends_at': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'},
+                                           format='%Y-%m-%dT%H:%M'),
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
 
 class BidForm(forms.ModelForm):
+    automatic = forms.BooleanField(required=False, label='Bid for me up to this amount',
+                                   help_text="Other bidders only see the lowest bid needed to lead.")
+
     class Meta:
         model = Bid
         fields = ["amount"]
@@ -60,3 +75,38 @@ class BidForm(forms.ModelForm):
         if amount is not None and amount <= 0:
             raise forms.ValidationError("Bid amount must be greater than zero")
         return amount
+
+
+class ListingImportForm(ListingForm):
+    """
+    ListingForm for one row of a bulk import file.
+
+    The category column holds a category name, resolved against a dict
+    loaded once per import, so validating a row runs no queries. It is left
+    out of the model fields, so model validation does not re-check it with
+    an EXISTS query either; the caller assigns cleaned_data['category'].
+    """
+    category = forms.CharField(required=False)
+
+    class Meta(ListingForm.Meta):
+        fields = [field for field in ListingForm.Meta.fields if field != 'category']
+
+    def __init__(self, *args, categories, default_category, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.categories = categories
+        self.default_category = default_category
+
+    def clean_category(self):
+        name = self.cleaned_data.get('category', '').strip()
+        if not name:
+            if self.default_category is None:
+                raise forms.ValidationError("No category given and there is no 'Other' category")
+            return self.default_category
+        try:
+            return self.categories[name.lower()]
+        except KeyError:
+            raise forms.ValidationError(f"Unknown category '{name}'")
+
+    def clean(self):
+        # skip ListingForm.clean, which creates the 'Other' category when it is missing
+        return forms.ModelForm.clean(self)
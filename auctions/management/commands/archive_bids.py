@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from auctions.utils import archive_closed_bids
+
+
+class Command(BaseCommand):
+    help = "Move the bids of closed auctions from the live Bid table to BidArchive, in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Bids moved per transaction (default: BID_ARCHIVE_BATCH_SIZE)")
+        parser.add_argument('--loop', action='store_true',
+                            help="Run as a daemon instead of exiting once no bid is left to archive")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep when nothing is left to archive in --loop mode")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            try:
+                moved = archive_closed_bids(batch_size=options['batch_size'])
+            except OperationalError as e:
+                # a bid or a closer holds the SQLite write lock; try again
+                self.stderr.write(f"Batch rolled back: {e}")
+                time.sleep(0.1)
+                continue
+
+            total += moved
+            if moved:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Archived {total} bid(s)."))
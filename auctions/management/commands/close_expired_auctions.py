@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import OperationalError
+
+from auctions.utils import close_expired_auctions
+
+
+class Command(BaseCommand):
+    help = "Close active auctions whose end time has passed, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Listings closed per transaction")
+        parser.add_argument('--loop', action='store_true',
+                            help="Run as a daemon instead of exiting once no auction is due")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep when no auction is due in --loop mode")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            try:
+                closed = close_expired_auctions(batch_size=options['batch_size'])
+            except OperationalError as e:
+                # another closer or a bid holds the SQLite write lock; try again
+                self.stderr.write(f"Batch rolled back: {e}")
+                time.sleep(0.1)
+                continue
+
+            total += closed
+            if closed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Closed {total} expired auction(s)."))
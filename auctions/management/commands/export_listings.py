@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.models import AuctionListing, Bid, BidArchive
+from auctions.utils.bulk_io import (archived_bid_export_rows, bid_export_rows, listing_export_rows, stream_csv,
+                                    write_xlsx)
+
+
+class Command(BaseCommand):
+    help = "Export listings, or their bids, to CSV or XLSX without loading them all into memory."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Output file, or - for CSV on standard output")
+        parser.add_argument('--bids', action='store_true', help="Export bids instead of listings")
+        parser.add_argument('--archived', action='store_true',
+                            help="With --bids, export the archived bids of closed auctions")
+        parser.add_argument('--owner', help="Only export listings of this seller (or bids on them)")
+        parser.add_argument('--format', choices=('csv', 'xlsx'),
+                            help="Output format (default: from the file extension, else csv)")
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or ('xlsx' if path.lower().endswith('.xlsx') else 'csv')
+        if path == '-' and file_format == 'xlsx':
+            raise CommandError("XLSX output needs a file path")
+
+        if options['archived'] and not options['bids']:
+            raise CommandError("--archived only applies to --bids")
+
+        if options['bids'] and options['archived']:
+            # reads the archive only, never the Bid table the bid engine writes to
+            queryset = BidArchive.objects.all()
+            if options['owner']:
+                queryset = queryset.filter(listing__owner__username=options['owner'])
+            rows = archived_bid_export_rows(queryset)
+        elif options['bids']:
+            queryset = Bid.objects.all()
+            if options['owner']:
+                queryset = queryset.filter(listing__owner__username=options['owner'])
+            rows = bid_export_rows(queryset)
+        else:
+            queryset = AuctionListing.objects.all()
+            if options['owner']:
+                queryset = queryset.filter(owner__username=options['owner'])
+            rows = listing_export_rows(queryset)
+
+        if file_format == 'xlsx':
+            write_xlsx(rows, path)
+        elif path == '-':
+            for line in stream_csv(rows):
+                self.stdout.write(line, ending='')
+        else:
+            with open(path, 'w', newline='', encoding='utf-8') as output:
+                output.writelines(stream_csv(rows))
+
+        if path != '-':
+            self.stdout.write(self.style.SUCCESS(f"Exported to {path}."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from auctions.models import User
+from auctions.utils.bulk_io import ImportFileError, import_listings, iter_import_rows
+
+
+class Command(BaseCommand):
+    help = "Create listings in bulk from a CSV or XLSX file, validating every row with ListingForm."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="CSV or XLSX file with a header row")
+        parser.add_argument('--owner', required=True, help="Username of the seller the listings belong to")
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Listings inserted per bulk_create")
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named '{options['owner']}'")
+
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = import_listings(iter_import_rows(fileobj, options['path']), owner,
+                                         batch_size=options['batch_size'])
+        except OSError as exc:
+            raise CommandError(str(exc))
+        except ImportFileError as exc:
+            raise CommandError(f"{exc} ({exc.created} listing(s) were imported before the error)")
+
+        for row_number, message in result.errors:
+            self.stderr.write(f"Row {row_number}: {message}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created} listing(s), rejected {result.failed} row(s)."))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from auctions.models import AuctionListing
+from auctions.utils import reconcile_listing_bid_state, reconcile_unread_notification_counts
+
+
+class Command(BaseCommand):
+    help = ("Backfill and reconcile the denormalized bid state stored on auction listings "
+            "and the unread notification counters stored on users.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Number of rows written per bulk update")
+        parser.add_argument('--active-only', action='store_true',
+                            help="Only reconcile listings that are still active")
+
+    def handle(self, *args, **options):
+        listings = AuctionListing.objects.all()
+        if options['active_only']:
+            listings = listings.filter(is_active=True)
+
+        fixed = reconcile_listing_bid_state(listings, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {fixed} listing(s)."))
+
+        fixed = reconcile_unread_notification_counts(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Reconciled {fixed} unread notification counter(s)."))
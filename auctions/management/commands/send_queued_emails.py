@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from auctions.utils import send_queued_emails
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbound emails in batches over one backend connection per batch."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help="Emails claimed per batch (default: EMAIL_QUEUE_BATCH_SIZE)")
+        parser.add_argument('--max-attempts', type=int, default=None,
+                            help="Failures before an email is dead-lettered (default: EMAIL_QUEUE_MAX_ATTEMPTS)")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running and poll the queue instead of exiting once it is drained")
+        parser.add_argument('--interval', type=float, default=5.0,
+                            help="Seconds to sleep when the queue is empty in --loop mode")
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            sent, failed = send_queued_emails(options['batch_size'], options['max_attempts'])
+            total_sent += sent
+            total_failed += failed
+
+            if sent or failed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(f"Sent {total_sent} email(s), {total_failed} failed."))
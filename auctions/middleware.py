@@ -0,0 +1,69 @@
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+from .utils.instrumentation import QueryBudgetExceeded, finish_request, start_request, view_stats
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentationMiddleware:
+    """
+    Record query count, database time, template render time and wall time
+    of every request under the URL name of its view.
+
+    Slow requests and requests over their view's query budget are logged;
+    with settings.QUERY_BUDGET_ENFORCE the latter raise QueryBudgetExceeded.
+    Keep it first in MIDDLEWARE so the session and user lookups are counted.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = start_request()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            finish_request(token)
+        self.record(request, metrics, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        metrics, token = start_request()
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            finish_request(token)
+        self.record(request, metrics, time.perf_counter() - start)
+        return response
+
+    def record(self, request, metrics, wall_time):
+        match = request.resolver_match
+        if match is None:
+            return
+        view = match.view_name
+        budget = getattr(match.func, 'query_budget', None)
+        over_budget = budget is not None and metrics.queries > budget
+        view_stats.record(view, metrics, wall_time, over_budget)
+
+        if wall_time * 1000 >= settings.SLOW_REQUEST_MS:
+            logger.warning("Slow request: %s %s (%s) took %.0fms, %d queries in %.0fms, render %.0fms",
+                           request.method, request.path, view, wall_time * 1000,
+                           metrics.queries, metrics.db_time * 1000, metrics.render_time * 1000)
+        if over_budget:
+            message = f"{view} ran {metrics.queries} queries, over its budget of {budget}"
+            if settings.QUERY_BUDGET_ENFORCE:
+                raise QueryBudgetExceeded(message)
+            logger.warning("Query budget exceeded: %s", message)
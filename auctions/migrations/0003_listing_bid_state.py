@@ -0,0 +1,58 @@
+# Generated by Django 5.1.4 on 2026-10-18 17:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_bid_state(apps, schema_editor):
+    AuctionListing = apps.get_model('auctions', 'AuctionListing')
+    Bid = apps.get_model('auctions', 'Bid')
+
+    top_bid = Bid.objects.filter(listing=OuterRef('pk')).order_by('-amount', 'created')
+    bid_count = (Bid.objects.filter(listing=OuterRef('pk')).order_by()
+                 .values('listing').annotate(n=Count('id')).values('n'))
+    listings = AuctionListing.objects.annotate(
+        top_amount=Subquery(top_bid.values('amount')[:1]),
+        top_bidder=Subquery(top_bid.values('bidder')[:1]),
+        n_bids=Subquery(bid_count),
+    )
+
+    batch = []
+    for listing in listings.iterator(chunk_size=500):
+        listing.bid_count = listing.n_bids or 0
+        listing.current_price = listing.top_amount if listing.bid_count else listing.starting_price
+        listing.high_bidder_id = listing.top_bidder
+        batch.append(listing)
+        if len(batch) >= 500:
+            AuctionListing.objects.bulk_update(batch, ['bid_count', 'current_price', 'high_bidder'])
+            batch = []
+    if batch:
+        AuctionListing.objects.bulk_update(batch, ['bid_count', 'current_price', 'high_bidder'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0002_rename_imageurl_auctionlisting_image_url_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auctionlisting',
+            name='bid_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='auctionlisting',
+            name='current_price',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='auctionlisting',
+            name='high_bidder',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='leading_listings', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_bid_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.1.4 on 2026-10-18 17:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0003_listing_bid_state'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auctionlisting',
+            index=models.Index(fields=['is_active', '-created', 'id'], name='listing_active_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auctionlisting',
+            index=models.Index(fields=['owner', '-created', 'id'], name='listing_owner_feed_idx'),
+        ),
+    ]
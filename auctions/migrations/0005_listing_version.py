@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 17:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0004_listing_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='auctionlisting',
+            name='version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
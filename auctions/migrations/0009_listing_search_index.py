@@ -0,0 +1,22 @@
+from django.db import migrations
+
+from ._search_index import install_search_index, remove_search_index
+
+
+def forwards(apps, schema_editor):
+    install_search_index(schema_editor)
+
+
+def backwards(apps, schema_editor):
+    remove_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0008_listing_ends_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(forwards, backwards),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:03
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+
+
+def backfill_unread_counts(apps, schema_editor):
+    User = apps.get_model('auctions', 'User')
+    Notification = apps.get_model('auctions', 'Notification')
+
+    unread = (Notification.objects.filter(user=OuterRef('pk'), is_read=False).order_by()
+              .values('user').annotate(n=Count('id')).values('n'))
+    User.objects.filter(notification__is_read=False).distinct().update(
+        unread_notification_count=Subquery(unread))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0009_listing_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='unread_notification_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'is_read'], name='notification_unread_idx'),
+        ),
+        migrations.RunPython(backfill_unread_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:42
+
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_watchlist_entries(apps, schema_editor):
+    # keep the oldest entry of each (user, listing) pair so the constraint can be added
+    Watchlist = apps.get_model('auctions', 'Watchlist')
+    first_entries = Watchlist.objects.order_by().values('user', 'listing').annotate(first=Min('id')).values('first')
+    Watchlist.objects.exclude(pk__in=first_entries).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0010_user_unread_notification_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auctionlisting',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['category', '-created', 'id'], name='listing_category_feed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bid',
+            index=models.Index(fields=['listing', '-amount'], name='bid_listing_amount_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['listing', '-created'], name='comment_listing_created_idx'),
+        ),
+        migrations.RunPython(remove_duplicate_watchlist_entries, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='watchlist',
+            constraint=models.UniqueConstraint(fields=('user', 'listing'), name='watchlist_user_listing_unique'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.4 on 2026-10-18 18:49
+
+import auctions.models
+from django.db import migrations
+from django.db.models import F
+from django.db.models.functions import Round
+
+from ._search_index import install_search_index
+
+
+def round_to_cents(apps, schema_editor):
+    # PostgreSQL rounds while casting the column to numeric; SQLite keeps the
+    # old doubles, so drop any fraction of a cent they carry
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    AuctionListing = apps.get_model('auctions', 'AuctionListing')
+    Bid = apps.get_model('auctions', 'Bid')
+    AuctionListing.objects.update(starting_price=Round(F('starting_price'), 2),
+                                  current_price=Round(F('current_price'), 2))
+    Bid.objects.update(amount=Round(F('amount'), 2))
+
+
+def reinstall_search_index(apps, schema_editor):
+    # rebuilding the listing table on SQLite dropped the full-text triggers
+    install_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0011_hot_query_indexes'),
+    ]
+
+    operations = [
+        # runs last when unapplying, after the fields are rebuilt as floats
+        migrations.RunPython(migrations.RunPython.noop, reinstall_search_index),
+        migrations.AlterField(
+            model_name='auctionlisting',
+            name='current_price',
+            field=auctions.models.MoneyField(decimal_places=2, default=0, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='auctionlisting',
+            name='starting_price',
+            field=auctions.models.MoneyField(decimal_places=2, max_digits=12),
+        ),
+        migrations.AlterField(
+            model_name='bid',
+            name='amount',
+            field=auctions.models.MoneyField(decimal_places=2, max_digits=12),
+        ),
+        migrations.RunPython(round_to_cents, migrations.RunPython.noop),
+        migrations.RunPython(reinstall_search_index, migrations.RunPython.noop),
+    ]
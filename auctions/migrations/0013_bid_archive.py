@@ -0,0 +1,58 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:14
+
+import auctions.models
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+from ._search_index import install_search_index
+
+
+def reinstall_search_index(apps, schema_editor):
+    # adding archive_pending rebuilt the listing table on SQLite and dropped the full-text triggers
+    install_search_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0012_money_decimal_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BidArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bid_id', models.PositiveBigIntegerField(unique=True)),
+                ('amount', auctions.models.MoneyField(decimal_places=2, max_digits=12)),
+                ('placed_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['-placed_at'],
+            },
+        ),
+        # runs last when unapplying, after the column is removed again
+        migrations.RunPython(migrations.RunPython.noop, reinstall_search_index),
+        migrations.AddField(
+            model_name='auctionlisting',
+            name='archive_pending',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(reinstall_search_index, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='auctionlisting',
+            index=models.Index(condition=models.Q(('archive_pending', True)), fields=['id'], name='listing_archive_pending_idx'),
+        ),
+        migrations.AddField(
+            model_name='bidarchive',
+            name='bidder',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bids', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='bidarchive',
+            name='listing',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bids', to='auctions.auctionlisting'),
+        ),
+    ]
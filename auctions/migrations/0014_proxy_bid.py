@@ -0,0 +1,31 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:21
+
+import auctions.models
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0013_bid_archive'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProxyBid',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('max_amount', auctions.models.MoneyField(decimal_places=2, max_digits=12)),
+                ('placed_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('bidder', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proxy_bids', to=settings.AUTH_USER_MODEL)),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='proxy_bids', to='auctions.auctionlisting')),
+            ],
+            options={
+                'ordering': ['-max_amount', 'placed_at'],
+                'constraints': [models.UniqueConstraint(fields=('listing', 'bidder'), name='proxybid_listing_bidder_unique')],
+            },
+        ),
+    ]
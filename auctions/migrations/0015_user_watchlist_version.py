@@ -0,0 +1,18 @@
+# Generated by Django 5.1.4 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auctions', '0014_proxy_bid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='watchlist_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,60 @@
+"""
+The full-text index DDL, as migrations 0009, 0012 and 0013 install it.
+
+A frozen copy kept next to the migrations, so they do not depend on the
+application code in auctions.utils.search. If the index changes, add the
+new DDL in a new migration rather than editing this module.
+"""
+FTS_TABLE = 'auctions_listing_fts'
+LISTING_TABLE = 'auctions_auctionlisting'
+PG_INDEX = 'auctions_listing_search_idx'
+
+SQLITE_INDEX_DDL = [
+    # external-content table: the text lives in the listing table, FTS5 only keeps the index
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        title, description,
+        content='{LISTING_TABLE}', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {LISTING_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {LISTING_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF title, description ON {LISTING_TABLE} BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, title, description) VALUES (new.id, new.title, new.description);
+    END""",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+PG_INDEX_DDL = (f"CREATE INDEX IF NOT EXISTS {PG_INDEX} ON {LISTING_TABLE} "
+                f"USING GIN (to_tsvector('english', coalesce(title, '') || ' ' || coalesce(description, '')))")
+
+
+def install_search_index(schema_editor):
+    """
+    Create the full-text index for the database in use.
+
+    SQLite gets an FTS5 table kept in sync by triggers; migrations that
+    rebuild the listing table on SQLite drop those triggers and must call
+    this again. PostgreSQL gets a GIN index over the listing tsvector.
+    """
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for statement in SQLITE_INDEX_DDL:
+            schema_editor.execute(statement)
+    elif vendor == 'postgresql':
+        schema_editor.execute(PG_INDEX_DDL)
+
+
+def remove_search_index(schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for suffix in ('ai', 'ad', 'au'):
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {FTS_TABLE}_{suffix}")
+        schema_editor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute(f"DROP INDEX IF EXISTS {PG_INDEX}")
@@ -1,18 +1,29 @@
 from django.contrib.auth.models import AbstractUser
-from django.utils.functional import cached_property
+from django.utils import timezone
 from django.db import models
 
 
+class MoneyField(models.DecimalField):
+    """An amount in dollars, stored exactly to the cent."""
+
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault('max_digits', 12)
+        kwargs.setdefault('decimal_places', 2)
+        super().__init__(*args, **kwargs)
+
+
 # models.py
 class User(AbstractUser):
     email_confirmed = models.BooleanField(default=False)
     confirmation_token = models.CharField(max_length=64, blank=True, null=True)
     token_created_at = models.DateTimeField(null=True, blank=True)
 
-    # Existing unread_notification_count property
-    @cached_property
-    def unread_notification_count(self):
-        return Notification.objects.filter(user=self, is_read=False).count()
+    # counter cache rendered in the header of every page; kept up to date by
+    # notify_users and mark_notifications_read instead of a COUNT per request
+    unread_notification_count = models.PositiveIntegerField(default=0)
+    # bumped on every watchlist change; the cached set of watched ids is keyed
+    # on it, so no process keeps serving a set another process has changed
+    watchlist_version = models.PositiveIntegerField(default=0)
 
 
 class Category(models.Model):
@@ -29,6 +40,24 @@ class Category(models.Model):
         return self.name
 
 
+class AuctionListingQuerySet(models.QuerySet):
+    def with_feed_data(self):
+        """Listings with everything a listing card renders, fetched in one query."""
+        # current_price already holds the highest bid, so no Bid subquery is needed
+        return self.select_related('category', 'owner')
+
+    def _category_count_rows(self):
+        return self.order_by().values('category__name').annotate(listing_count=models.Count('id'))
+
+    def category_counts(self):
+        """Map category name to number of listings, computed with a single GROUP BY."""
+        return {row['category__name']: row['listing_count'] for row in self._category_count_rows()}
+
+    async def acategory_counts(self):
+        """Async version of category_counts()."""
+        return {row['category__name']: row['listing_count'] async for row in self._category_count_rows()}
+
+
 class AuctionListing(models.Model):
     """
     Represents an auction listing in the system.
@@ -37,28 +66,69 @@ class AuctionListing(models.Model):
         owner (User): User who created the listing
         title (str): Title of the item being auctioned
         description (str): Detailed description of the item
-        starting_price (float): Initial asking price
+        starting_price (Decimal): Initial asking price
         image_url (str, optional): URL to item's image
         is_active (bool): Whether the auction is ongoing
         category (Category, optional): Item's category
+        current_price (Decimal): Highest bid, or the starting price when there are no bids
+        bid_count (int): Number of bids placed on the listing
+        high_bidder (User, optional): User holding the highest bid
+        version (int): Counter bumped on every change to the bid state
+        ends_at (datetime, optional): Scheduled end of the auction
+        archive_pending (bool): Closed with bids that archive_closed_bids has not moved yet
     """
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='listings')
     title = models.CharField(max_length=50, db_index=True)
     description = models.CharField(max_length=500, null=True, blank=True)
-    starting_price = models.FloatField()
+    starting_price = MoneyField()
     image_url = models.URLField(null=True, blank=True)
     is_active = models.BooleanField(default=True, db_index=True)
     category = models.ForeignKey(Category, on_delete=models.CASCADE,
                                  related_name='category_listings', null=True, blank=True)
+
+    # denormalized bid state, kept up to date by place_bid and handle_auction_close
+    current_price = MoneyField(default=0)
+    bid_count = models.PositiveIntegerField(default=0)
+    high_bidder = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='leading_listings',
+                                    null=True, blank=True)
+    # bumped on every bid and on close, used as a compare-and-swap token by the bid engine
+    version = models.PositiveIntegerField(default=0)
+    # when set, the close_expired_auctions command closes the auction at this time
+    ends_at = models.DateTimeField(null=True, blank=True)
+    # set on close instead of deleting the bids; cleared once they are in BidArchive
+    archive_pending = models.BooleanField(default=False)
+
     updated = models.DateTimeField(auto_now=True)
     created = models.DateTimeField(auto_now_add=True)
 
+    objects = AuctionListingQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created']
+        indexes = [
+            # keyset pagination walks (-created, id) within these filters
+            models.Index(fields=['is_active', '-created', 'id'], name='listing_active_feed_idx'),
+            models.Index(fields=['owner', '-created', 'id'], name='listing_owner_feed_idx'),
+            # partial, because Django filters booleans as a bare column, which SQLite
+            # cannot seek on; the predicate matches it and leaves closed listings out
+            models.Index(fields=['category', '-created', 'id'], name='listing_category_feed_idx',
+                         condition=models.Q(is_active=True)),
+            # the expiry scheduler walks active listings in ends_at order
+            models.Index(fields=['is_active', 'ends_at'], name='listing_expiry_idx'),
+            # the bid archiver only ever looks at the few listings it still has to drain
+            models.Index(fields=['id'], name='listing_archive_pending_idx',
+                         condition=models.Q(archive_pending=True)),
+        ]
 
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # Without bids the displayed price follows the starting price
+        if not self.bid_count:
+            self.current_price = self.starting_price
+        super().save(*args, **kwargs)
+
 
 class Watchlist(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -70,6 +140,9 @@ class Watchlist(models.Model):
 
     class Meta:
         ordering = ['-created']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'listing'], name='watchlist_user_listing_unique'),
+        ]
 
     def __str__(self):
         return f"Watchlist of {self.user}"
@@ -86,6 +159,9 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['listing', '-created'], name='comment_listing_created_idx'),
+        ]
 
     def __str__(self):
         return self.body[0:50]
@@ -101,22 +177,146 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['user', 'is_read'], name='notification_unread_idx'),
+        ]
 
     def __str__(self):
         return self.user.username
 
 
+class BidQuerySet(models.QuerySet):
+    def live(self):
+        """Bids of open auctions; those of closed ones are waiting to be archived."""
+        return self.filter(listing__is_active=True)
+
+
 class Bid(models.Model):
     bidder = models.ForeignKey(User, on_delete=models.CASCADE)
     listing = models.ForeignKey(AuctionListing, on_delete=models.CASCADE)
-    amount = models.FloatField()
+    amount = MoneyField()
 
     # take a snapshot on every time we save an item/and when we create it
     updated = models.DateTimeField(auto_now=True)
     created = models.DateTimeField(auto_now_add=True)
 
+    objects = BidQuerySet.as_manager()
+
     class Meta:
         ordering = ['-amount']
+        indexes = [
+            # the highest bid and the bid history of a listing
+            models.Index(fields=['listing', '-amount'], name='bid_listing_amount_idx'),
+        ]
 
     def __str__(self):
         return str(self.listing.id)
+
+
+class ProxyBid(models.Model):
+    """
+    The most a bidder is willing to pay for a listing; the bid engine bids
+    on their behalf up to it whenever they are outbid.
+
+    Attributes:
+        max_amount (Decimal): The bidder's ceiling, never shown to other users
+        placed_at (datetime): When the ceiling was set; of two equal ceilings the earlier wins
+    """
+    bidder = models.ForeignKey(User, on_delete=models.CASCADE, related_name='proxy_bids')
+    listing = models.ForeignKey(AuctionListing, on_delete=models.CASCADE, related_name='proxy_bids')
+    max_amount = MoneyField()
+    placed_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-max_amount', 'placed_at']
+        constraints = [
+            models.UniqueConstraint(fields=['listing', 'bidder'], name='proxybid_listing_bidder_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.bidder} up to {self.max_amount} on {self.listing_id}"
+
+
+class BidArchive(models.Model):
+    """
+    A bid of a closed auction, moved out of the live Bid table by archive_closed_bids.
+
+    Reports and exports read this table, so they never scan or lock the Bid
+    table the bid engine writes to.
+
+    Attributes:
+        bid_id (int): Primary key the bid had in the Bid table
+        amount (Decimal): Amount of the bid
+        placed_at (datetime): When the bid was placed
+        archived_at (datetime): When the bid was moved here
+    """
+    # unique, so a bid moved twice by racing archivers is only stored once
+    bid_id = models.PositiveBigIntegerField(unique=True)
+    bidder = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_bids')
+    listing = models.ForeignKey(AuctionListing, on_delete=models.CASCADE, related_name='archived_bids')
+    amount = MoneyField()
+    placed_at = models.DateTimeField()
+
+    # take a snapshot on every time we create an item
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-placed_at']
+
+    def __str__(self):
+        return f"{self.listing_id}: {self.amount}"
+
+
+class OutgoingEmail(models.Model):
+    """
+    Outbox entry for an email that is delivered by the send_queued_emails worker
+    instead of inside the request that produced it.
+
+    Attributes:
+        recipients (str): Comma separated recipient addresses
+        status (str): pending, sending (claimed by a worker), sent or dead (gave up)
+        attempts (int): Number of failed delivery attempts so far
+        next_attempt_at (datetime): Earliest time a worker may (re)claim the email
+    """
+    PENDING = 'pending'
+    SENDING = 'sending'
+    SENT = 'sent'
+    DEAD = 'dead'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (SENDING, 'Sending'),
+        (SENT, 'Sent'),
+        (DEAD, 'Dead'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    recipients = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    # take a snapshot on every time we create an item
+    created = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['created']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipients}"
+
+
+class RateLimitCounter(models.Model):
+    """Hit counter of one rate-limit window, used by the database rate-limit backend."""
+    key = models.CharField(max_length=255, unique=True)
+    count = models.PositiveIntegerField(default=0)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key}: {self.count}"
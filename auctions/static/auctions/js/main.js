@@ -147,6 +147,46 @@ document.addEventListener('DOMContentLoaded', function() {
 
     // Initialize comment system
     new CommentSystem();
+
+    // Live bid updates pushed by the server over server-sent events
+    const priceSection = document.querySelector('.listing-price-section[data-events-url]');
+    if (priceSection && window.EventSource) {
+        const events = new EventSource(priceSection.dataset.eventsUrl);
+
+        const renderPrice = (label, amount, bidder) => {
+            const block = document.createElement('div');
+            block.className = 'current-bid';
+
+            const labelEl = document.createElement('span');
+            labelEl.className = 'price-label';
+            labelEl.textContent = label;
+
+            const amountEl = document.createElement('span');
+            amountEl.className = 'price-amount';
+            // same format as the money template filter, e.g. $1,234.50
+            amountEl.textContent = `$${Number(amount).toLocaleString('en-US', {minimumFractionDigits: 2, maximumFractionDigits: 2})}`;
+
+            block.append(labelEl, amountEl);
+            if (bidder) {
+                const bidderEl = document.createElement('span');
+                bidderEl.className = 'price-bidder';
+                bidderEl.textContent = `by ${bidder}`;
+                block.appendChild(bidderEl);
+            }
+            priceSection.replaceChildren(block);
+        };
+
+        events.addEventListener('bid', (e) => {
+            const data = JSON.parse(e.data);
+            renderPrice('Current Bid', data.current_price, data.high_bidder);
+        });
+
+        events.addEventListener('closed', (e) => {
+            const data = JSON.parse(e.data);
+            renderPrice('Auction Closed', data.current_price, null);
+            events.close();
+        });
+    }
 });
 class PasswordValidator {
     constructor(passwordInput, confirmInput, submitButton) {
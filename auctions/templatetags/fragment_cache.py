@@ -0,0 +1,40 @@
+from django import template
+
+from ..utils.fragment_cache import render_fragment
+
+register = template.Library()
+
+
+class ListingFragmentNode(template.Node):
+    def __init__(self, nodelist, name, listing):
+        self.nodelist = nodelist
+        self.name = name
+        self.listing = listing
+
+    def render(self, context):
+        name = self.name.resolve(context)
+        listing = self.listing.resolve(context)
+        return render_fragment(name, listing, lambda: self.nodelist.render(context))
+
+
+@register.tag
+def listing_fragment(parser, token):
+    """
+    Cache the enclosed template block per listing version.
+
+    Usage::
+
+        {% listing_fragment 'listing_card' listing %}...{% endlisting_fragment %}
+
+    The block must only depend on the listing itself: anything that varies
+    per request or with the clock (the user, timesince) belongs outside it.
+    """
+    bits = token.split_contents()
+    if len(bits) != 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' takes a fragment name and a listing, e.g. "
+            "{% listing_fragment 'listing_card' listing %}")
+
+    nodelist = parser.parse(('endlisting_fragment',))
+    parser.delete_first_token()
+    return ListingFragmentNode(nodelist, parser.compile_filter(bits[1]), parser.compile_filter(bits[2]))
@@ -0,0 +1,13 @@
+from django import template
+
+from ..utils.money import format_money
+
+register = template.Library()
+
+
+@register.filter
+def money(value):
+    """Render an amount as dollars and cents, e.g. {{ listing.current_price|money }} -> $1,234.50."""
+    if value in (None, ''):
+        return ''
+    return format_money(value)
@@ -1,14 +1,30 @@
 # tests.py
+from decimal import Decimal
+from io import BytesIO, StringIO
+from django.conf import settings
 from django.test import Client
 from django.urls import reverse
 from django.contrib.messages import get_messages
 from django.utils import timezone
+from datetime import timedelta
 from django.core import mail
+from django.core.cache import cache, caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db.models import F
 from .models import User, Comment, Notification
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from .forms import ListingForm, BidForm
-from .models import AuctionListing, Bid, Category
+from .models import AuctionListing, Bid, BidArchive, Category, OutgoingEmail, ProxyBid, RateLimitCounter, Watchlist
+from .utils.fragment_cache import fragment_key, stats as fragment_stats
+from .utils.instrumentation import QueryBudgetExceeded, view_stats
+from .utils.rate_limit import CacheBackend, DatabaseBackend, parse_rate
+from . import views
+from .utils import (BidResult, CursorPaginator, InvalidCursor, RateLimiter, archive_closed_bids, broker,
+                    check_watchlist_status, close_expired_auctions, format_money, get_last_bid, handle_auction_close,
+                    notify_users, order_books, queue_email, reconcile_listing_bid_state, reconcile_unread_notification_counts,
+                    reopen_auction, search_listings, send_queued_emails, submit_bid, submit_max_bid, to_money, watched_listing_ids)
 
 
 class ViewsTest(TestCase):
@@ -102,6 +118,9 @@ class ViewsTest(TestCase):
         response = self.client.post(reverse('password_reset'), {
             'email': self.test_user.email
         })
+        # The email is queued by the view and delivered by the worker
+        self.assertEqual(len(mail.outbox), 0)
+        call_command('send_queued_emails', stdout=StringIO())
         self.assertEqual(len(mail.outbox), 1)
         self.assertIn('Password Reset Request', mail.outbox[0].subject)
 
@@ -191,11 +210,7 @@ class ViewsTest(TestCase):
         # Test closing auction with bids
         self.listing.is_active = True
         self.listing.save()
-        Bid.objects.create(
-            bidder=self.other_user,
-            listing=self.listing,
-            amount=150.00
-        )
+        self.assertTrue(submit_bid(self.listing.pk, self.other_user, 150.00).accepted)
 
         response = self.client.post(reverse('auction_control', args=[self.listing.id]))
         self.listing.refresh_from_db()
@@ -304,6 +319,2007 @@ class ViewsTest(TestCase):
         ).exists())
 
 
+class ListingBidStateTest(TestCase):
+    def setUp(self):
+        """Set up a listing and a bidder"""
+        self.owner = User.objects.create_user(username='owner', password='testpass123')
+        self.bidder = User.objects.create_user(username='bidder', password='testpass123')
+        self.listing = AuctionListing.objects.create(
+            owner=self.owner,
+            title='Bid State Listing',
+            starting_price=100.00
+        )
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_new_listing_starts_at_starting_price(self):
+        """Test a listing without bids carries its starting price"""
+        self.assertEqual(self.listing.current_price, 100.00)
+        self.assertEqual(self.listing.bid_count, 0)
+        self.assertIsNone(self.listing.high_bidder)
+
+    def test_bid_updates_listing_state(self):
+        """Test placing a bid maintains price, count and high bidder"""
+        self.client.login(username='bidder', password='testpass123')
+        self.client.post(reverse('listing_page', args=[self.listing.id]), {'amount': '120.00'})
+
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_price, 120.00)
+        self.assertEqual(self.listing.bid_count, 1)
+        self.assertEqual(self.listing.high_bidder, self.bidder)
+
+    def test_close_resets_listing_state(self):
+        """Test closing an auction clears the bid state"""
+        self.client.login(username='bidder', password='testpass123')
+        self.client.post(reverse('listing_page', args=[self.listing.id]), {'amount': '120.00'})
+        self.client.login(username='owner', password='testpass123')
+        self.client.post(reverse('auction_control', args=[self.listing.id]))
+
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_price, 120.00)
+        self.assertEqual(self.listing.bid_count, 0)
+        self.assertIsNone(self.listing.high_bidder)
+
+    def test_reconcile_command(self):
+        """Test the reconcile command repairs drifted bid state"""
+        Bid.objects.create(bidder=self.bidder, listing=self.listing, amount=110.00)
+        Bid.objects.create(bidder=self.owner, listing=self.listing, amount=130.00)
+
+        call_command('reconcile_counters', stdout=StringIO())
+
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_price, 130.00)
+        self.assertEqual(self.listing.bid_count, 2)
+        self.assertEqual(self.listing.high_bidder, self.owner)
+
+
+class UnreadNotificationCounterTest(TestCase):
+    def setUp(self):
+        """Set up a listing with a bid from a confirmed user"""
+        self.owner = User.objects.create_user(username='seller', password='testpass123')
+        self.bidder = User.objects.create_user(username='winner', password='testpass123',
+                                               email_confirmed=True)
+        self.listing = AuctionListing.objects.create(owner=self.owner, title='Counted', starting_price=10.00)
+        submit_bid(self.listing.pk, self.bidder, 15.00)
+
+    def test_close_increments_and_view_resets(self):
+        """Test closing an auction counts the notification and reading clears it"""
+        handle_auction_close(self.listing)
+        self.bidder.refresh_from_db()
+        self.assertEqual(self.bidder.unread_notification_count, 1)
+
+        self.client.login(username='winner', password='testpass123')
+        response = self.client.get(reverse('notifications'))
+        self.assertNotContains(response, 'notification-badge')
+        self.bidder.refresh_from_db()
+        self.assertEqual(self.bidder.unread_notification_count, 0)
+        self.assertFalse(Notification.objects.filter(user=self.bidder, is_read=False).exists())
+
+    def test_deleted_notifications_leave_the_counter(self):
+        """Test notifications removed with their listing are taken off the counter"""
+        handle_auction_close(self.listing)
+        other = AuctionListing.objects.create(owner=self.owner, title='Kept', starting_price=10.00)
+        notify_users([Notification(user=self.bidder, listing=other)])
+
+        self.listing.delete()
+        self.bidder.refresh_from_db()
+        self.assertEqual(self.bidder.unread_notification_count, 1)
+        self.assertEqual(reconcile_unread_notification_counts(), 0)
+
+    def test_password_reset_keeps_the_counter(self):
+        """Test saving the reset token does not write back a counter read before a notification"""
+        from unittest import mock
+        self.bidder.email = 'winner@example.com'
+        self.bidder.save(update_fields=['email'])
+        # the notification lands between the view reading the user and saving it
+        original_get = User.objects.get
+
+        def get_then_notify(*args, **kwargs):
+            user = original_get(*args, **kwargs)
+            handle_auction_close(self.listing)
+            return user
+
+        with mock.patch.object(User.objects, 'get', get_then_notify):
+            self.client.post(reverse('password_reset'), {'email': 'winner@example.com'})
+        self.bidder.refresh_from_db()
+        self.assertTrue(self.bidder.confirmation_token)
+        self.assertEqual(self.bidder.unread_notification_count, 1)
+
+    def test_expiry_closer_counts_per_winner(self):
+        """Test the batch closer adds every won auction to the winner's counter"""
+        other = AuctionListing.objects.create(owner=self.owner, title='Counted too', starting_price=10.00)
+        Bid.objects.create(bidder=self.bidder, listing=other, amount=12.00)
+        reconcile_listing_bid_state()
+        AuctionListing.objects.update(ends_at=timezone.now() - timedelta(minutes=1))
+
+        close_expired_auctions()
+        self.bidder.refresh_from_db()
+        self.assertEqual(self.bidder.unread_notification_count, 2)
+
+    def test_header_costs_no_queries(self):
+        """Test the header badge renders from the counter without querying notifications"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        Notification.objects.create(user=self.bidder, listing=self.listing)
+        reconcile_unread_notification_counts()
+        self.client.login(username='winner', password='testpass123')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('index'))
+        self.assertContains(response, '<span class="notification-badge">1</span>', html=True)
+        self.assertFalse([q for q in queries if 'auctions_notification' in q['sql']])
+
+    def test_reconcile_repairs_drift(self):
+        """Test the reconcile command recomputes drifted counters"""
+        Notification.objects.create(user=self.bidder, listing=self.listing)
+        Notification.objects.create(user=self.bidder, listing=self.listing, is_read=True)
+        User.objects.filter(pk=self.owner.pk).update(unread_notification_count=3)
+
+        call_command('reconcile_counters', stdout=StringIO())
+
+        self.bidder.refresh_from_db()
+        self.owner.refresh_from_db()
+        self.assertEqual(self.bidder.unread_notification_count, 1)
+        self.assertEqual(self.owner.unread_notification_count, 0)
+
+
+class IndexQueryCountTest(TestCase):
+    def setUp(self):
+        """Set up categories and a pool of bidders"""
+        self.owner = User.objects.create_user(username='seller', password='testpass123')
+        self.bidder = User.objects.create_user(username='buyer', password='testpass123')
+        self.categories = [Category.objects.create(name=name)
+                           for name in ('Electronics', 'Fashion', 'Automotive')]
+
+    def create_listings(self, count):
+        for i in range(count):
+            listing = AuctionListing.objects.create(
+                owner=self.owner,
+                title=f'Feed Listing {i}',
+                starting_price=10.00,
+                category=self.categories[i % len(self.categories)]
+            )
+            Bid.objects.create(bidder=self.bidder, listing=listing, amount=15.00)
+        reconcile_listing_bid_state()
+
+    def count_index_queries(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('index'))
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_index_query_count_is_constant(self):
+        """Test the index issues the same number of queries for any listing count"""
+        self.create_listings(2)
+        few = self.count_index_queries()
+        self.create_listings(20)
+        many = self.count_index_queries()
+
+        self.assertEqual(few, many)
+        # listings, category counts, categories, plus the conditional GET validators
+        self.assertLessEqual(many, 4)
+
+    def test_category_counts(self):
+        """Test category counts and total come from the grouped query"""
+        self.create_listings(5)
+        AuctionListing.objects.filter(title='Feed Listing 0').update(is_active=False)
+
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response.context['category_counts'], {'Electronics': 1, 'Fashion': 2, 'Automotive': 1})
+        self.assertEqual(response.context['total_listings'], 4)
+
+
+class ListingPageQueryTest(TestCase):
+    def setUp(self):
+        """Set up a listing, a pool of bidders and commenters"""
+        self.owner = User.objects.create_user(username='detailseller', password='testpass123')
+        self.users = [User.objects.create_user(username=f'detailuser{i}', password='testpass123') for i in range(3)]
+        self.listing = AuctionListing.objects.create(owner=self.owner, title='Detailed listing', starting_price=10.00,
+                                                     category=Category.objects.create(name='Detail'))
+        self.url = reverse('listing_page', args=[self.listing.pk])
+        cache.clear()
+
+    def add_activity(self, count):
+        price = self.listing.current_price
+        for i in range(count):
+            price += 1
+            Bid.objects.create(bidder=self.users[i % 3], listing=self.listing, amount=price)
+            Comment.objects.create(creator=self.users[i % 3], listing=self.listing, body=f'Comment {i}')
+        reconcile_listing_bid_state()
+        self.listing.refresh_from_db()
+
+    def count_queries(self, method='get', data=None):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(self.url, data)
+        # copy them out: the context slices the live log, which the next request resets
+        return response, list(queries.captured_queries)
+
+    def test_query_count_is_constant(self):
+        """Test the page costs the same queries with no activity and with many bids and comments"""
+        self.client.login(username='detailuser0', password='testpass123')
+        self.client.get(self.url)  # warm the watched ids cache
+        response, quiet = self.count_queries()
+        self.assertEqual(response.status_code, 200)
+        self.add_activity(30)
+        response, busy = self.count_queries()
+        self.assertEqual(len(quiet), len(busy))
+        # session, user, validators, listing, a page of comments and a page of bids
+        self.assertLessEqual(len(busy), 6)
+        self.assertContains(response, 'detailuser2')
+
+    @override_settings(LISTING_COMMENTS_PER_PAGE=4, LISTING_BIDS_PER_PAGE=4)
+    def test_comments_and_bids_are_paginated(self):
+        """Test comments and bids each walk their own cursors, newest and highest first"""
+        self.add_activity(10)
+        for param, context_key, expected in (
+                ('comments', 'comments', list(Comment.objects.filter(listing=self.listing).order_by('-created', 'id'))),
+                ('bids', 'Bidders', list(Bid.objects.filter(listing=self.listing).order_by('-amount', '-id')))):
+            seen, cursor = [], None
+            while True:
+                page = self.client.get(self.url, {param: cursor} if cursor else {}).context[context_key]
+                self.assertLessEqual(len(page), 4)
+                seen.extend(page)
+                if not page.has_next:
+                    break
+                cursor = page.next_cursor
+            self.assertEqual(seen, expected)
+
+        response = self.client.get(self.url, {'comments': 'junk', 'bids': 'junk'})
+        self.assertEqual(len(response.context['comments']), 4)
+        self.assertEqual(response.context['Bidders'].object_list[0].amount, self.listing.current_price)
+
+    def test_post_skips_page_queries(self):
+        """Test placing a bid reads neither comments, bids nor the listing outside the bid engine"""
+        self.add_activity(5)
+        self.client.login(username='detailuser0', password='testpass123')
+        response, queries = self.count_queries('post', {'amount': self.listing.current_price + 5})
+        self.assertRedirects(response, self.url)
+        self.assertFalse([q for q in queries if 'auctions_comment' in q['sql']])
+        listing_reads = [q for q in queries if q['sql'].startswith('SELECT') and 'auctions_auctionlisting' in q['sql']]
+        self.assertEqual(len(listing_reads), 1)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.high_bidder, self.users[0])
+
+    def test_anonymous_post_redirects_to_login(self):
+        """Test an anonymous bid is sent to the login page and places nothing"""
+        response = self.client.post(self.url, {'amount': 50})
+        self.assertRedirects(response, reverse('login'))
+        self.assertFalse(Bid.objects.exists())
+
+
+class FragmentCacheTest(TestCase):
+    def setUp(self):
+        """Set up a listing and empty fragment cache counters"""
+        caches['fragments'].clear()
+        fragment_stats.reset()
+        self.owner = User.objects.create_user(username='cached', password='testpass123')
+        self.bidder = User.objects.create_user(username='cachebidder', password='testpass123')
+        self.listing = AuctionListing.objects.create(owner=self.owner, title='Cached card', starting_price=10.00)
+
+    def tearDown(self):
+        caches['fragments'].clear()
+
+    def card_stats(self):
+        return fragment_stats.snapshot().get('listing_card', {'hits': 0, 'misses': 0})
+
+    def test_cards_hit_after_first_render(self):
+        """Test the second index render serves the card from the cache"""
+        first = self.client.get(reverse('index'))
+        second = self.client.get(reverse('index'))
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(self.card_stats()['misses'], 1)
+        self.assertEqual(self.card_stats()['hits'], 1)
+
+    def test_bid_and_edit_invalidate(self):
+        """Test an accepted bid and a save both render a fresh card"""
+        self.client.get(reverse('index'))
+        self.assertTrue(submit_bid(self.listing.pk, self.bidder, 25.00).accepted)
+        self.assertContains(self.client.get(reverse('index')), '$25.0')
+
+        listing = AuctionListing.objects.get(pk=self.listing.pk)
+        listing.title = 'Renamed card'
+        listing.save()
+        self.assertContains(self.client.get(reverse('index')), 'Renamed card')
+        self.assertEqual(self.card_stats()['misses'], 3)
+
+    def test_bulk_writes_and_category_renames_invalidate(self):
+        """Test a reconciled bid state and a renamed category render a fresh card"""
+        category = Category.objects.create(name='Lamps')
+        AuctionListing.objects.filter(pk=self.listing.pk).update(category=category, updated=timezone.now())
+        self.client.get(reverse('index'))
+
+        Bid.objects.create(listing=self.listing, bidder=self.bidder, amount=30)
+        self.assertEqual(reconcile_listing_bid_state(), 1)
+        self.assertContains(self.client.get(reverse('index')), '$30.0')
+
+        category.name = 'Lighting'
+        category.save()
+        self.assertContains(self.client.get(reverse('index')), 'Lighting')
+        self.assertEqual(self.card_stats()['misses'], 3)
+
+    def test_cached_card_is_whole_elements(self):
+        """Test the cached card holds balanced markup and leaves per-viewer parts outside"""
+        Watchlist.objects.create(user=self.bidder, listing=self.listing)
+        self.client.login(username='cachebidder', password='testpass123')
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'watched-badge')
+
+        listing = AuctionListing.objects.select_related('category').get(pk=self.listing.pk)
+        html = caches['fragments'].get(fragment_key('listing_card', listing))
+        self.assertTrue(html.strip().startswith('<!-- Image Section -->'))
+        self.assertEqual(html.count('<div'), html.count('</div>'))
+        self.assertNotIn('watched-badge', html)
+        self.assertNotIn('time-ago', html)
+
+
+class InstrumentationTest(TestCase):
+    def setUp(self):
+        """Set up a staff user, a regular user and empty request metrics"""
+        view_stats.reset()
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.regular = User.objects.create_user(username='regular', password='testpass123')
+        AuctionListing.objects.create(owner=self.regular, title='Measured', starting_price=5.00)
+
+    def test_records_metrics_per_view(self):
+        """Test a request is recorded under its URL name with queries and render time"""
+        self.client.get(reverse('index'))
+        stats = view_stats.snapshot()['index']
+        self.assertEqual(stats['requests'], 1)
+        self.assertGreater(stats['queries']['mean'], 0)
+        self.assertGreater(stats['render_ms']['mean'], 0)
+        self.assertEqual(sum(stats['wall_ms']['buckets'].values()), 1)
+
+    def test_stats_endpoint_is_staff_only(self):
+        """Test only staff can read the aggregated metrics"""
+        self.client.get(reverse('index'))
+        self.client.login(username='regular', password='testpass123')
+        self.assertEqual(self.client.get(reverse('instrumentation_stats')).status_code, 302)
+
+        self.client.login(username='staff', password='testpass123')
+        response = self.client.get(reverse('instrumentation_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('index', response.json()['views'])
+
+    def test_query_budget(self):
+        """Test exceeding a query budget raises in tests and only logs otherwise"""
+        from unittest import mock
+        with mock.patch.object(views.index, 'query_budget', 1):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get(reverse('index'))
+
+            with override_settings(QUERY_BUDGET_ENFORCE=False), \
+                    self.assertLogs('auctions.middleware', 'WARNING') as logs:
+                self.assertEqual(self.client.get(reverse('index')).status_code, 200)
+        self.assertIn('over its budget of 1', logs.output[0])
+        self.assertEqual(view_stats.snapshot()['index']['over_budget'], 2)
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_requests_logged(self):
+        """Test requests over the slow threshold are logged"""
+        with self.assertLogs('auctions.middleware', 'WARNING') as logs:
+            self.client.get(reverse('index'))
+        self.assertIn('Slow request: GET / (index)', logs.output[0])
+
+
+class BulkImportExportTest(TestCase):
+    CSV = (
+        "title,description,starting_price,category,is_active\n"
+        "Desk lamp,Brass,25.50,Home & Garden,\n"
+        "Old radio,,12,,no\n"
+        ",Missing title,10,,\n"
+        "Bad price,,abc,Nonexistent,\n"
+    )
+
+    def setUp(self):
+        """Set up a seller and the categories"""
+        self.seller = User.objects.create_user(username='catalog', password='testpass123')
+        Category.objects.create(name='Home & Garden')
+        Category.objects.create(name='Other')
+
+    def upload(self, name, content):
+        self.client.login(username='catalog', password='testpass123')
+        return self.client.post(reverse('import_listings'), {'file': SimpleUploadedFile(name, content)})
+
+    def test_csv_upload_validates_each_row(self):
+        """Test valid rows are created with their bid state and invalid rows are reported"""
+        response = self.upload('catalog.csv', self.CSV.encode())
+        result = response.context['result']
+        self.assertEqual((result.created, result.failed), (2, 2))
+        self.assertEqual([row for row, _ in result.errors], [4, 5])
+        self.assertIn('Unknown category', result.errors[1][1])
+
+        lamp = AuctionListing.objects.get(title='Desk lamp')
+        self.assertEqual((lamp.owner, lamp.category.name, lamp.current_price), (self.seller, 'Home & Garden', 25.5))
+        self.assertTrue(lamp.is_active)
+        radio = AuctionListing.objects.get(title='Old radio')
+        self.assertEqual(radio.category.name, 'Other')
+        self.assertFalse(radio.is_active)
+
+    def test_rows_without_a_known_category_are_rejected(self):
+        """Test the import reports missing categories instead of creating them"""
+        from .utils.bulk_io import import_listings
+        Category.objects.filter(name='Other').delete()
+        result = import_listings([{'title': 'Nowhere', 'starting_price': '5'},
+                                  {'title': 'Elsewhere', 'starting_price': '5', 'category': 'Garden'}], self.seller)
+        self.assertEqual((result.created, result.failed), (0, 2))
+        self.assertIn("no 'Other' category", result.errors[0][1])
+        self.assertIn("Unknown category 'Garden'", result.errors[1][1])
+        self.assertEqual(list(Category.objects.values_list('name', flat=True)), ['Home & Garden'])
+
+    def test_xlsx_upload_and_bad_file(self):
+        """Test XLSX files are imported and unreadable files are rejected"""
+        from openpyxl import Workbook
+        workbook = Workbook()
+        workbook.active.append(['title', 'starting_price', 'ends_at'])
+        workbook.active.append(['Globe', 40, timezone.now().replace(tzinfo=None) + timedelta(days=2)])
+        content = BytesIO()
+        workbook.save(content)
+
+        self.upload('catalog.xlsx', content.getvalue())
+        self.assertIsNotNone(AuctionListing.objects.get(title='Globe').ends_at)
+
+        response = self.upload('catalog.xlsx', b'not a workbook')
+        self.assertIsNone(response.context['result'])
+        self.assertIn('Could not read', [str(m) for m in get_messages(response.wsgi_request)][0])
+
+    def test_streaming_export(self):
+        """Test listings and bids export as streamed CSV and as XLSX"""
+        listing = AuctionListing.objects.create(owner=self.seller, title='Exported', starting_price=5.00)
+        other = User.objects.create_user(username='exportbidder', password='testpass123')
+        Bid.objects.create(bidder=other, listing=listing, amount=7.00)
+        self.client.login(username='catalog', password='testpass123')
+
+        response = self.client.get(reverse('export_listings'))
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('Exported', lines[1])
+
+        response = self.client.get(reverse('export_bids'))
+        self.assertIn('exportbidder', b''.join(response.streaming_content).decode())
+
+        response = self.client.get(reverse('export_listings'), {'format': 'xlsx'})
+        from openpyxl import load_workbook
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(workbook.active['B2'].value, 'Exported')
+
+    def test_commands_round_trip(self):
+        """Test a CSV exported by export_listings can be imported by import_listings"""
+        import os
+        import tempfile
+        AuctionListing.objects.create(owner=self.seller, title='Round trip', starting_price=9.00)
+        out = StringIO()
+        call_command('export_listings', '-', stdout=out)
+        self.assertIn('Round trip', out.getvalue())
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'catalog.csv')
+            with open(path, 'w') as fh:
+                fh.write(self.CSV)
+            out = StringIO()
+            call_command('import_listings', path, owner='catalog', stdout=out, stderr=StringIO())
+        self.assertIn('Imported 2 listing(s), rejected 2 row(s).', out.getvalue())
+
+
+    def test_unreadable_row_after_first_chunk_reports_committed_rows(self):
+        """Test a file that breaks after some chunks were committed reports how many were kept"""
+        import os
+        import tempfile
+        rows = ''.join(f"Lamp {i},{'x' * 400},5\n" for i in range(40))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'catalog.csv')
+            with open(path, 'wb') as fh:
+                fh.write(f"title,description,starting_price\n{rows}".encode() + b'Broken \xff,,5\n')
+            with self.assertRaises(CommandError) as error:
+                call_command('import_listings', path, owner='catalog', batch_size=2, stdout=StringIO())
+
+        created = AuctionListing.objects.count()
+        self.assertGreater(created, 0)
+        self.assertIn('Could not read the CSV file', str(error.exception))
+        self.assertIn(f'({created} listing(s) were imported before the error)', str(error.exception))
+
+class ApiV1Test(TestCase):
+    def setUp(self):
+        """Set up listings, a bid, a watchlist entry and a notification"""
+        self.owner = User.objects.create_user(username='apiseller', password='testpass123')
+        self.buyer = User.objects.create_user(username='apibuyer', password='testpass123')
+        self.category = Category.objects.create(name='Electronics')
+        self.listings = [
+            AuctionListing.objects.create(owner=self.owner, title=f'Api listing {i}', starting_price=10.00,
+                                          category=self.category if i % 2 else None,
+                                          description='Described in detail. ' * 10)
+            for i in range(5)
+        ]
+        self.listing = self.listings[0]
+        submit_bid(self.listing.pk, self.buyer, 15.00)
+        Watchlist.objects.create(user=self.buyer, listing=self.listings[1])
+        Notification.objects.create(user=self.buyer, listing=self.listings[2])
+
+    def test_listing_list_pages_and_filters(self):
+        """Test listings page with keyset cursors and filter by category"""
+        url = reverse('api_v1:listing_list')
+        response = self.client.get(url, {'page_size': 2})
+        self.assertEqual(response.status_code, 200)
+        seen = [row['id'] for row in response.json()['results']]
+        next_url = response.json()['next']
+        while next_url:
+            page = self.client.get(next_url).json()
+            seen += [row['id'] for row in page['results']]
+            next_url = page['next']
+        self.assertEqual(sorted(seen), sorted(l.pk for l in self.listings))
+
+        rows = self.client.get(url, {'category': 'Electronics'}).json()['results']
+        self.assertEqual({row['category'] for row in rows}, {'Electronics'})
+        self.assertEqual(self.client.get(url, {'cursor': 'junk'}).status_code, 404)
+
+    def test_detail_and_bids(self):
+        """Test listing detail carries the bid state and bid history lists the bid"""
+        data = self.client.get(reverse('api_v1:listing_detail', args=[self.listing.pk])).json()
+        self.assertEqual((data['current_price'], data['bid_count'], data['high_bidder']), (15.0, 1, 'apibuyer'))
+        self.assertIsNone(data['category'])
+
+        bids = self.client.get(reverse('api_v1:listing_bids', args=[self.listing.pk])).json()['results']
+        self.assertEqual([(bid['bidder'], bid['amount']) for bid in bids], [('apibuyer', 15.0)])
+        self.assertEqual(self.client.get(reverse('api_v1:listing_detail', args=[999999])).status_code, 404)
+
+    def test_user_endpoints_require_login(self):
+        """Test watchlist and notifications are per user and need authentication"""
+        self.assertEqual(self.client.get(reverse('api_v1:watchlist')).status_code, 403)
+        self.client.login(username='apibuyer', password='testpass123')
+        watchlist = self.client.get(reverse('api_v1:watchlist')).json()['results']
+        self.assertEqual([row['id'] for row in watchlist], [self.listings[1].pk])
+        notifications = self.client.get(reverse('api_v1:notifications')).json()['results']
+        self.assertEqual([row['listing'] for row in notifications], [self.listings[2].pk])
+
+    def test_conditional_requests(self):
+        """Test ETags answer 304 until a bid changes the listing"""
+        url = reverse('api_v1:listing_detail', args=[self.listing.pk])
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertIn('Last-Modified', response)
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(reverse('api_v1:listing_list'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        other = User.objects.create_user(username='apirival', password='testpass123')
+        submit_bid(self.listing.pk, other, 20.00)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_category_rename_changes_validators(self):
+        """Test renaming a category re-renders the listings that show its name"""
+        urls = [reverse('api_v1:listing_list'), reverse('api_v1:listing_detail', args=[self.listings[1].pk])]
+        etags = [self.client.get(url)['ETag'] for url in urls]
+
+        self.category.name = 'Gadgets'
+        self.category.save()
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, 'Gadgets')
+
+    def test_payload_smaller_than_html(self):
+        """Test the API listing page is a fraction of the HTML index"""
+        api = self.client.get(reverse('api_v1:listing_list'))
+        html = self.client.get(reverse('index'))
+        self.assertLess(len(api.content) * 3, len(html.content))
+
+
+class ConditionalPageTest(TestCase):
+    def setUp(self):
+        """Set up a listing with a comment and a logged-in bidder"""
+        self.owner = User.objects.create_user(username='pollseller', password='testpass123')
+        self.bidder = User.objects.create_user(username='pollbidder', password='testpass123')
+        self.listing = AuctionListing.objects.create(owner=self.owner, title='Polled listing', starting_price=10.00)
+        Comment.objects.create(creator=self.owner, listing=self.listing, body='First!')
+        self.pages = [reverse('index'), reverse('listing_page', args=[self.listing.pk])]
+        cache.clear()
+
+    def test_repeat_poll_renders_nothing(self):
+        """Test a matching If-None-Match is answered 304 without rendering a template"""
+        for client_logged_in in (False, True):
+            if client_logged_in:
+                self.client.login(username='pollbidder', password='testpass123')
+            for url in self.pages:
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertIn('private', response['Cache-Control'])
+
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+                self.assertEqual(response.content, b'')
+
+    def test_login_again_renders_fresh_csrf_token(self):
+        """Test a page cached before logging out and in again is not reused with its stale CSRF token"""
+        import re
+        self.bidder.email_confirmed = True
+        self.bidder.save(update_fields=['email_confirmed'])
+        client = Client(enforce_csrf_checks=True)
+        page = self.pages[1]
+
+        def log_in():
+            token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"',
+                              client.get(reverse('login')).content.decode()).group(1)
+            client.post(reverse('login'), {'username': 'pollbidder', 'password': 'testpass123',
+                                           'csrfmiddlewaretoken': token})
+
+        log_in()
+        etag = client.get(page)['ETag']
+        client.get(reverse('logout'))
+        log_in()
+
+        response = client.get(page, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        token = re.search(r'name="csrfmiddlewaretoken" value="([^"]+)"', response.content.decode()).group(1)
+        response = client.post(page, {'amount': '15.00', 'csrfmiddlewaretoken': token})
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.bidder.bid_set.get().amount, Decimal('15.00'))
+
+    def test_anonymous_last_modified(self):
+        """Test anonymous pages carry Last-Modified and honour If-Modified-Since"""
+        for url in self.pages:
+            last_modified = self.client.get(url)['Last-Modified']
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+            self.assertEqual(response.status_code, 304)
+
+        self.client.login(username='pollbidder', password='testpass123')
+        self.assertNotIn('Last-Modified', self.client.get(self.pages[0]))
+
+    def test_changes_invalidate(self):
+        """Test bids, comments, watchlist changes and notifications change the ETag"""
+        self.client.login(username='pollbidder', password='testpass123')
+        index, page = self.pages
+        changes = [
+            (lambda: submit_bid(self.listing.pk, self.bidder, 15.00), [index, page]),
+            (lambda: Comment.objects.create(creator=self.owner, listing=self.listing, body='Second'), [page]),
+            (lambda: Watchlist.objects.create(user=self.bidder, listing=self.listing), [index, page]),
+            (lambda: notify_users([Notification(user=self.bidder, listing=self.listing)]), [index, page]),
+        ]
+        for change, affected in changes:
+            etags = {url: self.client.get(url)['ETag'] for url in self.pages}
+            change()
+            for url in self.pages:
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200 if url in affected else 304, url)
+
+    def test_pending_messages_force_render(self):
+        """Test a page with flash messages waiting is rendered even if unchanged"""
+        url = self.pages[1]
+        self.client.login(username='pollbidder', password='testpass123')
+        etag = self.client.get(url)['ETag']
+        self.client.post(url, {'amount': 1.00})  # rejected, leaves an error message
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(list(response.context['messages']))
+
+    def test_validators_cost_one_query(self):
+        """Test a 304 for an anonymous poll costs a single query"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        for url in self.pages:
+            etag = self.client.get(url)['ETag']
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+            self.assertEqual(len(queries), 1)
+
+
+@override_settings(ROOT_URLCONF='AuctionApp.asgi_urls')
+class AsyncViewsTest(TestCase):
+    def setUp(self):
+        """Set up listings in two categories, a watchlist and a notification"""
+        self.owner = User.objects.create_user(username='asyncseller', password='testpass123')
+        self.bidder = User.objects.create_user(username='asyncbidder', password='testpass123')
+        categories = [Category.objects.create(name=name) for name in ('Electronics', 'Fashion')]
+        self.listings = [AuctionListing.objects.create(owner=self.owner, title=f'Async listing {i}',
+                                                       starting_price=10.00, category=categories[i % 2])
+                         for i in range(3)]
+        self.listing = self.listings[0]
+        submit_bid(self.listing.pk, self.bidder, 12.00)
+        Comment.objects.create(creator=self.owner, listing=self.listing, body='Still available')
+        Watchlist.objects.create(user=self.bidder, listing=self.listing)
+        notify_users([Notification(user=self.bidder, listing=self.listings[1])])
+        cache.clear()
+
+    def get(self, url, urlconf):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        cache.clear()
+        with self.settings(ROOT_URLCONF=urlconf), CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        return response, len(queries)
+
+    def test_read_pages_are_routed_to_async_views(self):
+        """Test the ASGI URLconf serves the read-heavy pages, and only those, with async views"""
+        import asyncio
+        from django.urls import resolve
+
+        for url, name in ((reverse('index'), 'aindex'), (reverse('watchlist'), 'awatchlist_page'),
+                          (reverse('notifications'), 'anotifications'),
+                          (reverse('listing_page', args=[self.listing.pk]), 'alisting_page')):
+            func = resolve(url).func
+            self.assertTrue(asyncio.iscoroutinefunction(func), url)
+            self.assertEqual(func.__name__, name)
+        self.assertFalse(asyncio.iscoroutinefunction(resolve(reverse('search')).func))
+
+    def test_pages_match_sync_views(self):
+        """Test each async page renders what its sync view renders, without more queries"""
+        self.client.login(username='asyncbidder', password='testpass123')
+        pages = [
+            (reverse('index'), ['listings', 'Categories', 'category_counts', 'total_listings', 'watched_ids']),
+            (reverse('index') + '?q=Fashion', ['listings', 'category_counts', 'selected_category']),
+            (reverse('listing_page', args=[self.listing.pk]), ['listing_page', 'comments', 'Bidders',
+                                                              'is_in_watchlist']),
+            (reverse('watchlist'), ['watched_listings']),
+            (reverse('notifications'), ['notifications']),
+        ]
+        for url, keys in pages:
+            sync_response, sync_queries = self.get(url, 'AuctionApp.urls')
+            async_response, async_queries = self.get(url, 'AuctionApp.asgi_urls')
+            self.assertEqual(async_response.status_code, 200, url)
+            self.assertEqual(async_response.templates[0].name, sync_response.templates[0].name)
+            for key in keys:
+                expected, actual = sync_response.context[key], async_response.context[key]
+                if hasattr(expected, '__iter__') and not isinstance(expected, (str, dict)):
+                    expected, actual = list(expected), list(actual)
+                self.assertEqual(actual, expected, f'{url} {key}')
+            self.assertLessEqual(async_queries, sync_queries, url)
+        self.assertEqual(self.bidder.notification_set.filter(is_read=False).count(), 0)
+
+    def test_conditional_get_and_bid(self):
+        """Test the async listing page answers repeat polls with 304 and still takes bids"""
+        url = reverse('listing_page', args=[self.listing.pk])
+        self.client.login(username='asyncbidder', password='testpass123')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.templates, [])
+
+        User.objects.create_user(username='asyncrival', password='testpass123')
+        self.client.login(username='asyncrival', password='testpass123')
+        response = self.client.post(url, {'amount': 20.00})
+        self.assertRedirects(response, url)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_price, Decimal('20.00'))
+        self.client.login(username='asyncbidder', password='testpass123')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_login_required(self):
+        """Test the async watchlist and notifications send anonymous users to the login page"""
+        for name in ('watchlist', 'notifications'):
+            response = self.client.get(reverse(name))
+            self.assertRedirects(response, f"{reverse('login')}?next={reverse(name)}")
+
+    async def test_served_over_asgi_requests(self):
+        """Test the async pages under the async test client, whose requests are ASGI requests"""
+        await self.async_client.aforce_login(self.bidder)
+        response = await self.async_client.get(reverse('index'))
+        self.assertContains(response, 'Async listing 2')
+        response = await self.async_client.get(reverse('listing_page', args=[self.listing.pk]))
+        self.assertContains(response, 'Still available')
+        response = await self.async_client.get(reverse('watchlist'))
+        self.assertContains(response, 'Async listing 0')
+
+
+class HotQueryIndexTest(TestCase):
+    def setUp(self):
+        """Set up a listing in a category and a watcher"""
+        self.owner = User.objects.create_user(username='indexseller', password='testpass123')
+        self.watcher = User.objects.create_user(username='indexwatcher', password='testpass123')
+        self.category = Category.objects.create(name='Indexed')
+        self.listing = AuctionListing.objects.create(owner=self.owner, title='Indexed listing',
+                                                     starting_price=10.00, category=self.category)
+        cache.clear()
+
+    def test_watchlist_entries_are_unique(self):
+        """Test a listing can be watched once, even on a repeated submit"""
+        from django.db import IntegrityError, transaction
+        self.client.login(username='indexwatcher', password='testpass123')
+        url = reverse('add_watchlist', args=[self.listing.pk])
+        self.client.post(url)
+        response = self.client.post(url, follow=True)
+        self.assertEqual(Watchlist.objects.filter(user=self.watcher).count(), 1)
+        self.assertIn('Item already in watchlist', [str(m) for m in response.context['messages']])
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Watchlist.objects.create(user=self.watcher, listing=self.listing)
+
+    def test_hot_queries_use_indexes(self):
+        """Test the listing feed, bid history, comments and watchlist lookups search an index"""
+        from django.db import connection
+        if connection.vendor != 'sqlite':
+            self.skipTest('plans on tiny tables are only predictable on SQLite')
+        queries = {
+            'listing_category_feed_idx': AuctionListing.objects.filter(
+                is_active=True, category=self.category).order_by('-created', 'id'),
+            'bid_listing_amount_idx': Bid.objects.filter(listing=self.listing),
+            'comment_listing_created_idx': Comment.objects.filter(listing=self.listing),
+            'auctions_watchlist': Watchlist.objects.filter(user=self.watcher, listing=self.listing),
+        }
+        for index, queryset in queries.items():
+            plan = queryset.explain()
+            self.assertIn('USING INDEX', plan)
+            self.assertIn(index, plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+
+class WatchlistTest(TestCase):
+    def setUp(self):
+        """Set up a watcher, another seller's listings and one of the watcher's own"""
+        self.seller = User.objects.create_user(username='wlseller', password='testpass123')
+        self.watcher = User.objects.create_user(username='wlwatcher', password='testpass123')
+        self.listings = [
+            AuctionListing.objects.create(owner=self.seller, title=f'Watchable {i}', starting_price=10.00)
+            for i in range(4)
+        ]
+        self.own = AuctionListing.objects.create(owner=self.watcher, title='Own listing', starting_price=5.00)
+        cache.clear()
+        self.client.login(username='wlwatcher', password='testpass123')
+
+    def bulk(self, action, listings, **extra):
+        data = {'action': action, 'listing': [listing.pk for listing in listings]}
+        return self.client.post(reverse('bulk_watchlist'), data, **extra)
+
+    def test_watchlist_page_is_one_listing_query(self):
+        """Test the watchlist page loads its cards with a single joined query"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        for listing in self.listings[:3]:
+            Watchlist.objects.create(user=self.watcher, listing=listing)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('watchlist'))
+        self.assertCountEqual(response.context['watched_listings'], self.listings[:3])
+        listing_queries = [q for q in queries if 'auctions_auctionlisting' in q['sql']]
+        self.assertEqual(len(listing_queries), 1)
+        self.assertIn('auctions_watchlist', listing_queries[0]['sql'])
+
+    def test_watched_ids_are_cached(self):
+        """Test watched ids cost one query, then none, and follow watchlist changes"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(watched_listing_ids(self.watcher), frozenset())
+        self.assertEqual(len(queries), 1)
+
+        watcher = User.objects.get(pk=self.watcher.pk)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertFalse(check_watchlist_status(watcher, self.listings[0]))
+            self.assertFalse(check_watchlist_status(watcher, self.listings[1]))
+        self.assertEqual(len(queries), 0)
+
+        Watchlist.objects.create(user=self.watcher, listing=self.listings[0])
+        self.assertEqual(watched_listing_ids(User.objects.get(pk=self.watcher.pk)), {self.listings[0].pk})
+        Watchlist.objects.filter(user=self.watcher).delete()
+        self.assertEqual(watched_listing_ids(User.objects.get(pk=self.watcher.pk)), frozenset())
+
+    def test_stale_cached_set_of_another_process_is_ignored(self):
+        """Test a watchlist change is seen even where the cached set was never deleted"""
+        from django.core.cache import cache
+        stale_keys = set()
+        for _ in range(2):
+            watcher = User.objects.get(pk=self.watcher.pk)
+            self.assertEqual(watched_listing_ids(watcher), frozenset())
+            stale_keys.add(f'watchlist:{watcher.pk}:{watcher.watchlist_version}')
+        self.assertEqual(len(stale_keys), 1)
+
+        Watchlist.objects.create(user=self.watcher, listing=self.listings[0])
+        # another process's local cache still holds the set from before
+        cache.set(stale_keys.pop(), frozenset())
+        watcher = User.objects.get(pk=self.watcher.pk)
+        self.assertEqual(watched_listing_ids(watcher), {self.listings[0].pk})
+
+    def test_feed_marks_watched_listings(self):
+        """Test index cards show the watched badge without querying the watchlist"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        Watchlist.objects.create(user=self.watcher, listing=self.listings[0])
+        self.client.get(reverse('index'))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('index'))
+        self.assertContains(response, 'class="watched-badge"', count=1)
+        self.assertFalse([q for q in queries if 'auctions_watchlist' in q['sql']])
+
+    def test_bulk_add_and_remove(self):
+        """Test bulk toggles skip own and already watched listings and return the new set"""
+        Watchlist.objects.create(user=self.watcher, listing=self.listings[0])
+        response = self.bulk('add', self.listings[:3] + [self.own], HTTP_ACCEPT='application/json')
+        self.assertEqual(response.json(), {'changed': 2, 'watched': sorted(l.pk for l in self.listings[:3])})
+
+        response = self.bulk('remove', self.listings[1:], follow=True)
+        self.assertRedirects(response, reverse('watchlist'))
+        self.assertIn('Removed 2 listing(s)', [str(m) for m in response.context['messages']])
+        self.assertEqual(list(Watchlist.objects.values_list('listing', flat=True)), [self.listings[0].pk])
+
+    def test_bulk_rejects_bad_requests(self):
+        """Test bulk toggles need POST, a valid action and a bounded list of ids"""
+        self.assertEqual(self.client.get(reverse('bulk_watchlist')).status_code, 405)
+        self.assertEqual(self.bulk('toggle', self.listings, HTTP_ACCEPT='application/json').status_code, 400)
+        response = self.client.post(reverse('bulk_watchlist'), {'action': 'add', 'listing': 'x'},
+                                    HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 400)
+        with override_settings(WATCHLIST_BULK_LIMIT=2):
+            self.assertEqual(self.bulk('add', self.listings, HTTP_ACCEPT='application/json').status_code, 400)
+        self.assertFalse(Watchlist.objects.exists())
+
+
+class CursorPaginationTest(TestCase):
+    def setUp(self):
+        """Set up more listings than fit on one page"""
+        self.owner = User.objects.create_user(username='pager', password='testpass123')
+        self.listings = [
+            AuctionListing.objects.create(owner=self.owner, title=f'Paged Listing {i}', starting_price=5.00)
+            for i in range(7)
+        ]
+        # give some listings the same timestamp so the id tie-break is exercised
+        AuctionListing.objects.filter(pk__in=[l.pk for l in self.listings[:4]]).update(
+            created=self.listings[0].created)
+
+    def test_pages_cover_every_listing_once(self):
+        """Test walking the cursors visits each listing exactly once in feed order"""
+        paginator = CursorPaginator(AuctionListing.objects.all(), per_page=3)
+        seen = []
+        cursor = None
+        while True:
+            page = paginator.page(cursor)
+            seen.extend(page.object_list)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+
+        expected = list(AuctionListing.objects.order_by('-created', 'id'))
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        """Test a tampered cursor is rejected by the paginator and ignored by views"""
+        paginator = CursorPaginator(AuctionListing.objects.all(), per_page=3)
+        with self.assertRaises(InvalidCursor):
+            paginator.page('not-a-cursor')
+
+        response = self.client.get(reverse('index'), {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 200)
+
+    def test_crafted_cursor_payloads(self):
+        """Test well-formed cursors holding values encode_cursor never writes are rejected everywhere"""
+        from .utils.pagination import encode_cursor
+        paginator = CursorPaginator(AuctionListing.objects.all(), per_page=3)
+        listing = self.listings[0]
+        for payload in ([[1], 1], [{'a': 1}, 1], [None, 1], ['', 1], [True, 1], ['2026-01-01', 'x'], [1]):
+            cursor = encode_cursor(payload)
+            with self.subTest(payload=payload):
+                with self.assertRaises(InvalidCursor):
+                    paginator.page(cursor)
+                for url, params in ((reverse('index'), {'cursor': cursor}),
+                                    (reverse('listing_page', args=[listing.pk]), {'comments': cursor, 'bids': cursor})):
+                    self.assertEqual(self.client.get(url, params).status_code, 200)
+                for url in (reverse('api_v1:listing_list'), reverse('api_v1:listing_bids', args=[listing.pk])):
+                    self.assertEqual(self.client.get(url, {'cursor': cursor}).status_code, 404)
+
+    @override_settings(LISTINGS_PER_PAGE=5)
+    def test_index_next_page_link(self):
+        """Test the index renders a working next-page link"""
+        response = self.client.get(reverse('index'))
+        self.assertEqual(len(response.context['listings']), 5)
+        next_cursor = response.context['page'].next_cursor
+        self.assertContains(response, f'?cursor={next_cursor}')
+
+        response = self.client.get(reverse('index'), {'cursor': next_cursor})
+        self.assertEqual(len(response.context['listings']), 2)
+        self.assertFalse(response.context['page'].has_next)
+
+
+class BidEngineTest(TestCase):
+    def setUp(self):
+        """Set up a listing and two bidders"""
+        self.owner = User.objects.create_user(username='engine_owner', password='testpass123')
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+        self.listing = AuctionListing.objects.create(owner=self.owner, title='Engine Listing', starting_price=10.00)
+
+    def test_results(self):
+        """Test the engine accepts and rejects bids with clear results"""
+        result = submit_bid(self.listing.pk, self.alice, 9.00)
+        self.assertEqual(result.status, BidResult.REJECTED)
+        self.assertIn('starting price', result.message)
+
+        result = submit_bid(self.listing.pk, self.alice, 12.00)
+        self.assertTrue(result.accepted)
+        self.assertEqual(result.bid.amount, 12.00)
+
+        result = submit_bid(self.listing.pk, self.alice, 15.00)
+        self.assertEqual(result.status, BidResult.REJECTED)
+        self.assertIn('already have the highest bid', result.message)
+
+        result = submit_bid(self.listing.pk, self.owner, 20.00)
+        self.assertEqual(result.status, BidResult.REJECTED)
+
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.version, 1)
+        self.assertEqual(self.listing.high_bidder, self.alice)
+
+    def test_stale_version_is_retried(self):
+        """Test a lost compare-and-swap is retried against the fresh listing"""
+        from unittest import mock
+        from .utils import bid_engine
+
+        original_attempt = bid_engine._attempt_bid
+        calls = []
+
+        def racing_attempt(listing_id, bidder, amount):
+            # let another bidder win between our read and our write on the first attempt
+            if not calls:
+                calls.append(listing_id)
+                original_attempt(listing_id, self.bob, 30.00)
+                return None
+            return original_attempt(listing_id, bidder, amount)
+
+        with mock.patch.object(bid_engine, '_attempt_bid', racing_attempt):
+            result = submit_bid(self.listing.pk, self.alice, 25.00)
+
+        self.assertEqual(result.status, BidResult.REJECTED)
+        self.assertIn('current highest bid', result.message)
+
+    def test_conflict_after_retries(self):
+        """Test a listing that stays contended yields a conflict result"""
+        from unittest import mock
+        from .utils import bid_engine
+
+        with mock.patch.object(bid_engine, '_attempt_bid', return_value=None):
+            result = submit_bid(self.listing.pk, self.alice, 25.00, max_retries=2)
+
+        self.assertEqual(result.status, BidResult.CONFLICT)
+        self.assertFalse(Bid.objects.exists())
+
+    def test_closed_listing_rejects_bids(self):
+        """Test bids are rejected once the auction is closed"""
+        handle_auction_close(self.listing)
+        result = submit_bid(self.listing.pk, self.alice, 50.00)
+        self.assertEqual(result.status, BidResult.REJECTED)
+        self.assertIn('closed', result.message)
+
+    def test_close_reads_winner_from_locked_row(self):
+        """Test a close started from a stale listing sells to the latest bid and keeps its state"""
+        stale = AuctionListing.objects.get(pk=self.listing.pk)
+        self.assertTrue(submit_bid(self.listing.pk, self.alice, 12.00).accepted)
+        self.assertTrue(submit_bid(self.listing.pk, self.bob, 15.00).accepted)
+
+        self.assertEqual(handle_auction_close(stale), self.bob)
+        self.assertEqual(stale.owner, self.bob)
+        self.assertEqual(stale.starting_price, Decimal('15.00'))
+        self.assertFalse(stale.is_active)
+        self.assertIsNone(handle_auction_close(stale))  # closed already
+        self.assertEqual(Notification.objects.filter(listing=self.listing).count(), 1)
+
+
+class ProxyBidTest(TestCase):
+    def setUp(self):
+        """Set up a listing starting at $10 and three bidders"""
+        self.owner = User.objects.create_user(username='proxy_owner', password='testpass123')
+        self.alice, self.bob, self.carol = [User.objects.create_user(username=name, password='testpass123')
+                                            for name in ('proxy_alice', 'proxy_bob', 'proxy_carol')]
+        self.listing = AuctionListing.objects.create(owner=self.owner, title='Proxy Listing', starting_price=10.00)
+
+    def visible_bids(self):
+        return [(bid.bidder, bid.amount) for bid in Bid.objects.filter(listing=self.listing).order_by('id')]
+
+    def assertLeads(self, bidder, price):
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.high_bidder, self.listing.current_price), (bidder, Decimal(price)))
+        self.assertEqual(self.listing.bid_count, Bid.objects.filter(listing=self.listing).count())
+        self.assertEqual(get_last_bid(self.listing).bidder, bidder)
+        self.assertEqual(reconcile_listing_bid_state(), 0)
+
+    def test_competing_maximums_write_only_the_resulting_bids(self):
+        """Test the higher maximum leads one increment over the other, without intermediate bids"""
+        result = submit_max_bid(self.listing.pk, self.alice, 50)
+        self.assertIn('highest bidder at $11.00', result.message)
+        self.assertLeads(self.alice, '11.00')
+
+        result = submit_max_bid(self.listing.pk, self.bob, 30)
+        self.assertTrue(result.accepted)
+        self.assertIn('higher than yours', result.message)
+        self.assertEqual(result.bid.amount, Decimal('30.00'))
+        self.assertLeads(self.alice, '31.00')
+
+        submit_max_bid(self.listing.pk, self.carol, 100)
+        self.assertLeads(self.carol, '51.00')
+        self.assertEqual(self.visible_bids(), [
+            (self.alice, Decimal('11.00')), (self.bob, Decimal('30.00')), (self.alice, Decimal('31.00')),
+            (self.alice, Decimal('50.00')), (self.carol, Decimal('51.00'))])
+
+    def test_equal_maximums_go_to_the_earliest(self):
+        """Test of two equal maximums the one set first wins, at that amount"""
+        submit_max_bid(self.listing.pk, self.alice, 40)
+        submit_max_bid(self.listing.pk, self.bob, 40)
+        self.assertLeads(self.alice, '40.00')
+
+        # a plain bid matching a maximum loses to it as well
+        submit_max_bid(self.listing.pk, self.carol, 60)
+        result = submit_bid(self.listing.pk, self.bob, 60)
+        self.assertIn('maximum bid is higher', result.message)
+        self.assertLeads(self.carol, '60.00')
+
+        # placed_at decides, not which maximum the engine saw first
+        other = AuctionListing.objects.create(owner=self.owner, title='Tied', starting_price=10.00)
+        ProxyBid.objects.create(listing=other, bidder=self.alice, max_amount=25,
+                                placed_at=timezone.now() - timedelta(minutes=1))
+        submit_max_bid(other.pk, self.bob, 25)
+        other.refresh_from_db()
+        self.assertEqual((other.high_bidder, other.current_price), (self.alice, Decimal('25.00')))
+
+    def test_plain_bids_trigger_maximums(self):
+        """Test a plain bid is answered by a higher maximum in the same transaction"""
+        submit_max_bid(self.listing.pk, self.alice, 50)
+        result = submit_bid(self.listing.pk, self.bob, 20)
+        self.assertTrue(result.accepted)
+        self.assertEqual(result.bid.bidder, self.bob)
+        self.assertLeads(self.alice, '21.00')
+
+        result = submit_bid(self.listing.pk, self.bob, 55)
+        self.assertEqual(result.message, 'Bid placed successfully!')
+        self.assertLeads(self.bob, '55.00')
+
+    def test_leader_raising_maximum_places_no_bid(self):
+        """Test raising a leading maximum writes nothing visible and keeps its place in the queue"""
+        submit_max_bid(self.listing.pk, self.alice, 50)
+        self.listing.refresh_from_db()
+        version = self.listing.version
+
+        result = submit_max_bid(self.listing.pk, self.alice, 80)
+        self.assertTrue(result.accepted)
+        self.assertIsNone(result.bid)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.version, version)
+        self.assertEqual(Bid.objects.count(), 1)
+
+        submit_max_bid(self.listing.pk, self.bob, 80)
+        self.assertLeads(self.alice, '80.00')
+
+        result = submit_max_bid(self.listing.pk, self.bob, 70)
+        self.assertEqual(result.status, BidResult.REJECTED)
+        self.assertEqual(ProxyBid.objects.get(bidder=self.bob).max_amount, Decimal('80.00'))
+
+    def test_queries_do_not_grow_with_losing_maximums(self):
+        """Test only maximums that can reach the price are read and resolution costs the same queries"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        submit_max_bid(self.listing.pk, self.alice, 50)
+        with CaptureQueriesContext(connection) as few:
+            submit_bid(self.listing.pk, self.bob, 20)
+
+        bidders = [User.objects.create_user(username=f'proxy_loser_{i}', password='testpass123') for i in range(20)]
+        ProxyBid.objects.bulk_create(ProxyBid(listing=self.listing, bidder=bidder, max_amount=12) for bidder in bidders)
+        with CaptureQueriesContext(connection) as many:
+            submit_bid(self.listing.pk, self.carol, 30)
+
+        self.assertEqual(len(few), len(many))
+        self.assertLeads(self.alice, '31.00')
+
+    def test_bid_form_sets_maximum(self):
+        """Test the listing page form sets a maximum bid when asked to bid automatically"""
+        self.client.login(username='proxy_alice', password='testpass123')
+        response = self.client.post(reverse('listing_page', args=[self.listing.pk]),
+                                    {'amount': '45.00', 'automatic': 'on'}, follow=True)
+        self.assertContains(response, 'Maximum bid of $45.00 set')
+        self.assertLeads(self.alice, '11.00')
+
+        handle_auction_close(self.listing)
+        self.client.post(reverse('auction_control', args=[self.listing.pk]))
+        self.assertFalse(ProxyBid.objects.exists())
+
+
+@override_settings(ORDER_BOOK_ENABLED=True, ORDER_BOOK_HOT_BIDS_PER_MINUTE=3, ORDER_BOOK_FLUSH_INTERVAL=0,
+                   ORDER_BOOK_FLUSH_SIZE=100)
+class OrderBookTest(TestCase):
+    def setUp(self):
+        """Set up a listing starting at $10 and two bidders taking turns"""
+        self.owner = User.objects.create_user(username='book_owner', password='testpass123')
+        self.bidders = [User.objects.create_user(username=f'book_bidder_{i}', password='testpass123')
+                        for i in range(2)]
+        self.listing = AuctionListing.objects.create(owner=self.owner, title='Hot listing', starting_price=10.00)
+        order_books.reset()
+        self.addCleanup(order_books.reset)
+
+    def bid(self, amount, bidder=None):
+        bidder = bidder or self.bidders[int(amount) % 2]
+        # the listing page passes the id from the URL, as a string
+        return submit_bid(str(self.listing.pk) if amount % 2 else self.listing.pk, bidder, amount)
+
+    def test_hot_listing_bids_in_memory_and_writes_behind_in_order(self):
+        """Test a hot listing takes bids without queries and a flush writes them in order"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        for amount in (11, 12, 13):
+            self.assertTrue(self.bid(amount).accepted)
+        self.assertEqual(Bid.objects.count(), 2)  # the third bid loaded the book
+
+        with CaptureQueriesContext(connection) as queries:
+            for amount in (14, 15, 16):
+                self.assertTrue(self.bid(amount).accepted)
+            self.assertEqual(self.bid(15).status, BidResult.REJECTED)
+            self.assertIn('already have the highest', self.bid(17, self.bidders[0]).message)
+        self.assertEqual(len(queries), 0)
+
+        self.listing.refresh_from_db()
+        version = self.listing.version
+        self.assertEqual(order_books.flush(), 4)
+        self.assertEqual(order_books.flush(), 0)
+        self.assertEqual(list(Bid.objects.filter(listing=self.listing).order_by('id').values_list('amount', flat=True)),
+                         [Decimal(amount) for amount in range(11, 17)])
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.current_price, self.listing.bid_count, self.listing.high_bidder),
+                         (Decimal('16.00'), 6, self.bidders[0]))
+        self.assertEqual(self.listing.version, version + 1)
+        self.assertEqual(reconcile_listing_bid_state(), 0)
+
+    @override_settings(ORDER_BOOK_FLUSH_SIZE=2)
+    def test_flushes_by_size(self):
+        """Test the request that fills a batch writes it"""
+        for amount in (11, 12, 13, 14):
+            self.bid(amount)
+        self.assertEqual(Bid.objects.count(), 4)
+
+    def test_cold_listings_and_proxy_bids_stay_on_the_database_path(self):
+        """Test bids below the heat threshold or next to maximum bids are written right away"""
+        self.bid(11)
+        self.assertEqual(Bid.objects.count(), 1)
+
+        ProxyBid.objects.create(listing=self.listing, bidder=self.owner, max_amount=5)
+        for amount in (12, 13, 14):
+            self.bid(amount)
+        self.assertEqual(Bid.objects.count(), 4)
+
+    def test_divergent_listing_is_resynced(self):
+        """Test a flush that finds the listing changed elsewhere drops its bids and recomputes its state"""
+        for amount in (11, 12, 13, 14):
+            self.bid(amount)
+        # another process bids on the same listing through the database
+        AuctionListing.objects.filter(pk=self.listing.pk).update(version=F('version') + 1)
+        Bid.objects.create(listing=self.listing, bidder=self.bidders[1], amount=20)
+
+        with self.assertLogs('auctions.utils.order_book', 'WARNING'):
+            self.assertEqual(order_books.flush(), 0)
+        self.assertFalse(Bid.objects.filter(amount__in=(13, 14)).exists())
+        self.listing.refresh_from_db()
+        self.assertEqual((self.listing.current_price, self.listing.bid_count), (Decimal('20.00'), 3))
+        self.assertEqual(self.bid(15).status, BidResult.REJECTED)
+
+    def test_bids_of_a_listing_closed_meanwhile_are_dropped(self):
+        """Test a flush stores nothing for a listing closed behind the book's back"""
+        for amount in (11, 12, 13, 14):
+            self.bid(amount)
+        AuctionListing.objects.filter(pk=self.listing.pk).update(is_active=False)
+
+        with self.assertLogs('auctions.utils.order_book', 'WARNING'):
+            self.assertEqual(order_books.flush(), 0)
+        self.assertEqual(Bid.objects.count(), 2)
+
+    @override_settings(ORDER_BOOK_FLUSH_SIZE=2)
+    def test_failed_inline_flush_does_not_fail_the_bid(self):
+        """Test a locked database during an inline flush keeps the bids queued and the bid accepted"""
+        from unittest import mock
+        from django.db import OperationalError
+
+        for amount in (11, 12, 13):
+            self.bid(amount)
+        with mock.patch.object(Bid.objects, 'bulk_create', side_effect=OperationalError('database is locked')), \
+                self.assertLogs('auctions.utils.order_book', 'WARNING'):
+            self.assertTrue(self.bid(14).accepted)
+        self.assertEqual(order_books.flush(), 2)
+        self.assertEqual(Bid.objects.count(), 4)
+
+    def test_failed_flush_keeps_the_bids_of_other_listings(self):
+        """Test a flush failing on another error writes the listings that can be and resyncs the rest"""
+        from unittest import mock
+        from django.db import IntegrityError
+
+        other = AuctionListing.objects.create(owner=self.owner, title='Broken listing', starting_price=10.00)
+        for amount in (11, 12, 13, 14):
+            self.bid(amount)
+            submit_bid(other.pk, self.bidders[int(amount) % 2], amount)
+        original_bulk_create = Bid.objects.bulk_create
+
+        def bulk_create(bids, *args, **kwargs):
+            # e.g. a bidder deleted between acceptance and flush
+            if any(bid.listing_id == other.pk for bid in bids):
+                raise IntegrityError('FOREIGN KEY constraint failed')
+            return original_bulk_create(bids, *args, **kwargs)
+
+        with mock.patch.object(Bid.objects, 'bulk_create', bulk_create), \
+                self.assertLogs('auctions.utils.order_book', 'WARNING') as logs:
+            self.assertEqual(order_books.flush(), 2)
+        self.assertIn(f'listings [{other.pk}]; dropped 2 accepted bids', '\n'.join(logs.output))
+        self.assertEqual(Bid.objects.filter(listing=self.listing).count(), 4)
+        other.refresh_from_db()
+        self.assertEqual((other.current_price, other.bid_count), (Decimal('12.00'), 2))
+        self.assertEqual(reconcile_listing_bid_state(), 0)
+        self.assertTrue(submit_bid(other.pk, self.bidders[1], 13).accepted)
+
+    def test_closing_sees_bids_waiting_in_the_book(self):
+        """Test closing an auction writes its pending bids first, so the last bid wins"""
+        for amount in (11, 12, 13, 14):
+            self.bid(amount)
+        self.client.login(username='book_owner', password='testpass123')
+        self.client.post(reverse('auction_control', args=[self.listing.pk]))
+
+        self.listing.refresh_from_db()
+        self.assertFalse(self.listing.is_active)
+        self.assertEqual((self.listing.owner, self.listing.starting_price), (self.bidders[0], Decimal('14.00')))
+        self.assertEqual(self.bid(15).status, BidResult.REJECTED)
+
+
+class MoneyTest(TestCase):
+    def setUp(self):
+        """Set up a listing priced in cents and a bidder"""
+        self.owner = User.objects.create_user(username='moneyseller', password='testpass123')
+        self.bidder = User.objects.create_user(username='moneybidder', password='testpass123')
+        self.listing = AuctionListing.objects.create(owner=self.owner, title='Priced listing', starting_price=0.10)
+
+    def test_to_money(self):
+        """Test amounts become whole cents and junk is rejected"""
+        self.assertEqual(to_money(10.1), Decimal('10.10'))
+        self.assertEqual(to_money('2.675'), Decimal('2.68'))
+        self.assertEqual(format_money(Decimal('1234.5')), '$1,234.50')
+        self.assertEqual(to_money('9999999999.99'), Decimal('9999999999.99'))
+        for junk in ('abc', None, 'NaN', 'Infinity', '1e30', 1e20, '10000000000'):
+            with self.assertRaises(ValueError):
+                to_money(junk)
+
+    def test_bid_comparisons_are_exact(self):
+        """Test a float that only differs by rounding error does not outbid the current price"""
+        self.assertTrue(submit_bid(self.listing.pk, self.bidder, 0.30).accepted)
+        rival = User.objects.create_user(username='moneyrival', password='testpass123')
+        result = submit_bid(self.listing.pk, rival, 0.1 + 0.2)  # 0.30000000000000004
+        self.assertEqual(result.status, BidResult.REJECTED)
+        self.assertIn('$0.30', result.message)
+
+        self.assertTrue(submit_bid(self.listing.pk, rival, '0.31').accepted)
+        self.listing.refresh_from_db()
+        self.assertEqual(self.listing.current_price, Decimal('0.31'))
+        self.assertEqual(Bid.objects.filter(listing=self.listing).first().amount, Decimal('0.31'))
+
+    def test_prices_render_as_money(self):
+        """Test listing pages and cards show dollars and cents"""
+        AuctionListing.objects.filter(pk=self.listing.pk).update(starting_price=1234.5)
+        self.assertContains(self.client.get(reverse('listing_page', args=[self.listing.pk])), '$1,234.50')
+        self.assertContains(self.client.get(reverse('index')), '$1,234.50')
+
+    def test_bid_form_rejects_fractions_of_a_cent(self):
+        """Test the bid form only takes whole cents"""
+        self.assertFalse(BidForm(data={'amount': '10.125'}).is_valid())
+        self.assertEqual(BidForm(data={'amount': '10.12'}).is_valid(), True)
+
+    def test_migration_rounds_stored_doubles(self):
+        """Test the money migration drops fractions of a cent left over from float storage"""
+        from importlib import import_module
+        from types import SimpleNamespace
+        from django.apps import apps
+        from django.db import connection
+        if connection.vendor != 'sqlite':
+            self.skipTest('other databases round while changing the column type')
+        migration = import_module('auctions.migrations.0012_money_decimal_fields')
+        Bid.objects.create(bidder=self.bidder, listing=self.listing, amount=1)
+        with connection.cursor() as cursor:
+            cursor.execute('UPDATE auctions_bid SET amount = 15.099999999')
+            migration.round_to_cents(apps, SimpleNamespace(connection=connection))
+            cursor.execute('SELECT amount FROM auctions_bid')
+            self.assertEqual(cursor.fetchone()[0], 15.1)
+
+
+class BidEngineConcurrencyTest(TransactionTestCase):
+    THREADS = 8
+    BIDS_PER_THREAD = 250
+
+    def test_concurrent_bids_keep_the_maximum(self):
+        """Test thousands of concurrent bids never accept a lower bid after a higher one"""
+        import random
+        import threading
+        import time
+        from django.db import OperationalError, connection
+
+        owner = User.objects.create_user(username='stress_owner', password='testpass123')
+        bidders = [User.objects.create_user(username=f'stress_{i}', password='testpass123')
+                   for i in range(self.THREADS)]
+        listing = AuctionListing.objects.create(owner=owner, title='Stress Listing', starting_price=1.00)
+        start = threading.Barrier(self.THREADS)
+        errors = []
+        results = []
+
+        def read_price():
+            # the shared-cache test database reports table locks instead of waiting
+            while True:
+                try:
+                    return AuctionListing.objects.values_list('current_price', flat=True).get(pk=listing.pk)
+                except OperationalError:
+                    time.sleep(0.001)
+
+        def bid_loop(bidder):
+            rng = random.Random(bidder.pk)
+            try:
+                start.wait()
+                for _ in range(self.BIDS_PER_THREAD):
+                    # bid just above a possibly stale price to force as many races as possible
+                    seen_price = read_price()
+                    amount = seen_price + Decimal(rng.randint(1, 500)) / 100
+                    results.append(submit_bid(listing.pk, bidder, amount, max_retries=50))
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=bid_loop, args=(bidder,)) for bidder in bidders]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(results), self.THREADS * self.BIDS_PER_THREAD)
+        accepted = list(Bid.objects.filter(listing=listing).order_by('id'))
+        self.assertTrue(accepted)
+        self.assertEqual(len(accepted), sum(result.accepted for result in results))
+        amounts = [bid.amount for bid in accepted]
+        self.assertEqual(amounts, sorted(set(amounts)), "a lower bid was accepted after a higher one")
+
+        listing.refresh_from_db()
+        self.assertEqual(listing.current_price, max(amounts))
+        self.assertEqual(listing.high_bidder_id, accepted[-1].bidder_id)
+        self.assertEqual(listing.bid_count, len(accepted))
+        self.assertEqual(listing.version, len(accepted))
+
+
+class EmailQueueTest(TestCase):
+    def test_register_queues_confirmation(self):
+        """Test registration does not send mail inside the request"""
+        self.client.post(reverse('register'), {
+            'username': 'queued',
+            'email': 'queued@test.com',
+            'password': 'newpass123',
+            'confirmation': 'newpass123'
+        })
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutgoingEmail.objects.get().recipients, 'queued@test.com')
+
+    def test_batch_uses_one_connection(self):
+        """Test a batch is delivered over a single backend connection"""
+        from unittest import mock
+        from django.core.mail.backends.locmem import EmailBackend
+
+        for i in range(5):
+            queue_email(f'Subject {i}', 'Body', [f'user{i}@test.com'])
+
+        with mock.patch.object(EmailBackend, 'open', autospec=True) as opened:
+            sent, failed = send_queued_emails(batch_size=10)
+
+        self.assertEqual((sent, failed), (5, 0))
+        self.assertEqual(opened.call_count, 1)
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertFalse(OutgoingEmail.objects.exclude(status=OutgoingEmail.SENT).exists())
+
+    def test_batch_size(self):
+        """Test the worker drains the queue batch by batch"""
+        for i in range(5):
+            queue_email(f'Subject {i}', 'Body', ['user@test.com'])
+
+        self.assertEqual(send_queued_emails(batch_size=2), (2, 0))
+        call_command('send_queued_emails', batch_size=2, stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 5)
+
+    def test_retry_and_dead_letter(self):
+        """Test failed emails back off and are dead-lettered after max attempts"""
+        from unittest import mock
+        from django.core.mail.backends.locmem import EmailBackend
+
+        email = queue_email('Flaky', 'Body', ['user@test.com'])
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=OSError('SMTP down')):
+            self.assertEqual(send_queued_emails(max_attempts=2), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.status, OutgoingEmail.PENDING)
+            self.assertEqual(email.attempts, 1)
+            self.assertGreater(email.next_attempt_at, timezone.now())
+
+            # not due yet, so a second run does nothing
+            self.assertEqual(send_queued_emails(max_attempts=2), (0, 0))
+
+            OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(send_queued_emails(max_attempts=2), (0, 1))
+
+        email.refresh_from_db()
+        self.assertEqual(email.status, OutgoingEmail.DEAD)
+        self.assertIn('SMTP down', email.last_error)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_expired_lease_is_reclaimed(self):
+        """Test emails claimed by a crashed worker become due again after the lease"""
+        from .utils.email_utils import claim_queued_emails
+
+        queue_email('Stuck', 'Body', ['user@test.com'])
+        self.assertEqual(len(claim_queued_emails(10)), 1)
+        self.assertEqual(claim_queued_emails(10), [])
+
+        OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(send_queued_emails(), (1, 0))
+        email = OutgoingEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), (OutgoingEmail.SENT, 1))
+
+    def test_expired_leases_count_as_attempts(self):
+        """Test an email that keeps crashing its worker is dead-lettered"""
+        from .utils.email_utils import claim_queued_emails
+
+        queue_email('Poison', 'Body', ['user@test.com'])
+        for _ in range(2):
+            self.assertEqual(len(claim_queued_emails(10, max_attempts=2)), 1)
+            OutgoingEmail.objects.update(next_attempt_at=timezone.now())
+        self.assertEqual(claim_queued_emails(10, max_attempts=2), [])
+        email = OutgoingEmail.objects.get()
+        self.assertEqual((email.status, email.attempts), (OutgoingEmail.DEAD, 2))
+
+    def test_each_email_is_marked_sent_after_its_delivery(self):
+        """Test a worker crashing mid-batch does not resend what it already delivered"""
+        from unittest import mock
+        from django.core.mail.backends.locmem import EmailBackend
+
+        for i in range(3):
+            queue_email(f'Subject {i}', 'Body', [f'user{i}@test.com'])
+        original_send = EmailBackend.send_messages
+
+        def crash_on_third(backend, messages):
+            if messages[0].subject == 'Subject 2':
+                raise KeyboardInterrupt
+            return original_send(backend, messages)
+
+        with mock.patch.object(EmailBackend, 'send_messages', crash_on_third), \
+                self.assertRaises(KeyboardInterrupt):
+            send_queued_emails()
+        self.assertEqual(OutgoingEmail.objects.filter(status=OutgoingEmail.SENT).count(), 2)
+
+        OutgoingEmail.objects.filter(status=OutgoingEmail.SENDING).update(next_attempt_at=timezone.now())
+        self.assertEqual(send_queued_emails(), (1, 0))
+        self.assertEqual(len(mail.outbox), 3)
+
+
+class RateLimiterTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_parse_rate(self):
+        """Test rate strings are parsed into limit and period"""
+        self.assertEqual(parse_rate('10/m'), (10, 60))
+        self.assertEqual(parse_rate('5/hour'), (5, 3600))
+        with self.assertRaises(ValueError):
+            parse_rate('ten per minute')
+
+    def assert_sliding_window(self, backend):
+        limiter = RateLimiter('test', '4/m', backend=backend)
+        start = 600.0  # beginning of a window
+        self.assertTrue(all(limiter.hit('k', now=start + i) for i in range(4)))
+        self.assertFalse(limiter.hit('k', now=start + 10))
+
+        # early in the next window the previous hits still weigh in
+        self.assertFalse(limiter.hit('k', now=start + 65))
+        # once the previous window has slid out, hits are allowed again
+        self.assertTrue(limiter.hit('k', now=start + 115))
+        # other keys have their own counters
+        self.assertTrue(limiter.hit('other', now=start + 10))
+
+    def test_cache_backend(self):
+        """Test the sliding window with the cache backend"""
+        self.assert_sliding_window(CacheBackend())
+
+    def test_database_backend(self):
+        """Test the sliding window with the database backend"""
+        self.assert_sliding_window(DatabaseBackend())
+        self.assertTrue(RateLimitCounter.objects.exists())
+
+    def test_default_backend_follows_the_cache(self):
+        """Test counters go to the database unless the default cache is shared between processes"""
+        from .utils.rate_limit import get_backend
+
+        self.assertIsInstance(get_backend(), DatabaseBackend)
+        shared = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'rate_limit_test'}
+        with self.settings(CACHES={**settings.CACHES, 'default': shared}):
+            self.assertIsInstance(get_backend(), CacheBackend)
+        with self.settings(RATE_LIMIT_BACKEND='auctions.utils.rate_limit.CacheBackend'):
+            self.assertIsInstance(get_backend(), CacheBackend)
+
+    def test_decorated_view(self):
+        """Test the decorator stops comment floods with an error message"""
+        user = User.objects.create_user(username='commenter', password='testpass123')
+        listing = AuctionListing.objects.create(owner=user, title='Chatty', starting_price=1.00)
+        self.client.login(username='commenter', password='testpass123')
+
+        for i in range(12):
+            response = self.client.post(reverse('listing_comment', args=[listing.id]), {'body': f'Comment {i}'})
+
+        self.assertEqual(Comment.objects.filter(listing=listing).count(), 10)
+        self.assertRedirects(response, reverse('listing_comment', args=[listing.id]),
+                             fetch_redirect_response=False)
+        messages = [str(m) for m in get_messages(response.wsgi_request)]
+        self.assertIn('commenting too fast', messages[-1])
+
+
+class ListingEventsTest(TestCase):
+    CLIENTS = 300
+
+    def setUp(self):
+        """Set up a listing to watch"""
+        self.owner = User.objects.create_user(username='live_owner', password='testpass123')
+        self.bidder = User.objects.create_user(username='live_bidder', password='testpass123')
+        self.listing = AuctionListing.objects.create(owner=self.owner, title='Live Listing', starting_price=10.00)
+
+    async def test_broker_fan_out_from_another_thread(self):
+        """Test one publish from a worker thread reaches hundreds of subscribers"""
+        import asyncio
+        import threading
+
+        subscriptions = [broker.subscribe(self.listing.pk) for _ in range(self.CLIENTS)]
+        try:
+            publisher = threading.Thread(target=broker.publish, args=(self.listing.pk, {'type': 'bid', 'n': 1}))
+            publisher.start()
+            publisher.join()
+
+            events = await asyncio.wait_for(asyncio.gather(*(s.get() for s in subscriptions)), timeout=5)
+            self.assertEqual(events, [{'type': 'bid', 'n': 1}] * self.CLIENTS)
+        finally:
+            for subscription in subscriptions:
+                broker.unsubscribe(subscription)
+        self.assertEqual(broker.subscriber_count(self.listing.pk), 0)
+
+    async def test_slow_client_keeps_latest_events(self):
+        """Test a full queue drops the oldest events instead of blocking publishers"""
+        import asyncio
+
+        subscription = broker.subscribe(self.listing.pk)
+        try:
+            for n in range(broker.queue_size + 5):
+                broker.publish(self.listing.pk, {'type': 'bid', 'n': n})
+            await asyncio.sleep(0)
+            self.assertEqual(subscription.queue.qsize(), broker.queue_size)
+            self.assertEqual((await subscription.get())['n'], 5)
+        finally:
+            broker.unsubscribe(subscription)
+
+    async def test_event_stream_clients(self):
+        """Test hundreds of connected SSE clients receive a published bid"""
+        import asyncio
+        from django.test import AsyncRequestFactory
+
+        factory = AsyncRequestFactory()
+        url = reverse('listing_events', args=[self.listing.id])
+        streams = []
+        try:
+            for _ in range(self.CLIENTS):
+                response = await views.listing_events(factory.get(url), str(self.listing.id))
+                self.assertEqual(response['Content-Type'], 'text/event-stream')
+                stream = aiter(response.streaming_content)
+                self.assertEqual(await anext(stream), b'retry: 3000\n\n')
+                streams.append(stream)
+            self.assertEqual(broker.subscriber_count(self.listing.pk), self.CLIENTS)
+
+            broker.publish(self.listing.pk, {'type': 'bid', 'current_price': 12.5})
+            chunks = await asyncio.wait_for(asyncio.gather(*(anext(stream) for stream in streams)), timeout=5)
+            self.assertEqual(set(chunks), {b'event: bid\ndata: {"type": "bid", "current_price": 12.5}\n\n'})
+        finally:
+            # a client disconnect cancels the pending read of its stream
+            pending = [asyncio.ensure_future(anext(stream)) for stream in streams]
+            await asyncio.sleep(0)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        self.assertEqual(broker.subscriber_count(self.listing.pk), 0)
+
+    def test_bid_is_published_on_commit(self):
+        """Test the bid engine broadcasts accepted bids once committed"""
+        from unittest import mock
+
+        with mock.patch.object(broker, 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                submit_bid(self.listing.pk, self.bidder, 15.00)
+
+        publish.assert_called_once_with(self.listing.pk, {
+            'type': 'bid',
+            'listing': self.listing.pk,
+            'current_price': 15.0,
+            'bid_count': 1,
+            'high_bidder': 'live_bidder',
+        })
+
+    def test_wsgi_request_gets_no_stream(self):
+        """Test the stream is only served under ASGI"""
+        response = self.client.get(reverse('listing_events', args=[self.listing.id]))
+        self.assertEqual(response.status_code, 204)
+
+
+class ListingSearchTest(TestCase):
+    def setUp(self):
+        """Set up listings with overlapping words in titles and descriptions"""
+        self.owner = User.objects.create_user(username='searcher', password='testpass123')
+        self.electronics = Category.objects.create(name='Electronics')
+        self.books = Category.objects.create(name='Books & Magazines')
+        self.camera = AuctionListing.objects.create(
+            owner=self.owner, title='Vintage camera', description='Film camera in good condition',
+            starting_price=50.00, category=self.electronics)
+        self.lens = AuctionListing.objects.create(
+            owner=self.owner, title='Zoom lens', description='Fits most vintage cameras',
+            starting_price=30.00, category=self.electronics)
+        self.guide = AuctionListing.objects.create(
+            owner=self.owner, title='Photography guide', description='How to use a camera',
+            starting_price=10.00, category=self.books)
+
+    def titles(self, query, **kwargs):
+        return [listing.title for listing in search_listings(query, **kwargs)]
+
+    def test_ranked_prefix_match(self):
+        """Test the last word matches as a prefix and title hits rank first"""
+        self.assertEqual(self.titles('camera')[0], 'Vintage camera')
+        self.assertCountEqual(self.titles('vint'), ['Vintage camera', 'Zoom lens'])
+        self.assertEqual(self.titles('vintage cam'), ['Vintage camera', 'Zoom lens'])
+        self.assertEqual(self.titles('"); DROP TABLE x; --'), [])
+
+    def test_category_filter_and_inactive(self):
+        """Test the category filter applies and closed listings are excluded"""
+        self.assertEqual(self.titles('camera', category='Books & Magazines'), ['Photography guide'])
+        self.camera.is_active = False
+        self.camera.save()
+        self.assertNotIn('Vintage camera', self.titles('camera'))
+
+    def test_index_follows_edits_and_deletes(self):
+        """Test the index is kept in sync when listings are saved and deleted"""
+        self.lens.title = 'Telephoto lens'
+        self.lens.save()
+        self.assertEqual(self.titles('telephoto'), ['Telephoto lens'])
+        self.assertEqual(self.titles('zoom'), [])
+        self.lens.delete()
+        self.assertEqual(self.titles('telephoto'), [])
+
+    def test_pagination(self):
+        """Test walking the cursors returns every match once, in rank order"""
+        for i in range(5):
+            AuctionListing.objects.create(owner=self.owner, title=f'Camera strap {i}', starting_price=5.00)
+        expected = self.titles('camera', per_page=50)
+        seen, cursor = [], None
+        while True:
+            page = search_listings('camera', cursor=cursor, per_page=2)
+            seen.extend(listing.title for listing in page)
+            if not page.has_next:
+                break
+            cursor = page.next_cursor
+        self.assertEqual(seen, expected)
+        self.assertEqual(len(seen), 8)
+
+        with self.assertRaises(InvalidCursor):
+            search_listings('camera', cursor='bm90LWEtY3Vyc29y')
+
+    def test_search_view(self):
+        """Test the search page renders results and ignores a bad cursor"""
+        response = self.client.get(reverse('search'), {'query': 'lens', 'cursor': 'junk'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['listings']), [self.lens])
+        self.assertContains(response, 'Zoom lens')
+
+        response = self.client.get(reverse('search'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['listings']), 0)
+
+
+class AuctionExpiryTest(TestCase):
+    def setUp(self):
+        """Set up a seller and two bidders"""
+        self.owner = User.objects.create_user(username='expiry_owner', password='testpass123')
+        self.bidders = [User.objects.create_user(username=f'expiry_bidder_{i}', password='testpass123')
+                        for i in range(2)]
+        self.past = timezone.now() - timedelta(minutes=5)
+
+    def create_listing(self, ends_at, bids=()):
+        listing = AuctionListing.objects.create(owner=self.owner, title='Expiring', starting_price=10.00,
+                                                ends_at=ends_at)
+        for bidder, amount in bids:
+            self.assertTrue(submit_bid(listing.pk, bidder, amount).accepted)
+        # bids are only accepted before the end, so move the end afterwards
+        AuctionListing.objects.filter(pk=listing.pk).update(ends_at=ends_at)
+        return listing
+
+    def test_closes_due_listings(self):
+        """Test expired auctions close like a manual close and future ones stay open"""
+        sold = self.create_listing(None, [(self.bidders[0], 20.00), (self.bidders[1], 25.00)])
+        AuctionListing.objects.filter(pk=sold.pk).update(ends_at=self.past)
+        unsold = self.create_listing(self.past)
+        running = self.create_listing(timezone.now() + timedelta(days=1))
+
+        call_command('close_expired_auctions', stdout=StringIO())
+
+        sold.refresh_from_db()
+        self.assertFalse(sold.is_active)
+        self.assertEqual(sold.owner, self.bidders[1])
+        self.assertEqual(sold.starting_price, 25.00)
+        self.assertEqual((sold.bid_count, sold.high_bidder), (0, None))
+        self.assertFalse(Bid.objects.live().filter(listing=sold).exists())
+        self.assertTrue(sold.archive_pending)
+        self.assertTrue(Notification.objects.filter(user=self.bidders[1], listing=sold).exists())
+
+        unsold.refresh_from_db()
+        self.assertFalse(unsold.is_active)
+        self.assertEqual(unsold.owner, self.owner)
+
+        running.refresh_from_db()
+        self.assertTrue(running.is_active)
+
+    def test_reopened_expired_listing_takes_bids(self):
+        """Test reopening an auction whose end has passed clears the end and keeps it open"""
+        expired = self.create_listing(self.past)
+        running = self.create_listing(timezone.now() + timedelta(days=1))
+        close_expired_auctions()
+        handle_auction_close(running)
+
+        for listing in (expired, running):
+            self.assertTrue(reopen_auction(listing))
+        self.assertIsNone(expired.ends_at)
+        self.assertGreater(running.ends_at, timezone.now())
+
+        self.assertTrue(submit_bid(expired.pk, self.bidders[0], 12.00).accepted)
+        self.assertEqual(close_expired_auctions(), 0)
+        expired.refresh_from_db()
+        self.assertTrue(expired.is_active)
+
+    def test_idempotent(self):
+        """Test running the closer again changes nothing"""
+        listing = self.create_listing(None, [(self.bidders[0], 20.00)])
+        AuctionListing.objects.filter(pk=listing.pk).update(ends_at=self.past)
+
+        self.assertEqual(close_expired_auctions(), 1)
+        self.assertEqual(close_expired_auctions(), 0)
+        self.assertEqual(Notification.objects.filter(listing=listing).count(), 1)
+
+    def test_batches_in_end_time_order(self):
+        """Test batches take the earliest ending listings first with a constant number of queries"""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        listings = [self.create_listing(self.past - timedelta(minutes=i)) for i in range(6)]
+        for listing in listings:
+            submit_bid(listing.pk, self.bidders[0], 11.00)
+        for i, listing in enumerate(listings):
+            AuctionListing.objects.filter(pk=listing.pk).update(ends_at=self.past - timedelta(minutes=i))
+
+        with CaptureQueriesContext(connection) as small_batch:
+            self.assertEqual(close_expired_auctions(batch_size=2), 2)
+        closed = set(AuctionListing.objects.filter(is_active=False).values_list('pk', flat=True))
+        self.assertEqual(closed, {listings[5].pk, listings[4].pk})
+
+        with CaptureQueriesContext(connection) as large_batch:
+            self.assertEqual(close_expired_auctions(batch_size=10), 4)
+        self.assertEqual(len(small_batch), len(large_batch))
+
+    def test_bids_rejected_after_end(self):
+        """Test an expired listing refuses bids before the closer runs"""
+        listing = self.create_listing(self.past)
+        result = submit_bid(listing.pk, self.bidders[0], 50.00)
+        self.assertEqual(result.status, BidResult.REJECTED)
+        self.assertIn('ended', result.message)
+
+    def test_form_requires_future_end(self):
+        """Test the listing form rejects an end time in the past"""
+        form = ListingForm(data={'title': 'Late', 'starting_price': 5.00, 'is_active': True,
+                                 'ends_at': self.past.strftime('%Y-%m-%dT%H:%M')})
+        self.assertFalse(form.is_valid())
+        self.assertIn('ends_at', form.errors)
+
+
+class BidArchiveTest(TestCase):
+    def setUp(self):
+        """Set up a seller, two bidders and two listings with bids"""
+        self.owner = User.objects.create_user(username='archive_owner', password='testpass123')
+        self.bidders = [User.objects.create_user(username=f'archive_bidder_{i}', password='testpass123')
+                        for i in range(2)]
+        self.listings = [AuctionListing.objects.create(owner=self.owner, title=f'Archived {i}', starting_price=10.00)
+                         for i in range(2)]
+        for listing in self.listings:
+            for i, amount in enumerate((11, 12, 13)):
+                self.assertTrue(submit_bid(listing.pk, self.bidders[i % 2], amount).accepted)
+        cache.clear()
+
+    def close(self, listing):
+        return handle_auction_close(listing)
+
+    def test_close_hides_bids_and_archiver_moves_them(self):
+        """Test a close keeps the bids out of the live set and the archiver moves them with their ids"""
+        listing = self.listings[0]
+        placed = list(Bid.objects.filter(listing=listing).values_list('pk', 'amount', 'created'))
+        self.close(listing)
+
+        listing.refresh_from_db()
+        self.assertTrue(listing.archive_pending)
+        self.assertEqual(listing.owner, self.bidders[0])
+        self.assertFalse(Bid.objects.live().filter(listing=listing).exists())
+        self.assertEqual(Bid.objects.live().count(), 3)
+        self.assertEqual(reconcile_listing_bid_state(), 0)
+
+        self.assertEqual(archive_closed_bids(), 3)
+        self.assertEqual(archive_closed_bids(), 0)
+        listing.refresh_from_db()
+        self.assertFalse(listing.archive_pending)
+        self.assertFalse(Bid.objects.filter(listing=listing).exists())
+        archived = BidArchive.objects.filter(listing=listing).values_list('bid_id', 'amount', 'placed_at')
+        self.assertEqual(sorted(archived), sorted(placed))
+
+    def test_archives_in_chunks(self):
+        """Test each call moves at most one batch and the command drains everything"""
+        for listing in self.listings:
+            self.close(listing)
+
+        self.assertEqual(archive_closed_bids(batch_size=4), 4)
+        self.assertEqual(Bid.objects.count(), 2)
+        self.assertEqual(AuctionListing.objects.filter(archive_pending=True).count(), 1)
+
+        out = StringIO()
+        call_command('archive_bids', '--batch-size', '4', stdout=out)
+        self.assertIn('Archived 2 bid(s)', out.getvalue())
+        self.assertFalse(Bid.objects.exists())
+        self.assertFalse(AuctionListing.objects.filter(archive_pending=True).exists())
+        self.assertEqual(BidArchive.objects.count(), 6)
+
+    def test_reopen_starts_without_old_bids(self):
+        """Test reopening archives the previous round before bids are taken again"""
+        listing = self.listings[0]
+        self.close(listing)
+        self.client.login(username='archive_bidder_0', password='testpass123')
+        self.client.post(reverse('auction_control', args=[listing.pk]))
+
+        listing.refresh_from_db()
+        self.assertTrue(listing.is_active)
+        self.assertFalse(listing.archive_pending)
+        self.assertEqual(BidArchive.objects.filter(listing=listing).count(), 3)
+        self.assertTrue(submit_bid(listing.pk, self.bidders[1], 14).accepted)
+        self.assertEqual(reconcile_listing_bid_state(), 0)
+        response = self.client.get(reverse('listing_page', args=[listing.pk]))
+        self.assertEqual([bid.amount for bid in response.context['Bidders']], [Decimal('14.00')])
+
+    def test_reopen_archives_in_chunks(self):
+        """Test reopening moves the old bids one batch per transaction and reports if it reopened"""
+        from unittest import mock
+        from .utils import utils
+        listing = self.listings[0]
+        self.close(listing)
+        with override_settings(BID_ARCHIVE_BATCH_SIZE=2), \
+                mock.patch.object(utils, '_archive_bids', wraps=utils._archive_bids) as archive:
+            self.assertTrue(reopen_auction(listing))
+        # 2 bids, then the last one
+        self.assertEqual(archive.call_count, 2)
+        self.assertTrue(listing.is_active)
+        self.assertEqual(BidArchive.objects.filter(listing=listing).count(), 3)
+        self.assertFalse(Bid.objects.filter(listing=listing).exists())
+
+        self.assertTrue(submit_bid(listing.pk, self.bidders[1], 14).accepted)
+        self.assertFalse(reopen_auction(listing))
+        self.assertEqual(Bid.objects.filter(listing=listing).count(), 1)
+
+    def test_export_archived_bids(self):
+        """Test the export command reads archived bids from the archive"""
+        self.close(self.listings[0])
+        archive_closed_bids()
+
+        out = StringIO()
+        call_command('export_listings', '-', '--bids', '--archived', stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(lines[0], 'bid_id,listing_id,listing__title,bidder__username,amount,placed_at,archived_at')
+        self.assertEqual(len(lines), 4)
+
+
 class ListingFormTest(TestCase):
     def setUp(self):
         """Set up data for form tests"""
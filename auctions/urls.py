@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import include, path
 
 from . import views
 
@@ -9,11 +9,17 @@ urlpatterns = [
     path("register", views.register, name="register"),
     path("notifications", views.notifications, name="notifications"),
     path("profile", views.profile, name="profile"),
+    path("search", views.search, name="search"),
 
     path("create-listing", views.create_listing, name="create_listing"),
+    path("import-listings", views.import_listings_view, name="import_listings"),
+    path("export-listings", views.export_listings, name="export_listings"),
+    path("export-bids", views.export_bids, name="export_bids"),
     path("watchlist", views.watchlist_page, name="watchlist"),
+    path("watchlist/bulk", views.bulk_watchlist, name="bulk_watchlist"),
 
     path("listing-page/<str:listing_id>/", views.listing_page, name="listing_page"),
+    path("listing-events/<str:listing_id>/", views.listing_events, name="listing_events"),
     path("listing-comment/<str:listing_id>/", views.listing_comment, name="listing_comment"),
     path("add-to-watchlist/<str:listing_id>", views.add_watchlist, name="add_watchlist"),
     path("remove-from-watchlist/<str:listing_id>", views.remove_watchlist, name="remove_watchlist"),
@@ -21,6 +27,17 @@ urlpatterns = [
     path('confirm-email/<str:token>', views.confirm_email, name='confirm_email'),
     path('password-reset/', views.password_reset_request, name='password_reset'),
     path('password-reset/<str:token>', views.password_reset_confirm, name='password_reset_confirm'),
-]
 
+    path("instrumentation/stats", views.instrumentation_stats, name="instrumentation_stats"),
+
+    path("api/v1/", include("auctions.api.urls")),
+]
 
+# the ASGI entry point serves these pages with their async views; being
+# listed first, they take precedence over the sync views of the same paths
+async_urlpatterns = [
+    path("", views.aindex, name="index"),
+    path("notifications", views.anotifications, name="notifications"),
+    path("watchlist", views.awatchlist_page, name="watchlist"),
+    path("listing-page/<str:listing_id>/", views.alisting_page, name="listing_page"),
+] + urlpatterns
@@ -1,14 +1,56 @@
-from .email_utils import send_confirmation_email
-from .utils import (annotate_listing_with_max_bid, get_listing_comments,
-                    get_last_bid, get_listing_bidders, check_watchlist_status,
-                    handle_auction_close)
+from .bid_engine import BidResult, submit_bid, submit_max_bid
+from .conditional import conditional_page, respond_conditionally
+from .email_utils import queue_email, send_confirmation_email, send_queued_emails
+from .fragment_cache import render_fragment
+from .instrumentation import query_budget
+from .money import format_money, to_money
+from .order_book import order_books
+from .pagination import CursorPaginator, InvalidCursor, apaginate_listings, paginate_listings
+from .rate_limit import RateLimiter, rate_limit
+from .realtime import broker, format_sse
+from .search import search_listings
+from .utils import (get_listing_comments, get_last_bid, get_listing_bidders,
+                    check_watchlist_status, watched_listing_ids, update_watchlist,
+                    handle_auction_close, reopen_auction,
+                    close_expired_auctions, archive_closed_bids, reconcile_listing_bid_state,
+                    notify_users, mark_notifications_read,
+                    reconcile_unread_notification_counts)
 
 __all__ = [
+    'BidResult',
+    'submit_bid',
+    'submit_max_bid',
+    'queue_email',
     'send_confirmation_email',
-    'annotate_listing_with_max_bid',
+    'send_queued_emails',
     'get_listing_comments',
     'get_last_bid',
     'get_listing_bidders',
     'check_watchlist_status',
+    'watched_listing_ids',
+    'update_watchlist',
     'handle_auction_close',
+    'reopen_auction',
+    'close_expired_auctions',
+    'archive_closed_bids',
+    'reconcile_listing_bid_state',
+    'notify_users',
+    'mark_notifications_read',
+    'reconcile_unread_notification_counts',
+    'render_fragment',
+    'query_budget',
+    'to_money',
+    'format_money',
+    'order_books',
+    'conditional_page',
+    'respond_conditionally',
+    'CursorPaginator',
+    'InvalidCursor',
+    'paginate_listings',
+    'apaginate_listings',
+    'RateLimiter',
+    'rate_limit',
+    'broker',
+    'format_sse',
+    'search_listings',
 ]
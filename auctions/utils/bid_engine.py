@@ -0,0 +1,370 @@
+import random
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from ..models import AuctionListing, Bid, ProxyBid
+from .money import format_money, to_money
+from .realtime import publish_bid
+
+
+class BidResult(namedtuple('BidResult', ['status', 'message', 'bid'])):
+    """
+    Outcome of a bid submitted to the bid engine.
+
+    Attributes:
+        status (str): One of ACCEPTED, REJECTED or CONFLICT
+        message (str): Human readable explanation, suitable for flash messages
+        bid (Bid, optional): The created bid when the bid was accepted
+    """
+    ACCEPTED = 'accepted'
+    REJECTED = 'rejected'
+    CONFLICT = 'conflict'
+
+    __slots__ = ()
+
+    @property
+    def accepted(self):
+        return self.status == self.ACCEPTED
+
+
+# A bidder competing for a listing: the most they will pay and, to break
+# ties between equal maximums, when they committed to it. placed_at is None
+# for a leader holding the price with a plain bid, who counts as the latest.
+Contender = namedtuple('Contender', ['bidder', 'ceiling', 'placed_at'])
+
+
+def _rank(contender):
+    # highest ceiling first, then the earliest placed_at, plain leaders last
+    return (-contender.ceiling, contender.placed_at is None, contender.placed_at or 0)
+
+
+def _resolve_proxies(price, leader, proxies, increment):
+    """
+    Let the maximum bids of a listing respond to its price, in one pass over them.
+
+    Only the two strongest contenders matter: the winner pays one increment
+    over the runner-up's maximum (capped at its own), or exactly that maximum
+    when both are equal and the winner committed to it first. So instead of
+    bidding the price up one increment at a time, at most two visible bids
+    come out: the runner-up's at its maximum, then the winner's.
+
+    Args:
+        price: Current price, the starting price before the first bid
+        leader: Contender holding the price, None before the first bid
+        proxies: Contenders from ProxyBids other than the leader's
+        increment: Step by which a maximum bid outbids another
+
+    Returns:
+        list: (Contender, amount) pairs of the bids to write, the new leader's last
+    """
+    def challenges(contender):
+        if leader is None or contender.ceiling != price:
+            return contender.ceiling > price
+        # an equal maximum only takes the price from a leader who committed later
+        return leader.placed_at is None or contender.placed_at < leader.placed_at
+
+    pool = [contender for contender in proxies if challenges(contender)]
+    if not pool:
+        return []
+    if leader is not None:
+        pool.append(leader)
+
+    winner = min(pool, key=_rank)
+    pool.remove(winner)
+    runner_up = min(pool, key=_rank) if pool else None
+    floor = runner_up.ceiling if runner_up else price
+    amount = floor if winner.ceiling == floor else min(winner.ceiling, floor + increment)
+
+    bids = []
+    if runner_up is not None and runner_up.ceiling > price:
+        bids.append((runner_up, runner_up.ceiling))
+    if winner is not leader or amount > price:
+        bids.append((winner, amount))
+    return bids
+
+
+def _lock_listing(listing_id, bidder):
+    """
+    Load a listing for bidding and check that bidder may bid on it.
+
+    Returns:
+        tuple: (listing, None), or (None, BidResult) when the bid is refused
+    """
+    listings = AuctionListing.objects.only(
+        'owner', 'is_active', 'ends_at', 'starting_price', 'current_price', 'bid_count', 'high_bidder', 'version')
+    # Backends with row locks serialize bidders here; SQLite serializes them
+    # with BEGIN IMMEDIATE (see settings), and the compare-and-swap on
+    # `version` in _apply_bids catches the race when it runs with deferred transactions.
+    if connection.features.has_select_for_update:
+        listings = listings.select_for_update()
+
+    try:
+        listing = listings.get(pk=listing_id)
+    except AuctionListing.DoesNotExist:
+        return None, BidResult(BidResult.REJECTED, "This listing does not exist", None)
+    refused = check_bid(listing, bidder)
+    return (None, refused) if refused else (listing, None)
+
+
+def check_bid(listing, bidder, amount=None):
+    """
+    Check a bid against the bid state of a listing, without any query.
+
+    Args:
+        listing: AuctionListing, or an order book entry with the same attributes
+        bidder: The User bidding
+        amount: The bid amount, None to only check that bidder may bid at all
+
+    Returns:
+        BidResult: REJECTED with the reason, or None when the bid may go ahead
+    """
+    if not listing.is_active:
+        return BidResult(BidResult.REJECTED, "This auction is closed", None)
+    if listing.ends_at and listing.ends_at <= timezone.now():
+        # the closer has not picked the listing up yet, but bidding is over
+        return BidResult(BidResult.REJECTED, "This auction has ended", None)
+    if listing.owner_id == bidder.id:
+        return BidResult(BidResult.REJECTED, "You cannot bid on your own listing", None)
+    if amount is None:
+        return None
+    if listing.bid_count and listing.high_bidder_id == bidder.id:
+        return BidResult(BidResult.REJECTED, "You already have the highest bid on this item", None)
+    if not listing.bid_count and amount <= listing.starting_price:
+        return BidResult(BidResult.REJECTED,
+                         f"Bid must be higher than the starting price ({format_money(listing.starting_price)})", None)
+    if listing.bid_count and amount <= listing.current_price:
+        return BidResult(BidResult.REJECTED,
+                         f"Bid must be higher than the current highest bid ({format_money(listing.current_price)})", None)
+    return None
+
+
+def _proxy_contenders(listing, price, include=None):
+    """ProxyBids of listing that can reach price, plus include's whatever its maximum, by bidder id."""
+    proxies = ProxyBid.objects.filter(listing_id=listing.pk).select_related('bidder').order_by('pk')
+    reaching = Q(max_amount__gte=price)
+    if include is not None:
+        reaching |= Q(bidder=include)
+    return {proxy.bidder_id: proxy for proxy in proxies.filter(reaching)}
+
+
+def _apply_bids(listing, bids):
+    """
+    Write the visible bids and the listing's new bid state with a compare-and-swap.
+
+    Returns:
+        list: The created Bids, or None when another bid changed the listing
+            concurrently and the attempt should be retried
+    """
+    listed = AuctionListing.objects.filter(pk=listing.pk, version=listing.version)
+    if not bids:
+        # nothing visible changes, but the write still has to lose against a concurrent bid
+        return [] if listed.update(version=F('version')) else None
+
+    # `updated` moves with every bid, so it can serve as Last-Modified
+    now = timezone.now()
+    leader, amount = bids[-1]
+    swapped = listed.update(
+        current_price=amount,
+        bid_count=F('bid_count') + len(bids),
+        high_bidder=leader.bidder,
+        version=F('version') + 1,
+        updated=now
+    )
+    if not swapped:
+        return None
+
+    created = Bid.objects.bulk_create(
+        [Bid(bidder=contender.bidder, listing_id=listing.pk, amount=amount) for contender, amount in bids])
+    listing.current_price = amount
+    listing.bid_count += len(bids)
+    listing.high_bidder = leader.bidder
+    listing.version += 1
+    listing.updated = now
+    transaction.on_commit(lambda: publish_bid(listing, created[-1]))
+    return created
+
+
+def _attempt_bid(listing_id, bidder, amount):
+    """
+    Run one attempt at placing a bid; must be called inside a transaction.
+
+    Maximum bids of other bidders respond to the new price in the same
+    transaction, so the bidder may end up outbid right away.
+
+    Returns None when another bid changed the listing concurrently and the
+    attempt should be retried.
+    """
+    listing, refused = _lock_listing(listing_id, bidder)
+    if refused:
+        return refused
+    refused = check_bid(listing, bidder, amount)
+    if refused:
+        return refused
+
+    proxies = _proxy_contenders(listing, amount)
+    own = proxies.pop(bidder.id, None)
+    # the bidder's own maximum keeps bidding for them above this bid
+    if own is not None and own.max_amount >= amount:
+        bidder_contender = Contender(bidder, own.max_amount, own.placed_at)
+    else:
+        bidder_contender = Contender(bidder, amount, None)
+    bids = [(Contender(bidder, amount, None), amount)]
+    bids += _resolve_proxies(amount, bidder_contender,
+                             [Contender(p.bidder, p.max_amount, p.placed_at) for p in proxies.values()],
+                             to_money(settings.PROXY_BID_INCREMENT))
+
+    created = _apply_bids(listing, bids)
+    if created is None:
+        return None
+    if listing.high_bidder_id != bidder.id:
+        return BidResult(BidResult.ACCEPTED,
+                         f"Bid placed, but another bidder's maximum bid is higher. "
+                         f"The current bid is {format_money(listing.current_price)}", created[0])
+    return BidResult(BidResult.ACCEPTED, "Bid placed successfully!", created[-1])
+
+
+def _attempt_max_bid(listing_id, bidder, max_amount):
+    """
+    Run one attempt at setting a maximum bid; must be called inside a transaction.
+
+    Returns None when another bid changed the listing concurrently and the
+    attempt should be retried.
+    """
+    listing, refused = _lock_listing(listing_id, bidder)
+    if refused:
+        return refused
+    if max_amount <= listing.current_price:
+        what = "current highest bid" if listing.bid_count else "starting price"
+        return BidResult(BidResult.REJECTED,
+                         f"Maximum bid must be higher than the {what} ({format_money(listing.current_price)})", None)
+
+    price = listing.current_price
+    proxies = _proxy_contenders(listing, price, include=bidder)
+    own = proxies.pop(bidder.id, None)
+    placed_at = timezone.now()
+    others = [Contender(p.bidder, p.max_amount, p.placed_at) for p in proxies.values()
+              if p.bidder_id != listing.high_bidder_id]
+    if not listing.bid_count:
+        leader, contenders = None, [Contender(bidder, max_amount, placed_at)] + others
+    elif listing.high_bidder_id == bidder.id:
+        # raising the maximum that holds the price keeps its place in the queue
+        if own is not None and own.max_amount >= price:
+            placed_at = own.placed_at
+        leader, contenders = Contender(bidder, max_amount, placed_at), others
+    else:
+        held = proxies.get(listing.high_bidder_id)
+        if held is not None:
+            leader = Contender(held.bidder, held.max_amount, held.placed_at)
+        else:
+            # a plain bid holding the price never bids again, so its bidder is not loaded
+            leader = Contender(None, price, None)
+        contenders = [Contender(bidder, max_amount, placed_at)] + others
+
+    created = _apply_bids(listing, _resolve_proxies(price, leader, contenders,
+                                                    to_money(settings.PROXY_BID_INCREMENT)))
+    if created is None:
+        return None
+
+    if own is None:
+        ProxyBid.objects.create(bidder=bidder, listing_id=listing.pk, max_amount=max_amount, placed_at=placed_at)
+    else:
+        own.max_amount = max_amount
+        own.placed_at = placed_at
+        own.save(update_fields=['max_amount', 'placed_at'])
+
+    # the bidder's last visible bid, None when only a leading maximum was raised
+    bid = next((bid for bid in reversed(created) if bid.bidder_id == bidder.id), None)
+    if listing.high_bidder_id != bidder.id:
+        return BidResult(BidResult.ACCEPTED,
+                         f"Another bidder's maximum bid is higher than yours ({format_money(max_amount)}). "
+                         f"The current bid is {format_money(listing.current_price)}", bid)
+    return BidResult(BidResult.ACCEPTED,
+                     f"Maximum bid of {format_money(max_amount)} set. "
+                     f"You are the highest bidder at {format_money(listing.current_price)}", bid)
+
+
+def _with_retries(attempt, max_retries):
+    """Run attempt() in its own transaction until it returns a result or retries run out."""
+    if max_retries is None:
+        max_retries = settings.BID_ENGINE_MAX_RETRIES
+
+    for attempt_number in range(max_retries + 1):
+        try:
+            with transaction.atomic():
+                result = attempt()
+        except OperationalError:
+            # SQLite reports a competing writer as "database is locked"
+            result = None
+
+        if result is not None:
+            return result
+        if attempt_number < max_retries:
+            # exponential backoff with jitter so retries do not collide again
+            time.sleep(settings.BID_ENGINE_BACKOFF * (2 ** attempt_number) * random.random())
+
+    return BidResult(BidResult.CONFLICT,
+                     "This auction is receiving a lot of bids right now, please try again", None)
+
+
+def submit_bid(listing_id, bidder, amount, max_retries=None):
+    """
+    Place a bid so that concurrent bidders on the same listing are serialized.
+
+    Args:
+        listing_id: Primary key of the AuctionListing
+        bidder: The User placing the bid
+        amount: The validated, positive bid amount; converted to whole cents
+            so it compares exactly with the stored prices
+        max_retries: Attempts after the first one when the listing is contended,
+            defaults to settings.BID_ENGINE_MAX_RETRIES
+
+    Returns:
+        BidResult: ACCEPTED with the new bid, REJECTED with the reason, or
+        CONFLICT when the listing stayed contended for every attempt. With
+        ORDER_BOOK_ENABLED, bids on hot listings are accepted in memory and
+        the returned bid is saved by the next order book flush
+    """
+    amount = to_money(amount)
+    if settings.ORDER_BOOK_ENABLED:
+        # imported here because the order book builds on this module
+        from .order_book import order_books
+
+        result = order_books.submit(listing_id, bidder, amount)
+        if result is not None:
+            return result
+    return _with_retries(lambda: _attempt_bid(listing_id, bidder, amount), max_retries)
+
+
+def submit_max_bid(listing_id, bidder, max_amount, max_retries=None):
+    """
+    Set the most bidder is willing to pay; the engine then bids for them.
+
+    Whenever the listing's price moves, competing maximum bids are resolved
+    in the same transaction: the highest maximum leads at one
+    PROXY_BID_INCREMENT over the second highest, and of two equal maximums
+    the one set first wins. Setting a maximum again replaces the previous one.
+
+    Args:
+        listing_id: Primary key of the AuctionListing
+        bidder: The User setting the maximum bid
+        max_amount: The validated, positive maximum; converted to whole cents
+        max_retries: Attempts after the first one when the listing is contended,
+            defaults to settings.BID_ENGINE_MAX_RETRIES
+
+    Returns:
+        BidResult: ACCEPTED with the bidder's new visible bid (None when
+        only their leading maximum was raised), REJECTED with the reason, or
+        CONFLICT when the listing stayed contended for every attempt
+    """
+    max_amount = to_money(max_amount)
+    if settings.ORDER_BOOK_ENABLED:
+        from .order_book import order_books
+
+        # maximum bids are resolved against the database, so the listing leaves its book
+        order_books.release(listing_id)
+    return _with_retries(lambda: _attempt_max_bid(listing_id, bidder, max_amount), max_retries)
@@ -0,0 +1,233 @@
+import csv
+import datetime
+import io
+import os
+import tempfile
+import zipfile
+from collections import namedtuple
+
+from django.db import transaction
+
+from ..forms import ListingForm, ListingImportForm
+from ..models import AuctionListing, Bid, BidArchive, Category
+
+IMPORT_COLUMNS = tuple(ListingForm.Meta.fields)
+LISTING_EXPORT_COLUMNS = ('id', 'title', 'description', 'starting_price', 'current_price', 'bid_count',
+                          'image_url', 'category__name', 'owner__username', 'is_active', 'ends_at', 'created')
+BID_EXPORT_COLUMNS = ('id', 'listing_id', 'listing__title', 'bidder__username', 'amount', 'created')
+ARCHIVED_BID_EXPORT_COLUMNS = ('bid_id', 'listing_id', 'listing__title', 'bidder__username', 'amount',
+                               'placed_at', 'archived_at')
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'off'}
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFileError(ValueError):
+    """
+    Raised when an import file is not a readable CSV or XLSX file.
+
+    Attributes:
+        created (int): Listings committed by import_listings before the
+            error, as files are read lazily and may break part way
+    """
+    created = 0
+
+
+class ImportResult(namedtuple('ImportResult', 'created failed errors')):
+    """
+    Outcome of a bulk import.
+
+    Attributes:
+        created (int): Listings inserted
+        failed (int): Rows rejected by validation
+        errors (list): (row number, message) of the first rejected rows
+    """
+
+
+def _csv_rows(fileobj):
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        yield from csv.DictReader(text)
+    except (csv.Error, UnicodeDecodeError) as exc:
+        raise ImportFileError(f"Could not read the CSV file: {exc}")
+    finally:
+        # leave the underlying upload open for its owner to close
+        text.detach()
+
+
+def _xlsx_rows(fileobj):
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    # read-only mode parses the sheet lazily, one row at a time
+    try:
+        workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile, KeyError) as exc:
+        raise ImportFileError(f"Could not read the XLSX file: {exc}")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else '' for cell in next(rows, ())]
+        for values in rows:
+            yield dict(zip(header, values))
+    finally:
+        workbook.close()
+
+
+def iter_import_rows(fileobj, filename):
+    """
+    Stream the rows of a CSV or XLSX file as dicts keyed by the header row.
+
+    Raises:
+        ImportFileError: If the extension is not .csv or .xlsx, or, while
+            iterating, if the file turns out to be unreadable
+    """
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == '.csv':
+        return _csv_rows(fileobj)
+    if extension == '.xlsx':
+        return _xlsx_rows(fileobj)
+    raise ImportFileError(f"Unsupported file type '{extension or filename}', use .csv or .xlsx")
+
+
+def _form_data(row):
+    data = {}
+    for column in IMPORT_COLUMNS:
+        value = row.get(column)
+        if value is None:
+            value = ''
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(value)
+        elif isinstance(value, str):
+            value = value.strip()
+        data[column] = value
+
+    # CheckboxInput treats any non-empty string as checked; listings are active unless stated otherwise
+    is_active = data['is_active']
+    if isinstance(is_active, str):
+        data['is_active'] = 'false' if is_active.lower() in FALSE_VALUES else 'true'
+    if isinstance(data['ends_at'], datetime.datetime):
+        data['ends_at'] = data['ends_at'].isoformat(sep=' ')
+    return data
+
+
+def import_listings(rows, owner, batch_size=1000):
+    """
+    Validate rows with ListingImportForm and insert the valid ones in chunks.
+
+    Each chunk is inserted with one bulk_create in its own transaction, so
+    memory stays bounded by batch_size and rows committed before a failure
+    are kept; an ImportFileError raised part way through the file carries
+    their count in its `created` attribute. bulk_create bypasses
+    AuctionListing.save(), so the denormalized current_price is set here.
+
+    Args:
+        rows: Iterable of dicts, e.g. from iter_import_rows
+        owner: User the listings are created for
+        batch_size: Listings per INSERT
+
+    Returns:
+        ImportResult: Counts of created and rejected rows with the first errors
+
+    Raises:
+        ImportFileError: If the file turns out to be unreadable
+    """
+    categories = {category.name.lower(): category for category in Category.objects.all()}
+    # rows without a category go to 'Other', and are rejected if there is none
+    default_category = categories.get('other')
+
+    created = failed = 0
+    errors = []
+    batch = []
+
+    def flush():
+        with transaction.atomic():
+            AuctionListing.objects.bulk_create(batch)
+        return len(batch)
+
+    # the header is row 1, so data starts on row 2 as in a spreadsheet
+    try:
+        for row_number, row in enumerate(rows, start=2):
+            form = ListingImportForm(_form_data(row), categories=categories, default_category=default_category)
+            if not form.is_valid():
+                failed += 1
+                if len(errors) < MAX_REPORTED_ERRORS:
+                    message = '; '.join(f"{field}: {' '.join(messages)}"
+                                        for field, messages in form.errors.items())
+                    errors.append((row_number, message))
+                continue
+
+            listing = form.save(commit=False)
+            listing.owner = owner
+            listing.category = form.cleaned_data['category']
+            listing.current_price = listing.starting_price
+            batch.append(listing)
+            if len(batch) >= batch_size:
+                created += flush()
+                batch = []
+    except ImportFileError as exc:
+        exc.created = created
+        raise
+
+    if batch:
+        created += flush()
+    return ImportResult(created, failed, errors)
+
+
+class _Echo:
+    """File-like object whose write() returns the data, for csv.writer in a generator."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def export_rows(queryset, columns, chunk_size=2000):
+    """Yield a header and one tuple per row, reading the queryset in chunks."""
+    yield columns
+    for values in queryset.order_by('pk').values_list(*columns).iterator(chunk_size=chunk_size):
+        yield tuple(_cell(value) for value in values)
+
+
+def listing_export_rows(listings=None):
+    if listings is None:
+        listings = AuctionListing.objects.all()
+    return export_rows(listings, LISTING_EXPORT_COLUMNS)
+
+
+def bid_export_rows(bids=None):
+    if bids is None:
+        bids = Bid.objects.all()
+    return export_rows(bids, BID_EXPORT_COLUMNS)
+
+
+def archived_bid_export_rows(bids=None):
+    if bids is None:
+        bids = BidArchive.objects.all()
+    return export_rows(bids, ARCHIVED_BID_EXPORT_COLUMNS)
+
+
+def stream_csv(rows):
+    """Encode rows as CSV lines one at a time, for StreamingHttpResponse."""
+    writer = csv.writer(_Echo())
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def write_xlsx(rows, fileobj):
+    """
+    Write rows to fileobj as an XLSX workbook.
+
+    XlsxWriter's constant_memory mode flushes each row to a temporary file
+    as soon as the next one starts, so memory does not grow with the export.
+    """
+    import xlsxwriter
+
+    workbook = xlsxwriter.Workbook(fileobj, {'constant_memory': True, 'tmpdir': tempfile.gettempdir()})
+    worksheet = workbook.add_worksheet()
+    for row_number, row in enumerate(rows):
+        worksheet.write_row(row_number, 0, row)
+    workbook.close()
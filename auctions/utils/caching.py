@@ -0,0 +1,13 @@
+from django.core.cache import caches
+
+# backends whose entries only the process that wrote them can see
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared(alias='default'):
+    """Whether every process sees the same entries in the cache, e.g. Redis, Memcached or the database cache."""
+    backend = caches[alias]
+    return f'{type(backend).__module__}.{type(backend).__qualname__}' not in PROCESS_LOCAL_CACHES
@@ -0,0 +1,111 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers, quote_etag
+from django.utils.http import http_date
+
+
+def respond_conditionally(request, state, last_modified, get_response):
+    """
+    Answer a GET or HEAD with 304 Not Modified if the client's copy is current.
+
+    Args:
+        request: The HTTP request
+        state: Hashable summary of everything the response depends on; its
+            digest becomes the ETag
+        last_modified: When the response last changed, or None if that
+            cannot be told (e.g. for pages personalized for the viewer)
+        get_response: Callable producing the full response; it is only
+            called when the client's copy is stale
+
+    Returns:
+        HttpResponse: 304 or the full response, carrying the validators
+    """
+    etag, timestamp, response = _not_modified(request, state, last_modified)
+    if response is None:
+        response = get_response()
+    return _add_validators(response, etag, timestamp)
+
+
+async def arespond_conditionally(request, state, last_modified, get_response):
+    """Async version of respond_conditionally(); get_response returns an awaitable."""
+    etag, timestamp, response = _not_modified(request, state, last_modified)
+    if response is None:
+        response = await get_response()
+    return _add_validators(response, etag, timestamp)
+
+
+def _not_modified(request, state, last_modified):
+    etag = quote_etag(hashlib.md5(repr(state).encode()).hexdigest())
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return etag, timestamp, get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def _add_validators(response, etag, timestamp):
+    if response.status_code in (200, 304):
+        response.headers['ETag'] = etag
+        if timestamp is not None:
+            response.headers['Last-Modified'] = http_date(timestamp)
+        # always revalidate, and never share a copy between viewers
+        patch_cache_control(response, private=True, no_cache=True)
+        patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def _page_state(request, state):
+    # the pages render forms carrying a CSRF token, which is only valid for
+    # the viewer's CSRF secret; login rotates it, so a copy cached before
+    # must not be reused after. get_token() stores the secret the page will
+    # use in META, even on a first visit without the cookie.
+    get_token(request)
+    return request.get_full_path(), request.META['CSRF_COOKIE'], state
+
+
+def conditional_page(validators):
+    """
+    condition()-style decorator computing ETag and Last-Modified in one call.
+
+    Django's condition() calls its etag and last-modified functions
+    separately; here validators(request, *args, **kwargs) returns both at
+    once as (state, last_modified), so they can come from a single query.
+    It may return None to skip conditional handling, e.g. when flash
+    messages are waiting to be shown. Only GET and HEAD are affected. The
+    ETag also covers the URL and the viewer's CSRF secret.
+
+    Async views are supported; their validators run through sync_to_async.
+    """
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            return _async_conditional_page(validators, view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+            result = validators(request, *args, **kwargs)
+            if result is None:
+                return view_func(request, *args, **kwargs)
+            state, last_modified = result
+            return respond_conditionally(request, _page_state(request, state), last_modified,
+                                         lambda: view_func(request, *args, **kwargs))
+        return wrapper
+    return decorator
+
+
+def _async_conditional_page(validators, view_func):
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await view_func(request, *args, **kwargs)
+        # request.user and request.auser() cache separately; load the user once,
+        # so the validators and the view both use this one
+        request.user = await request.auser()
+        result = await sync_to_async(validators)(request, *args, **kwargs)
+        if result is None:
+            return await view_func(request, *args, **kwargs)
+        state, last_modified = result
+        return await arespond_conditionally(request, _page_state(request, state), last_modified,
+                                            lambda: view_func(request, *args, **kwargs))
+    return wrapper
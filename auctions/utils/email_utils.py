@@ -1,9 +1,127 @@
 # email_utils.py
-from django.core.mail import send_mail
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, get_connection
 from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
 import secrets
 from django.utils import timezone
 
+from ..models import OutgoingEmail
+
+NOREPLY_ADDRESS = 'noreply@auctionsite.com'
+
+
+def queue_email(subject, body, recipients, from_email=NOREPLY_ADDRESS):
+    """
+    Store an email in the outbox; the send_queued_emails worker delivers it.
+
+    Args:
+        subject: Subject line
+        body: Plain text body
+        recipients: List of recipient addresses
+        from_email: Sender address
+
+    Returns:
+        OutgoingEmail: The queued outbox entry
+    """
+    return OutgoingEmail.objects.create(
+        subject=subject,
+        body=body,
+        from_email=from_email,
+        recipients=','.join(recipients),
+    )
+
+
+def claim_queued_emails(batch_size, max_attempts=None):
+    """
+    Claim up to batch_size due emails for this worker.
+
+    A claim is a lease: the email is marked as sending and hidden from other
+    workers until EMAIL_QUEUE_LEASE seconds have passed, after which a crashed
+    worker's emails become due again. Reclaiming an email whose lease expired
+    counts as a failed attempt, so an email that keeps crashing its worker
+    is dead-lettered after max_attempts like any other failure.
+    """
+    max_attempts = max_attempts or settings.EMAIL_QUEUE_MAX_ATTEMPTS
+    now = timezone.now()
+    with transaction.atomic():
+        due = (OutgoingEmail.objects
+               .filter(status__in=[OutgoingEmail.PENDING, OutgoingEmail.SENDING], next_attempt_at__lte=now)
+               .order_by('next_attempt_at'))
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True)
+        ids = list(due.values_list('id', flat=True)[:batch_size])
+        expired = OutgoingEmail.objects.filter(id__in=ids, status=OutgoingEmail.SENDING)
+        if expired.update(attempts=F('attempts') + 1, last_error="Lease expired before the email was sent"):
+            expired.filter(attempts__gte=max_attempts).update(status=OutgoingEmail.DEAD)
+        OutgoingEmail.objects.filter(id__in=ids).exclude(status=OutgoingEmail.DEAD).update(
+            status=OutgoingEmail.SENDING,
+            next_attempt_at=now + timedelta(seconds=settings.EMAIL_QUEUE_LEASE)
+        )
+    return list(OutgoingEmail.objects.filter(id__in=ids, status=OutgoingEmail.SENDING)
+                .order_by('next_attempt_at', 'id'))
+
+
+def _record_failure(email, error, max_attempts):
+    email.attempts += 1
+    email.last_error = error
+    if email.attempts >= max_attempts:
+        email.status = OutgoingEmail.DEAD
+    else:
+        email.status = OutgoingEmail.PENDING
+        delay = settings.EMAIL_QUEUE_RETRY_DELAY * 2 ** (email.attempts - 1)
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+    email.save(update_fields=['attempts', 'last_error', 'status', 'next_attempt_at'])
+
+
+def send_queued_emails(batch_size=None, max_attempts=None):
+    """
+    Deliver one batch of queued emails over a single backend connection.
+
+    Each email is marked sent, or its failure recorded, in its own short
+    UPDATE right after its delivery, so a worker crashing mid-batch only
+    leaves the email it was sending to be retried. Failed emails are
+    retried with exponential backoff and dead-lettered (status 'dead')
+    after max_attempts failures.
+
+    Returns:
+        tuple: (int, int) - (emails sent, emails that failed)
+    """
+    batch_size = batch_size or settings.EMAIL_QUEUE_BATCH_SIZE
+    max_attempts = max_attempts or settings.EMAIL_QUEUE_MAX_ATTEMPTS
+
+    batch = claim_queued_emails(batch_size, max_attempts)
+    if not batch:
+        return 0, 0
+
+    backend = get_connection(fail_silently=False)
+    try:
+        backend.open()
+    except Exception as e:
+        for email in batch:
+            _record_failure(email, f"Could not connect: {e}", max_attempts)
+        return 0, len(batch)
+
+    sent = failed = 0
+    try:
+        for email in batch:
+            message = EmailMessage(email.subject, email.body, email.from_email,
+                                   email.recipients.split(','), connection=backend)
+            try:
+                backend.send_messages([message])
+            except Exception as e:
+                _record_failure(email, str(e), max_attempts)
+                failed += 1
+            else:
+                OutgoingEmail.objects.filter(pk=email.pk).update(
+                    status=OutgoingEmail.SENT, sent_at=timezone.now(), last_error='')
+                sent += 1
+    finally:
+        backend.close()
+    return sent, failed
+
 
 def send_confirmation_email(user):
     token = secrets.token_urlsafe(48)
@@ -13,7 +131,7 @@ def send_confirmation_email(user):
 
     confirmation_link = f"http://{settings.SITE_URL}/confirm-email/{token}"
 
-    send_mail(
+    queue_email(
         'Confirm your Auctions account',
         f'''Hi {user.username},
 
@@ -23,7 +141,5 @@ Thank you for registering! Please confirm your email by clicking this link:
 This link will expire in 24 hours.
 
 If you did not register for an account, please ignore this email.''',
-        'noreply@auctionsite.com',
         [user.email],
-        fail_silently=False,
-    )
\ No newline at end of file
+    )
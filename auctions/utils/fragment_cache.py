@@ -0,0 +1,75 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+class FragmentCacheStats:
+    """Thread-safe hit/miss counters of the fragment cache in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def record(self, name, hit):
+        with self._lock:
+            counts = self._counts.setdefault(name, {'hits': 0, 'misses': 0})
+            counts['hits' if hit else 'misses'] += 1
+
+    def reset(self):
+        with self._lock:
+            self._counts = {}
+
+    def snapshot(self):
+        """Counters per fragment name, plus the hit ratio of each."""
+        with self._lock:
+            counts = {name: dict(values) for name, values in self._counts.items()}
+        for values in counts.values():
+            lookups = values['hits'] + values['misses']
+            values['hit_ratio'] = round(values['hits'] / lookups, 4) if lookups else 0.0
+        return counts
+
+
+stats = FragmentCacheStats()
+
+
+def fragment_key(name, listing):
+    """
+    Cache key of a listing fragment.
+
+    The key changes whenever the rendered fragment may: `version` is bumped
+    by every accepted bid and by closing the auction, and `updated` is
+    refreshed by any other write to the listing, such as an edit, a
+    reactivation or a bulk repair of its bid state. The category's own
+    `updated` covers renames, which write no listing row; callers load the
+    category with the listing, as with_feed_data() does. Superseded entries
+    are never read again and simply expire.
+    """
+    updated = listing.updated.timestamp() if listing.updated else 0
+    category = listing.category.updated.timestamp() if listing.category_id else 0
+    return f'fragment:{name}:{listing.pk}:{listing.version}:{updated}:{category}'
+
+
+def render_fragment(name, listing, render):
+    """
+    Return the cached HTML of a listing fragment, rendering it on a miss.
+
+    Args:
+        name: Fragment name, e.g. 'listing_card'
+        listing: AuctionListing the fragment displays
+        render: Callable producing the fragment's HTML
+
+    Returns:
+        str: Rendered fragment
+    """
+    if not settings.FRAGMENT_CACHE_ENABLED:
+        return render()
+
+    cache = caches[settings.FRAGMENT_CACHE_ALIAS]
+    key = fragment_key(name, listing)
+    html = cache.get(key)
+    stats.record(name, html is not None)
+    if html is None:
+        html = render()
+        cache.set(key, html, settings.FRAGMENT_CACHE_TIMEOUT)
+    return html
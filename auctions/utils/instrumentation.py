@@ -0,0 +1,159 @@
+import bisect
+import contextvars
+import threading
+import time
+
+from django.template.backends.django import DjangoTemplates, Template
+
+# upper bounds of the histogram buckets; the last bucket is open-ended
+DURATION_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# metrics of the request being handled; copied into the threads that
+# sync_to_async starts, so queries of async views are counted as well
+_current = contextvars.ContextVar('request_metrics', default=None)
+
+
+class QueryBudgetExceeded(AssertionError):
+    """Raised, when budgets are enforced, if a view runs more queries than it declared."""
+
+
+def query_budget(limit):
+    """
+    Declare the maximum number of SQL queries a view may run per request.
+
+    Requests over budget are logged as warnings by InstrumentationMiddleware,
+    and raise QueryBudgetExceeded when settings.QUERY_BUDGET_ENFORCE is set
+    (it is during tests), so N+1 regressions fail the test suite.
+
+    The budget covers the whole request, including the session and user
+    lookups of the middleware.
+    """
+    def decorator(view_func):
+        # functools.wraps copies __dict__, so decorators applied on top keep it
+        view_func.query_budget = limit
+        return view_func
+    return decorator
+
+
+class RequestMetrics:
+    """Counters collected while one request is handled."""
+
+    __slots__ = ('queries', 'db_time', 'render_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+
+    def as_dict(self):
+        labels = [f'<={bound}' for bound in self.buckets] + [f'>{self.buckets[-1]}']
+        return {
+            'buckets': dict(zip(labels, self.counts)),
+            'mean': round(self.total / sum(self.counts), 3) if any(self.counts) else 0.0,
+        }
+
+
+class ViewStats:
+    """Aggregated metrics of all requests handled by this process, per view name."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def record(self, view, metrics, wall_time, over_budget):
+        with self._lock:
+            stats = self._views.get(view)
+            if stats is None:
+                stats = self._views[view] = {
+                    'requests': 0,
+                    'over_budget': 0,
+                    'queries': Histogram(QUERY_BUCKETS),
+                    'db_ms': Histogram(DURATION_BUCKETS_MS),
+                    'render_ms': Histogram(DURATION_BUCKETS_MS),
+                    'wall_ms': Histogram(DURATION_BUCKETS_MS),
+                }
+            stats['requests'] += 1
+            stats['over_budget'] += over_budget
+            stats['queries'].add(metrics.queries)
+            stats['db_ms'].add(metrics.db_time * 1000)
+            stats['render_ms'].add(metrics.render_time * 1000)
+            stats['wall_ms'].add(wall_time * 1000)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                view: {key: value.as_dict() if isinstance(value, Histogram) else value
+                       for key, value in stats.items()}
+                for view, stats in self._views.items()
+            }
+
+
+view_stats = ViewStats()
+
+
+def start_request():
+    """Begin collecting metrics for the current context; returns (metrics, token)."""
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper adding each query to the current request's metrics."""
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.db_time += time.perf_counter() - start
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """connection_created receiver hooking record_query into every new connection."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = _current.get()
+        if metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.render_time += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates backend timing each top-level template render of a request."""
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
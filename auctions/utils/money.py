@@ -0,0 +1,39 @@
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+CENT = Decimal('0.01')
+# max_digits of MoneyField: 10 digits of dollars and 2 of cents
+MAX_DIGITS = 12
+
+
+def to_money(value):
+    """
+    Convert a price or bid amount to an exact Decimal of whole cents.
+
+    Floats go through their shortest repr, so 10.1 becomes Decimal('10.10')
+    rather than the binary approximation; half cents round up.
+
+    Raises:
+        ValueError: If value is not a finite number or has more than
+            MAX_DIGITS digits in whole cents
+    """
+    if isinstance(value, float):
+        value = repr(value)
+    try:
+        amount = Decimal(value)
+    except (InvalidOperation, TypeError):
+        raise ValueError(f"Invalid amount: {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"Invalid amount: {value!r}")
+    try:
+        # more digits than the context's precision, e.g. 1e30, cannot be quantized
+        amount = amount.quantize(CENT, rounding=ROUND_HALF_UP)
+    except InvalidOperation:
+        raise ValueError(f"Amount too large: {value!r}")
+    if len(amount.as_tuple().digits) > MAX_DIGITS:
+        raise ValueError(f"Amount too large: {value!r}")
+    return amount
+
+
+def format_money(value):
+    """Format an amount for display, e.g. $1,234.50."""
+    return f"${to_money(value):,}"
@@ -0,0 +1,287 @@
+import atexit
+import logging
+import threading
+import time
+from collections import Counter, deque
+
+from django.conf import settings
+from django.db import OperationalError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from ..models import AuctionListing, Bid, ProxyBid
+from .bid_engine import BidResult, check_bid
+from .realtime import publish_bid
+
+logger = logging.getLogger(__name__)
+
+
+def _book_key(listing_id):
+    # views pass the id from the URL as a string, other callers as an int
+    try:
+        return int(listing_id)
+    except (TypeError, ValueError):
+        return None
+
+
+class ListingBook:
+    """
+    Bid state of one hot listing, held in memory while its bids are validated there.
+
+    It has the attributes of AuctionListing that check_bid and publish_bid
+    read. `version` is the version of the listing row in the database, which
+    the next flush compares and swaps.
+    """
+
+    __slots__ = ('pk', 'owner_id', 'is_active', 'ends_at', 'starting_price', 'current_price', 'bid_count',
+                 'high_bidder_id', 'version', 'last_bid_at')
+
+    def __init__(self, listing):
+        for name in self.__slots__[:-1]:
+            setattr(self, name, getattr(listing, name))
+        self.last_bid_at = time.monotonic()
+
+
+class OrderBooks:
+    """
+    In-process order books for the few listings that draw bids faster than
+    the database path handles comfortably.
+
+    A listing gets a book once it has seen ORDER_BOOK_HOT_BIDS_PER_MINUTE
+    bids within a minute in this process. From then on its bids are checked
+    against the book in memory and accepted without a query. Accepted bids
+    are queued in the order they were accepted. flush() compares and swaps
+    each listing's bid state and writes the bids of the listings that swapped
+    with one bulk insert, in that order, either from a background thread
+    every ORDER_BOOK_FLUSH_INTERVAL seconds or inline once
+    ORDER_BOOK_FLUSH_SIZE bids are waiting.
+
+    Books live only in this process. After a restart every listing starts
+    over on the database path, and bids accepted since the last flush are
+    lost if the process dies without reaching its exit handler. The books
+    are only exact when one process takes all bids of a listing. A bid
+    written by another process, or a close, makes the next flush's
+    compare-and-swap fail. The bids accepted in memory for that listing are
+    then dropped rather than stored against a state they were not checked
+    against, and the listing's bid state is recomputed from its bids. Listings
+    with maximum (proxy) bids stay on the database path, where those are
+    resolved.
+    """
+
+    def __init__(self):
+        self._books = {}
+        self._recent = {}
+        self._pending = deque()
+        # guards _books, _recent and _pending; held only for in-memory work
+        self._lock = threading.Lock()
+        # one flush at a time, so batches reach the database in order
+        self._flush_lock = threading.RLock()
+        self._flusher = None
+
+    def _is_hot(self, listing_id, now):
+        threshold = max(settings.ORDER_BOOK_HOT_BIDS_PER_MINUTE, 1)
+        if len(self._recent) > 10000:
+            # forget cold listings rather than grow without bound
+            self._recent.clear()
+        times = self._recent.get(listing_id)
+        if times is None or times.maxlen != threshold:
+            times = self._recent[listing_id] = deque(maxlen=threshold)
+        times.append(now)
+        return len(times) == threshold and now - times[0] <= 60
+
+    def _load(self, listing_id):
+        """A book for the listing, or None when it has to stay on the database path."""
+        listing = AuctionListing.objects.only(
+            'owner', 'is_active', 'ends_at', 'starting_price', 'current_price', 'bid_count', 'high_bidder', 'version'
+        ).filter(pk=listing_id).first()
+        if listing is None or not listing.is_active or ProxyBid.objects.filter(listing_id=listing_id).exists():
+            return None
+        return ListingBook(listing)
+
+    def submit(self, listing_id, bidder, amount):
+        """
+        Place a bid through the listing's book.
+
+        Returns:
+            BidResult: ACCEPTED with the bid, not saved yet, or REJECTED with
+            the reason. None when the listing is not hot and the bid has to go
+            through the database path.
+        """
+        listing_id = _book_key(listing_id)
+        if listing_id is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            book = self._books.get(listing_id)
+            if book is None and not self._is_hot(listing_id, now):
+                return None
+        if book is None:
+            book = self._load(listing_id)
+            if book is None:
+                return None
+            with self._lock:
+                book = self._books.setdefault(listing_id, book)
+
+        with self._lock:
+            if self._books.get(listing_id) is not book:
+                # released while this bid was on its way
+                return None
+            refused = check_bid(book, bidder, amount)
+            if refused:
+                return refused
+            bid = Bid(bidder=bidder, listing_id=listing_id, amount=amount)
+            book.current_price = amount
+            book.bid_count += 1
+            book.high_bidder_id = bidder.id
+            book.last_bid_at = now
+            self._pending.append((book, bid))
+            pending = len(self._pending)
+
+        publish_bid(book, bid)
+        if pending >= settings.ORDER_BOOK_FLUSH_SIZE:
+            try:
+                self.flush()
+            except OperationalError:
+                # the bid is accepted and still queued; the bidder does not get the error
+                logger.warning("Inline order book flush failed, leaving it to the flusher", exc_info=True)
+        self._start_flusher()
+        return BidResult(BidResult.ACCEPTED, "Bid placed successfully!", bid)
+
+    def flush(self):
+        """
+        Write the bids accepted in memory, in the order they were accepted.
+
+        If the write lock is taken the bids stay queued for the next flush.
+        Any other error rolls the batch back; its listings are then written
+        one at a time, so only the bids of a listing that fails again are
+        dropped, and that listing is resynced from the database.
+
+        Returns:
+            int: Number of bids written; bids of listings that diverged or failed are dropped
+        """
+        with self._flush_lock:
+            with self._lock:
+                batch = list(self._pending)
+                self._pending.clear()
+            if not batch:
+                self._evict_idle()
+                return 0
+
+            try:
+                written, diverged = self._write(batch)
+            except OperationalError:
+                # the write lock is taken; keep the bids, still in order, for the next flush
+                with self._lock:
+                    self._pending.extendleft(reversed(batch))
+                raise
+            except Exception:
+                logger.exception("Order book flush of %d bids failed, writing its listings one at a time",
+                                 len(batch))
+                written, diverged = self._write_per_listing(batch)
+
+            for book in {book for book, _ in batch} - diverged:
+                book.version += 1
+            if diverged:
+                self._resync(diverged, len(batch) - len(written))
+            self._evict_idle()
+            return len(written)
+
+    def _write(self, batch):
+        """
+        Compare and swap the bid state of the batch's listings and insert the
+        bids of those that swapped, in one transaction.
+
+        Returns:
+            tuple: (bids written, books whose listing diverged)
+        """
+        # every bid leaves its listing at its own amount and bidder, so the
+        # last bid of each book in the batch is that listing's new state
+        last_bids = {book: bid for book, bid in batch}
+        counts = Counter(book for book, _ in batch)
+        now = timezone.now()
+        with transaction.atomic():
+            diverged = {
+                book for book, bid in last_bids.items()
+                if not AuctionListing.objects.filter(pk=book.pk, version=book.version, is_active=True).update(
+                    current_price=bid.amount,
+                    bid_count=F('bid_count') + counts[book],
+                    high_bidder=bid.bidder,
+                    version=F('version') + 1,
+                    updated=now
+                )
+            }
+            # bids of a listing that was closed or bid on elsewhere are not stored
+            written = [bid for book, bid in batch if book not in diverged]
+            Bid.objects.bulk_create(written)
+        return written, diverged
+
+    def _write_per_listing(self, batch):
+        written, diverged = [], set()
+        for book in dict.fromkeys(book for book, _ in batch):
+            try:
+                book_written, book_diverged = self._write([(b, bid) for b, bid in batch if b is book])
+            except Exception:
+                # e.g. a bidder deleted since the bid was accepted
+                logger.exception("Order book flush failed for listing %s", book.pk)
+                book_written, book_diverged = [], {book}
+            written += book_written
+            diverged |= book_diverged
+        return written, diverged
+
+    def _resync(self, books, dropped):
+        # another process wrote to these listings, or closed them, in the meantime
+        from .utils import reconcile_listing_bid_state
+
+        logger.warning("Order book out of sync with the database for listings %s; dropped %d accepted bids",
+                       [book.pk for book in books], dropped)
+        with self._lock:
+            for book in books:
+                if self._books.get(book.pk) is book:
+                    del self._books[book.pk]
+        reconcile_listing_bid_state(AuctionListing.objects.filter(pk__in=[book.pk for book in books]))
+
+    def _evict_idle(self):
+        idle_since = time.monotonic() - settings.ORDER_BOOK_IDLE_TIMEOUT
+        with self._lock:
+            pending = {book for book, _ in self._pending}
+            for listing_id, book in list(self._books.items()):
+                if book.last_bid_at < idle_since and book not in pending:
+                    del self._books[listing_id]
+
+    def release(self, listing_id):
+        """Write the listing's pending bids and send its next bids through the database path."""
+        listing_id = _book_key(listing_id)
+        with self._flush_lock:
+            with self._lock:
+                released = self._books.pop(listing_id, None) is not None
+                self._recent.pop(listing_id, None)
+            if released:
+                self.flush()
+
+    def reset(self):
+        """Drop every book and pending bid without writing them."""
+        with self._flush_lock, self._lock:
+            self._books.clear()
+            self._recent.clear()
+            self._pending.clear()
+
+    def _start_flusher(self):
+        if not settings.ORDER_BOOK_FLUSH_INTERVAL or self._flusher is not None:
+            return
+        with self._lock:
+            if self._flusher is not None:
+                return
+            self._flusher = threading.Thread(target=self._run, name='order-book-flusher', daemon=True)
+        atexit.register(self.flush)
+        self._flusher.start()
+
+    def _run(self):
+        while True:
+            time.sleep(settings.ORDER_BOOK_FLUSH_INTERVAL)
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Order book flush failed, retrying")
+
+
+order_books = OrderBooks()
@@ -0,0 +1,176 @@
+import base64
+import binascii
+import datetime
+import decimal
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor cannot be decoded."""
+
+
+def _json_value(value):
+    # isoformat keeps full microsecond precision, which keyset equality needs
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+
+def encode_cursor(values):
+    """Encode a list of ordering values as an opaque, URL-safe cursor."""
+    raw = json.dumps(values, default=_json_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Decode a cursor produced by encode_cursor back into its list of values.
+
+    Raises:
+        InvalidCursor: If the cursor is malformed
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values
+
+
+class CursorPage:
+    """
+    One page of a keyset-paginated queryset.
+
+    Attributes:
+        object_list (list): Items on this page
+        next_cursor (str, optional): Opaque cursor of the next page, None on the last page
+    """
+
+    def __init__(self, object_list, next_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class CursorPaginator:
+    """
+    Keyset paginator: each page continues after the ordering values of the
+    previous page's last row, so the cost of a page does not depend on how
+    deep into the result set it is (unlike OFFSET).
+
+    Args:
+        queryset: QuerySet to paginate
+        ordering: Field names, optionally prefixed with '-', ending in a unique field
+        per_page: Number of items per page
+    """
+
+    def __init__(self, queryset, ordering=('-created', 'id'), per_page=None):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page or settings.LISTINGS_PER_PAGE
+        self.fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+
+    def encode_cursor(self, obj):
+        # rows of a values() queryset are dicts keyed by field name
+        if isinstance(obj, dict):
+            return encode_cursor([obj[field.attname] for field in self.fields])
+        return encode_cursor([getattr(obj, field.attname) for field in self.fields])
+
+    def decode_cursor(self, cursor):
+        values = decode_cursor(cursor)
+        # encode_cursor only writes strings and numbers; anything else was crafted
+        if len(values) != len(self.fields) or not all(
+                isinstance(value, (str, int, float)) and not isinstance(value, bool) for value in values):
+            raise InvalidCursor(cursor)
+        try:
+            values = [field.to_python(value) for field, value in zip(self.fields, values)]
+        except (ValidationError, TypeError, ValueError):
+            raise InvalidCursor(cursor)
+        # None, e.g. from an empty string, cannot be compared against in a filter
+        if any(value is None for value in values):
+            raise InvalidCursor(cursor)
+        return values
+
+    def _after(self, values):
+        """Build the filter selecting rows that sort after the given ordering values."""
+        condition = Q()
+        for i, name in enumerate(self.ordering):
+            column = name.lstrip('-')
+            lookup = 'lt' if name.startswith('-') else 'gt'
+            step = Q(**{f'{column}__{lookup}': values[i]})
+            for prev_name, prev_value in zip(self.ordering[:i], values[:i]):
+                step &= Q(**{prev_name.lstrip('-'): prev_value})
+            condition |= step
+        return condition
+
+    def page_queryset(self, cursor=None):
+        """
+        The queryset of the page following the cursor, unevaluated.
+
+        Useful where the rows are fetched elsewhere, e.g. by a Prefetch;
+        hand the fetched rows to make_page().
+
+        Raises:
+            InvalidCursor: If the cursor was not produced by this paginator
+        """
+        queryset = self.queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self._after(self.decode_cursor(cursor)))
+        # fetch one extra row to learn whether another page exists
+        return queryset[:self.per_page + 1]
+
+    def make_page(self, items):
+        """Build the CursorPage from the rows fetched by page_queryset()."""
+        items = list(items)
+        if len(items) <= self.per_page:
+            return CursorPage(items)
+        items = items[:self.per_page]
+        return CursorPage(items, self.encode_cursor(items[-1]))
+
+    def page(self, cursor=None):
+        """
+        Fetch the page following the cursor.
+
+        Raises:
+            InvalidCursor: If the cursor was not produced by this paginator
+        """
+        return self.make_page(self.page_queryset(cursor))
+
+    async def apage(self, cursor=None):
+        """Async version of page()."""
+        return self.make_page([item async for item in self.page_queryset(cursor)])
+
+
+def paginate_listings(listings, cursor=None, per_page=None):
+    """Return a page of listings in feed order, restarting from the top on a bad cursor."""
+    paginator = CursorPaginator(listings, per_page=per_page)
+    try:
+        return paginator.page(cursor)
+    except InvalidCursor:
+        return paginator.page()
+
+
+async def apaginate_listings(listings, cursor=None, per_page=None):
+    """Async version of paginate_listings()."""
+    paginator = CursorPaginator(listings, per_page=per_page)
+    try:
+        return await paginator.apage(cursor)
+    except InvalidCursor:
+        return await paginator.apage()
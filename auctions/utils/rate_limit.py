@@ -0,0 +1,170 @@
+import random
+import time
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.db import connection
+from django.shortcuts import redirect
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from ..models import RateLimitCounter
+from .caching import cache_is_shared
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Parse a rate such as '10/m' into (limit, period in seconds)."""
+    count, _, period = rate.partition('/')
+    try:
+        return int(count), PERIODS[period[0]]
+    except (ValueError, KeyError, IndexError):
+        raise ValueError(f"Invalid rate {rate!r}, expected e.g. '10/m'")
+
+
+class CacheBackend:
+    """
+    Counters in the Django cache.
+
+    add() and incr() are atomic on shared caches (Memcached, Redis, the
+    database cache), so counts are exact across processes when such a cache
+    is configured. With the default LocMemCache counters are per process.
+    """
+
+    def incr(self, key, ttl):
+        cache.add(key, 0, ttl)
+        try:
+            return cache.incr(key)
+        except ValueError:
+            # the key expired between add() and incr()
+            cache.add(key, 1, ttl)
+            return 1
+
+    def get_many(self, keys):
+        values = cache.get_many(keys)
+        return [values.get(key, 0) for key in keys]
+
+
+class DatabaseBackend:
+    """
+    Counters in the RateLimitCounter table, shared by every process that uses
+    the database, without requiring a shared cache.
+    """
+
+    # fraction of new windows that also purge expired counters
+    PURGE_PROBABILITY = 0.01
+
+    def incr(self, key, ttl):
+        now = timezone.now()
+        if random.random() < self.PURGE_PROBABILITY:
+            RateLimitCounter.objects.filter(expires_at__lt=now).delete()
+
+        # one upsert creates the window's counter or bumps it, whichever process comes first
+        table = connection.ops.quote_name(RateLimitCounter._meta.db_table)
+        key_column, count_column, expires_column = (connection.ops.quote_name(name)
+                                                    for name in ('key', 'count', 'expires_at'))
+        sql = (f'INSERT INTO {table} ({key_column}, {count_column}, {expires_column}) VALUES (%s, 1, %s) '
+               f'ON CONFLICT ({key_column}) DO UPDATE SET {count_column} = {table}.{count_column} + 1')
+        returning = connection.features.can_return_columns_from_insert
+        if returning:
+            sql += f' RETURNING {count_column}'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [key, connection.ops.adapt_datetimefield_value(now + timedelta(seconds=ttl))])
+            if returning:
+                return cursor.fetchone()[0]
+        return RateLimitCounter.objects.values_list('count', flat=True).get(key=key)
+
+    def get_many(self, keys):
+        counts = dict(RateLimitCounter.objects.filter(
+            key__in=keys, expires_at__gte=timezone.now()).values_list('key', 'count'))
+        return [counts.get(key, 0) for key in keys]
+
+
+def get_backend():
+    """
+    Instantiate the backend named by settings.RATE_LIMIT_BACKEND.
+
+    When it is None, CacheBackend is used if the default cache is shared
+    between processes and DatabaseBackend otherwise, so that N workers with
+    per-process caches do not allow N times the limit.
+    """
+    if settings.RATE_LIMIT_BACKEND is None:
+        return CacheBackend() if cache_is_shared() else DatabaseBackend()
+    return import_string(settings.RATE_LIMIT_BACKEND)()
+
+
+class RateLimiter:
+    """
+    Sliding-window rate limiter.
+
+    Hits are counted in fixed windows of one period; the previous window's
+    count is weighted by how much of it still overlaps the sliding window,
+    which approximates a true sliding log with two counters per key.
+
+    Args:
+        scope: Name separating this limiter's counters from other limiters
+        rate: Allowed hits per period, e.g. '10/m'
+        backend: Counter backend, defaults to settings.RATE_LIMIT_BACKEND
+    """
+
+    def __init__(self, scope, rate, backend=None):
+        self.scope = scope
+        self.limit, self.period = parse_rate(rate)
+        self.backend = backend or get_backend()
+
+    def _window_key(self, key, window):
+        return f'ratelimit:{self.scope}:{key}:{window}'
+
+    def hit(self, key, now=None):
+        """
+        Record a hit for key and report whether it is within the limit.
+
+        Returns:
+            bool: True if the hit is allowed
+        """
+        now = time.time() if now is None else now
+        window, offset = divmod(now, self.period)
+        window = int(window)
+
+        current = self.backend.incr(self._window_key(key, window), self.period * 2)
+        if current > self.limit:
+            return False
+        previous, = self.backend.get_many([self._window_key(key, window - 1)])
+        weight = 1 - offset / self.period
+        return previous * weight + current <= self.limit
+
+
+def client_key(request):
+    """Identify the client of a request by user id, or IP address for anonymous users."""
+    if request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def rate_limit(scope, rate, methods=('POST',), message="Too many attempts. Please try again later."):
+    """
+    Decorator limiting how often a client may call a view.
+
+    Requests over the limit are redirected back to the same URL with an error
+    message instead of reaching the view.
+
+    Args:
+        scope: Name of the limiter, e.g. 'comment'
+        rate: Allowed requests per period, e.g. '5/m'
+        methods: HTTP methods that count towards the limit
+        message: Error message shown when the limit is exceeded
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method in methods:
+                if not RateLimiter(scope, rate).hit(client_key(request)):
+                    messages.error(request, message)
+                    return redirect(request.path)
+            return view_func(request, *args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,104 @@
+import asyncio
+import json
+import threading
+from collections import defaultdict
+
+
+class Subscription:
+    """
+    A single client's feed of events for one listing.
+
+    Events are delivered into an asyncio queue owned by the subscriber's event
+    loop. When a slow client lets the queue fill up, the oldest event is
+    dropped: every event carries the full current state, so only the latest
+    one matters.
+    """
+
+    def __init__(self, listing_id, loop, maxsize):
+        self.listing_id = listing_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+
+    def _deliver(self, event):
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class ListingBroker:
+    """
+    In-process publish/subscribe hub fanning listing events out to every
+    subscribed client.
+
+    publish() may be called from any thread (e.g. a sync view placing a bid);
+    delivery is handed to each subscriber's event loop. Only clients connected
+    to the same process receive events.
+    """
+
+    def __init__(self, queue_size=16):
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, listing_id):
+        """Subscribe the running event loop to events of a listing."""
+        subscription = Subscription(listing_id, asyncio.get_running_loop(), self.queue_size)
+        with self._lock:
+            self._subscribers[listing_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.listing_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.listing_id]
+
+    def subscriber_count(self, listing_id):
+        with self._lock:
+            return len(self._subscribers.get(listing_id, ()))
+
+    def publish(self, listing_id, event):
+        """Send event to every subscriber of the listing; returns the number of subscribers."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(listing_id, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription._deliver, event)
+            except RuntimeError:
+                # the subscriber's loop has shut down
+                self.unsubscribe(subscription)
+        return len(subscribers)
+
+
+broker = ListingBroker()
+
+
+def format_sse(event):
+    """Encode an event dict as a server-sent events message."""
+    return f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def publish_bid(listing, bid):
+    """Broadcast a new highest bid on listing."""
+    broker.publish(listing.pk, {
+        'type': 'bid',
+        'listing': listing.pk,
+        'current_price': float(bid.amount),
+        'bid_count': listing.bid_count,
+        'high_bidder': bid.bidder.username,
+    })
+
+
+def publish_close(listing):
+    """Broadcast that the auction of listing has closed."""
+    broker.publish(listing.pk, {
+        'type': 'closed',
+        'listing': listing.pk,
+        'current_price': float(listing.current_price),
+        'owner': listing.owner.username,
+    })
@@ -0,0 +1,113 @@
+import math
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+from ..models import AuctionListing
+from .pagination import CursorPage, CursorPaginator, InvalidCursor, decode_cursor, encode_cursor
+
+FTS_TABLE = 'auctions_listing_fts'
+LISTING_TABLE = 'auctions_auctionlisting'
+# must match the expression indexed by migrations/_search_index.py exactly
+# for Postgres to use the GIN index
+PG_VECTOR = "to_tsvector('english', coalesce(l.title, '') || ' ' || coalesce(l.description, ''))"
+
+
+def search_terms(query):
+    """Split a user query into lowercase word tokens, dropping all syntax."""
+    return re.findall(r'\w+', query.lower())
+
+
+def _ranked_sql(vendor, terms, category, after, limit):
+    """
+    Build the ranked id query; returns (sql, params).
+
+    Ranks are negated where needed so that lower always sorts first, which
+    lets the keyset condition be the same on every backend.
+    """
+    if vendor == 'sqlite':
+        # every term must match, the last one as a prefix of a word
+        match = ' '.join(f'"{term}"' for term in terms[:-1]) + f' "{terms[-1]}"*'
+        # bm25() is lower for better matches; title hits weigh ten times more
+        sql = (f"SELECT l.id, bm25({FTS_TABLE}, 10.0, 1.0) AS search_rank FROM {FTS_TABLE} "
+               f"JOIN {LISTING_TABLE} l ON l.id = {FTS_TABLE}.rowid ")
+        where = [f"{FTS_TABLE} MATCH %s"]
+        params = [match.strip()]
+    else:
+        tsquery = ' & '.join(terms[:-1] + [f'{terms[-1]}:*'])
+        sql = (f"SELECT l.id, -ts_rank_cd({PG_VECTOR}, to_tsquery('english', %s)) AS search_rank "
+               f"FROM {LISTING_TABLE} l ")
+        where = [f"{PG_VECTOR} @@ to_tsquery('english', %s)"]
+        params = [tsquery, tsquery]
+
+    where.append("l.is_active")
+    if category:
+        sql += "JOIN auctions_category c ON c.id = l.category_id "
+        where.append("c.name = %s")
+        params.append(category)
+    sql += "WHERE " + " AND ".join(where)
+
+    sql = f"SELECT id, search_rank FROM ({sql}) ranked "
+    if after:
+        sql += "WHERE search_rank > %s OR (search_rank = %s AND id > %s) "
+        params += [after[0], after[0], after[1]]
+    sql += "ORDER BY search_rank, id LIMIT %s"
+    params.append(limit)
+    return sql, params
+
+
+def search_listings(query, category=None, cursor=None, per_page=None):
+    """
+    Full-text search over the titles and descriptions of active listings.
+
+    Results are ranked by relevance, the last word of the query matches as a
+    prefix, and pages are keyset-paginated on (rank, id) like the other
+    listing pages. Databases without a full-text index fall back to
+    icontains in feed order.
+
+    Args:
+        query: Free text entered by the user
+        category: Optional category name to restrict the results to
+        cursor: Cursor of the page to fetch, from a previous page's next_cursor
+        per_page: Page size, defaults to settings.LISTINGS_PER_PAGE
+
+    Returns:
+        CursorPage: Listings of the requested page
+
+    Raises:
+        InvalidCursor: If the cursor was not produced by this search
+    """
+    per_page = per_page or settings.LISTINGS_PER_PAGE
+    terms = search_terms(query)
+    if not terms:
+        return CursorPage([])
+
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        matches = Q()
+        for term in terms:
+            matches &= Q(title__icontains=term) | Q(description__icontains=term)
+        listings = AuctionListing.objects.filter(matches, is_active=True).with_feed_data()
+        if category:
+            listings = listings.filter(category__name=category)
+        return CursorPaginator(listings, per_page=per_page).page(cursor)
+
+    after = None
+    if cursor:
+        after = decode_cursor(cursor)
+        if len(after) != 2 or not all(isinstance(v, (int, float)) and math.isfinite(v) for v in after):
+            raise InvalidCursor(cursor)
+
+    sql, params = _ranked_sql(connection.vendor, terms, category, after, per_page + 1)
+    with connection.cursor() as db:
+        db.execute(sql, params)
+        rows = db.fetchall()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        next_cursor = encode_cursor([rows[-1][1], rows[-1][0]])
+
+    listings = AuctionListing.objects.with_feed_data().in_bulk([row[0] for row in rows])
+    return CursorPage([listings[row[0]] for row in rows if row[0] in listings], next_cursor)
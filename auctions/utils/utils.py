@@ -1,48 +1,435 @@
-from django.shortcuts import get_object_or_404
-from ..models import Bid, Watchlist, Notification
+import threading
+from collections import Counter, defaultdict
 
-
-def annotate_listing_with_max_bid(listing):
-    """Add max_bid attribute to a listing object."""
-    highest_bid = Bid.objects.filter(listing=listing).first()
-    listing.max_bid = highest_bid.amount if highest_bid else None
-    return listing
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, OuterRef, Subquery, When
+from django.utils import timezone
+from ..models import User, AuctionListing, Bid, BidArchive, ProxyBid, Watchlist, Notification
+from .order_book import order_books
+from .realtime import publish_close
 
 
 def get_listing_comments(listing):
     """Get all comments for a listing."""
-    return listing.comment_set.all()
+    return listing.comment_set.select_related('creator')
 
 
 def get_last_bid(listing):
     """Get the latest bid for a listing."""
-    return Bid.objects.filter(listing=listing).first()
+    # a maximum bid matching an equal, later one is written after it and wins
+    return Bid.objects.filter(listing=listing).order_by('-amount', '-id').first()
 
 
 def get_listing_bidders(listing):
     """Get all bidders for a listing."""
-    return Bid.objects.filter(listing=listing)
+    return Bid.objects.filter(listing=listing).select_related('bidder')
 
 
 def check_watchlist_status(user, listing):
     """Check if a listing is in user's watchlist."""
+    return listing.pk in watched_listing_ids(user)
+
+
+def _watchlist_cache_key(user):
+    return f'watchlist:{user.pk}:{user.watchlist_version}'
+
+
+def watched_listing_ids(user):
+    """
+    The ids of the listings on user's watchlist, as a frozenset.
+
+    The set is cached per user and watchlist version, and memoized on the
+    user object for the rest of the request, so "is watched" checks on list
+    pages cost no queries. Every Watchlist change bumps the version in the
+    database, so each process, whatever its cache, reads the new set on the
+    user's next request.
+    """
     if not user.is_authenticated:
-        return False
-    return Watchlist.objects.filter(user=user, listing=listing).exists()
+        return frozenset()
+    if not hasattr(user, '_watched_listing_ids'):
+        key = _watchlist_cache_key(user)
+        ids = cache.get(key)
+        if ids is None:
+            ids = frozenset(Watchlist.objects.filter(user=user).values_list('listing_id', flat=True))
+            cache.set(key, ids, settings.WATCHLIST_CACHE_TIMEOUT)
+        user._watched_listing_ids = ids
+    return user._watched_listing_ids
+
+
+def bump_watchlist_version(user_id):
+    """Move a user to a new watchlist version, which no cached set is stored under yet."""
+    User.objects.filter(pk=user_id).update(watchlist_version=F('watchlist_version') + 1)
+
+
+# set while update_watchlist deletes rows, which then bumps the version once
+_bulk_watchlist_change = threading.local()
+
+
+def watchlist_changed(sender, instance, **kwargs):
+    """post_save/post_delete receiver keeping the cached watchlists current."""
+    if not getattr(_bulk_watchlist_change, 'active', False):
+        bump_watchlist_version(instance.user_id)
+
+
+def update_watchlist(user, listing_ids, watch):
+    """
+    Add listings to, or remove them from, user's watchlist in bulk.
+
+    Unknown listings and the user's own listings are skipped when adding,
+    and listings already in the requested state are left alone.
+
+    Args:
+        user: The User whose watchlist changes
+        listing_ids: Iterable of listing primary keys
+        watch: True to add the listings, False to remove them
+
+    Returns:
+        int: Number of listings whose watched state changed
+    """
+    listing_ids = set(listing_ids)
+    if not listing_ids:
+        return 0
+
+    if watch:
+        addable = (AuctionListing.objects.filter(pk__in=listing_ids).exclude(owner=user)
+                   .exclude(whatchedListings__user=user).values_list('pk', flat=True))
+        # the unique constraint settles a concurrent add of the same listing,
+        # which is then counted here as well
+        created = Watchlist.objects.bulk_create(
+            [Watchlist(user=user, listing_id=pk) for pk in addable], ignore_conflicts=True)
+        changed = len(created)
+    else:
+        _bulk_watchlist_change.active = True
+        try:
+            changed, _ = Watchlist.objects.filter(user=user, listing_id__in=listing_ids).delete()
+        finally:
+            _bulk_watchlist_change.active = False
+
+    # one bump for the whole change; bulk_create sends no post_save anyway
+    bump_watchlist_version(user.pk)
+    # user still holds the old version; memoize the new set for the rest of the request
+    user._watched_listing_ids = frozenset(Watchlist.objects.filter(user=user).values_list('listing_id', flat=True))
+    return changed
+
+
+def notify_users(notifications):
+    """
+    Create notifications and add them to their recipients' unread counters.
+
+    Must run inside the transaction that produces the notifications, so the
+    counters can never drift from the rows. Users receiving the same number
+    of notifications share one UPDATE.
+    """
+    Notification.objects.bulk_create(notifications)
+
+    users_by_count = defaultdict(list)
+    for user_id, count in Counter(n.user_id for n in notifications).items():
+        users_by_count[count].append(user_id)
+    for count, user_ids in users_by_count.items():
+        User.objects.filter(pk__in=user_ids).update(
+            unread_notification_count=F('unread_notification_count') + count)
+
+
+def notification_deleted(sender, instance, **kwargs):
+    """post_delete receiver taking deleted unread notifications, e.g. of a deleted listing, off the counters."""
+    if not instance.is_read:
+        User.objects.filter(pk=instance.user_id, unread_notification_count__gt=0).update(
+            unread_notification_count=F('unread_notification_count') - 1)
+
+
+def mark_notifications_read(user):
+    """Mark all of a user's notifications as read and reset their unread counter."""
+    with transaction.atomic():
+        # resetting the counter first locks the user row, so a notification
+        # committed concurrently is either marked read below or counted after
+        User.objects.filter(pk=user.pk).update(unread_notification_count=0)
+        Notification.objects.filter(user=user, is_read=False).update(is_read=True)
+    user.unread_notification_count = 0
+
+
+def handle_auction_close(listing_page):
+    """
+    Close an auction; a listing with bids goes to its high bidder at the current price.
+
+    The close runs in one transaction holding the listing row (select_for_update,
+    or the write lock BEGIN IMMEDIATE takes on SQLite), and the winner is read
+    from that row, so it is always the bidder the bid engine recorded last.
+    Bumping the version makes bids racing with the close lose their
+    compare-and-swap. Only the fields of the close are written.
+
+    Args:
+        listing_page: AuctionListing to close; refreshed from the database afterwards
+
+    Returns:
+        User: The new owner, or None if the auction closed without bids or was closed already
+    """
+    with transaction.atomic():
+        listing = (AuctionListing.objects.select_for_update(of=('self',)).select_related('high_bidder')
+                   .filter(pk=listing_page.pk, is_active=True).first())
+        if listing is None:
+            listing_page.refresh_from_db()
+            return None
+
+        winner = listing.high_bidder if listing.bid_count else None
+        changes = {'is_active': False, 'version': F('version') + 1, 'updated': timezone.now()}
+        if winner is not None:
+            # SET expressions read the pre-update values; the listing starts over
+            # without bids, and archive_closed_bids moves the old ones out of
+            # the Bid table later instead of deleting them here
+            changes.update(owner=F('high_bidder'), starting_price=F('current_price'), bid_count=0,
+                           high_bidder=None, archive_pending=True)
+        AuctionListing.objects.filter(pk=listing.pk).update(**changes)
+
+        if winner is not None:
+            notify_users([Notification(user=winner, listing=listing)])
+
+    listing_page.refresh_from_db()
+    transaction.on_commit(lambda: publish_close(listing_page))
+    return winner
+
+
+def close_expired_auctions(batch_size=500, now=None):
+    """
+    Close one batch of active auctions whose end time has passed.
+
+    Listings are taken in ends_at order through the (is_active, ends_at)
+    index. A listing with bids goes to its high bidder at the current price,
+    exactly like handle_auction_close, and winners are notified in bulk.
+    Running several closers at once is safe: rows locked by another closer
+    are skipped where the database supports it, and each batch runs in one
+    transaction that only touches listings that are still active.
+
+    Args:
+        batch_size: Maximum number of listings closed by this call
+        now: Reference time, defaults to the current time
+
+    Returns:
+        int: Number of auctions closed
+    """
+    now = now or timezone.now()
+    if settings.ORDER_BOOK_ENABLED:
+        # the winners of hot listings must be in the database before they are closed
+        order_books.flush()
+    with transaction.atomic():
+        due = (AuctionListing.objects
+               .filter(is_active=True, ends_at__lte=now)
+               .order_by('ends_at')
+               .select_related('owner', 'high_bidder'))
+        if connection.features.has_select_for_update_skip_locked:
+            due = due.select_for_update(skip_locked=True, of=('self',))
+        batch = list(due[:batch_size])
+        if not batch:
+            return 0
+
+        sold = [listing for listing in batch if listing.bid_count and listing.high_bidder_id]
+        sold_ids = {listing.pk for listing in sold}
+        unsold = [listing for listing in batch if listing.pk not in sold_ids]
+
+        # SET expressions read the pre-update values, so owner/starting_price
+        # take the high bidder and current price of each row in one statement
+        AuctionListing.objects.filter(pk__in=sold_ids, is_active=True).update(
+            is_active=False,
+            owner=F('high_bidder'),
+            starting_price=F('current_price'),
+            bid_count=0,
+            high_bidder=None,
+            archive_pending=True,
+            version=F('version') + 1,
+            updated=now
+        )
+        AuctionListing.objects.filter(pk__in=[l.pk for l in unsold], is_active=True).update(
+            is_active=False,
+            version=F('version') + 1,
+            updated=now
+        )
+
+        notify_users([Notification(user_id=listing.high_bidder_id, listing=listing) for listing in sold])
+
+    for listing in sold:
+        listing.owner = listing.high_bidder
+        listing.starting_price = listing.current_price
+    for listing in batch:
+        transaction.on_commit(lambda listing=listing: publish_close(listing))
+    return len(batch)
+
+
+def _archive_bids(bids, limit=None):
+    """Copy bids to BidArchive and delete them from Bid, returning how many were moved."""
+    rows = bids.order_by('listing', '-amount').values_list('pk', 'bidder_id', 'listing_id', 'amount', 'created')
+    if limit is not None:
+        rows = rows[:limit]
+    rows = list(rows)
+    if not rows:
+        return 0
+
+    BidArchive.objects.bulk_create(
+        [BidArchive(bid_id=pk, bidder_id=bidder_id, listing_id=listing_id, amount=amount, placed_at=created)
+         for pk, bidder_id, listing_id, amount, created in rows],
+        ignore_conflicts=True
+    )
+    Bid.objects.filter(pk__in=[row[0] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_closed_bids(batch_size=None):
+    """
+    Move one chunk of the bids of closed auctions from Bid to BidArchive.
+
+    Closing an auction only flags the listing with archive_pending, so the
+    close never holds the Bid table's write lock for an unbounded DELETE.
+    Each call moves at most batch_size bids of flagged listings in one short
+    transaction and clears the flag of the listings it has emptied. Bids keep
+    their original id in the archive, where it is unique, so archivers racing
+    each other or reopen_auction never store a bid twice.
+
+    Args:
+        batch_size: Maximum number of bids moved by this call,
+            defaults to settings.BID_ARCHIVE_BATCH_SIZE
+
+    Returns:
+        int: Number of bids archived
+    """
+    batch_size = batch_size or settings.BID_ARCHIVE_BATCH_SIZE
+    with transaction.atomic():
+        pending = AuctionListing.objects.filter(archive_pending=True).order_by('pk')
+        if connection.features.has_select_for_update_skip_locked:
+            pending = pending.select_for_update(skip_locked=True)
+        listing_ids = list(pending.values_list('pk', flat=True)[:batch_size])
+        if not listing_ids:
+            return 0
+
+        moved = _archive_bids(Bid.objects.filter(listing__in=listing_ids), limit=batch_size)
+        drained = AuctionListing.objects.filter(pk__in=listing_ids).exclude(
+            pk__in=Bid.objects.filter(listing__in=listing_ids).values('listing'))
+        # update() does not touch `updated` by itself; bump it for the fragment cache keys
+        drained.update(archive_pending=False, updated=timezone.now())
+    return moved
+
+
+def reopen_auction(listing_page):
+    """
+    Reopen a closed auction, archiving the bids of its previous round first.
+
+    The old bids are moved in chunks of BID_ARCHIVE_BATCH_SIZE, each in its
+    own short transaction like archive_closed_bids, so a reopen never holds
+    the Bid table's write lock for an unbounded DELETE. An end time that has
+    passed is cleared, or every bid would be refused and the expiry
+    scheduler would close the auction again; a future one is kept.
+
+    Args:
+        listing_page: AuctionListing to reopen; refreshed from the database afterwards
+
+    Returns:
+        bool: True if the auction was reopened, False if it was open already
+    """
+    batch_size = settings.BID_ARCHIVE_BATCH_SIZE
+    # bids of a round someone else has reopened meanwhile are live again
+    old_bids = Bid.objects.filter(listing=listing_page, listing__is_active=False)
+    while True:
+        with transaction.atomic():
+            moved = _archive_bids(old_bids, limit=batch_size)
+        if moved < batch_size:
+            break
+
+    now = timezone.now()
+    with transaction.atomic():
+        reopened = AuctionListing.objects.filter(pk=listing_page.pk, is_active=False).update(
+            is_active=True, archive_pending=False, version=F('version') + 1, updated=now,
+            ends_at=Case(When(ends_at__lte=now, then=None), default=F('ends_at')))
+        if reopened:
+            # the new round starts without the maximum bids of the previous one
+            ProxyBid.objects.filter(listing=listing_page).delete()
+    listing_page.refresh_from_db()
+    return bool(reopened)
+
+
+def reconcile_listing_bid_state(listings=None, batch_size=500):
+    """
+    Recompute the denormalized bid state of listings from the Bid table.
+
+    Args:
+        listings: Optional AuctionListing queryset to restrict the check to
+        batch_size: Number of listings written per bulk update
+
+    Returns:
+        int: Number of listings whose stored bid state was out of date
+    """
+    if listings is None:
+        listings = AuctionListing.objects.all()
+
+    # bids of closed auctions are waiting for the archiver and no longer count
+    top_bid = Bid.objects.live().filter(listing=OuterRef('pk')).order_by('-amount', '-id')
+    bid_count = (Bid.objects.live().filter(listing=OuterRef('pk')).order_by()
+                 .values('listing').annotate(n=Count('id')).values('n'))
+    listings = listings.order_by().annotate(
+        top_amount=Subquery(top_bid.values('amount')[:1]),
+        top_bidder=Subquery(top_bid.values('bidder')[:1]),
+        n_bids=Subquery(bid_count),
+    )
+
+    # bulk_update() skips auto_now; `updated` changes the fragment cache keys
+    fields = ['current_price', 'bid_count', 'high_bidder', 'updated']
+    now = timezone.now()
+    stale = []
+    fixed = 0
+    for listing in listings.iterator(chunk_size=batch_size):
+        n_bids = listing.n_bids or 0
+        current_price = listing.top_amount if n_bids else listing.starting_price
+        if (listing.bid_count, listing.current_price, listing.high_bidder_id) == \
+                (n_bids, current_price, listing.top_bidder):
+            continue
+
+        listing.bid_count = n_bids
+        listing.current_price = current_price
+        listing.high_bidder_id = listing.top_bidder
+        listing.updated = now
+        stale.append(listing)
+        if len(stale) >= batch_size:
+            AuctionListing.objects.bulk_update(stale, fields)
+            fixed += len(stale)
+            stale = []
+
+    if stale:
+        AuctionListing.objects.bulk_update(stale, fields)
+        fixed += len(stale)
+    return fixed
+
+
+def reconcile_unread_notification_counts(users=None, batch_size=500):
+    """
+    Recompute users' unread notification counters from the Notification table.
+
+    Args:
+        users: Optional User queryset to restrict the check to
+        batch_size: Number of users written per bulk update
+
+    Returns:
+        int: Number of users whose stored counter was out of date
+    """
+    if users is None:
+        users = User.objects.all()
 
+    unread = (Notification.objects.filter(user=OuterRef('pk'), is_read=False).order_by()
+              .values('user').annotate(n=Count('id')).values('n'))
+    users = users.order_by().annotate(n_unread=Subquery(unread)).only('unread_notification_count')
 
-def handle_auction_close(listing_page, last_bid):
-    """Handle the closure of an auction."""
-    if not last_bid:
-        listing_page.is_active = False
-        listing_page.save()
-        return "Auction closed successfully."
+    stale = []
+    fixed = 0
+    for user in users.iterator(chunk_size=batch_size):
+        n_unread = user.n_unread or 0
+        if user.unread_notification_count == n_unread:
+            continue
 
-    listing_page.is_active = False
-    listing_page.owner = last_bid.bidder
-    listing_page.starting_price = last_bid.amount
-    listing_page.save()
+        user.unread_notification_count = n_unread
+        stale.append(user)
+        if len(stale) >= batch_size:
+            User.objects.bulk_update(stale, ['unread_notification_count'])
+            fixed += len(stale)
+            stale = []
 
-    Bid.objects.filter(listing=listing_page).delete()
-    Notification.objects.create(user=last_bid.bidder, listing=listing_page)
-    return f"Auction closed. New owner: {last_bid.bidder}"
+    if stale:
+        User.objects.bulk_update(stale, ['unread_notification_count'])
+        fixed += len(stale)
+    return fixed
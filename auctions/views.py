@@ -1,60 +1,159 @@
+import asyncio
+import tempfile
+from asgiref.sync import sync_to_async
 from django.contrib.auth import authenticate, login, logout
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
 from django.db import IntegrityError
-from django.http import HttpResponse, HttpResponseRedirect, HttpResponseNotAllowed
+from django.db.models import Count, Max, Prefetch
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (FileResponse, Http404, HttpResponse, HttpResponseRedirect, HttpResponseNotAllowed,
+                         JsonResponse, StreamingHttpResponse)
 from django.shortcuts import render
 from django.urls import reverse
-from django.core.cache import cache
-from .models import User, Category, AuctionListing, Bid, Comment, Watchlist, Notification
+from .models import User, Category, AuctionListing, Bid, Comment, Notification
 from .forms import ListingForm, BidForm
 from django.utils import timezone
 from django.contrib import messages
 from datetime import timedelta
 from django.conf import settings
 import secrets
-from django.core.mail import send_mail
-from .utils import send_confirmation_email
-from django.shortcuts import get_object_or_404, redirect
-from .utils import (annotate_listing_with_max_bid, get_listing_comments,
-                    get_last_bid, get_listing_bidders, check_watchlist_status,
-                    handle_auction_close)
+from .utils import queue_email, send_confirmation_email
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect
+from .utils import (check_watchlist_status, handle_auction_close, reopen_auction,
+                    paginate_listings, CursorPaginator, submit_bid, submit_max_bid, RateLimiter, rate_limit,
+                    broker, format_sse, search_listings, InvalidCursor, mark_notifications_read, query_budget,
+                    conditional_page, to_money, watched_listing_ids, update_watchlist, order_books,
+                    apaginate_listings)
+from .utils.bulk_io import (ImportFileError, bid_export_rows, import_listings, iter_import_rows,
+                            listing_export_rows, stream_csv, write_xlsx)
+from .utils.fragment_cache import stats as fragment_stats
+from .utils.instrumentation import view_stats
+
+
+def viewer_state(request):
+    """What pages show about the current user: who they are, their unread count and watched listings."""
+    if not request.user.is_authenticated:
+        return None
+    return (request.user.pk, request.user.unread_notification_count, request.user.watchlist_version)
+
+
+async def aviewer(request):
+    """
+    The current user, for async views.
+
+    request.user and request.auser() cache their lookups separately;
+    pinning request.user to the user loaded here lets the templates and sync
+    helpers of the view reuse it instead of loading it again.
+    """
+    request.user = await request.auser()
+    return request.user
 
 
+def index_validators(request):
+    """
+    Validators for the listings feed, from one aggregate over active listings.
+
+    Any listing being added, bid on, edited or closed moves the newest
+    `updated` or the count, which covers every category filter and page of
+    the feed as well as the category counts.
+    """
+    if len(messages.get_messages(request)):
+        return None  # pending messages are shown once; the page must render
+    feed = AuctionListing.objects.filter(is_active=True).order_by().aggregate(
+        last_updated=Max('updated'), listings=Count('id'), categories_updated=Max('category__updated'))
+    viewer = viewer_state(request)
+    state = (viewer, feed['listings'], feed['last_updated'], feed['categories_updated'])
+    # the header is personalized, so only anonymous pages get a Last-Modified date
+    return state, feed['last_updated'] if viewer is None else None
+
+
+def _feed_listings(selected_category):
+    """The active listings, and the feed's listings of the selected category with their card data."""
+    active_listings = AuctionListing.objects.filter(is_active=True)
+    listings = active_listings.with_feed_data()
+    if selected_category:
+        listings = listings.filter(category__name=selected_category)
+    return active_listings, listings
+
+
+def _index_context(page, categories, category_counts, selected_category, watched_ids):
+    return {
+        'listings': page.object_list,
+        'page': page,
+        'Categories': categories,
+        'category_counts': category_counts,
+        'total_listings': sum(category_counts.values()),
+        'selected_category': selected_category,
+        'watched_ids': watched_ids,
+    }
+
+
+# a logged-in viewer adds the session, the user and, on a cold cache, their watched ids
+@query_budget(7)
+@conditional_page(index_validators)
 def index(request):
     """Display active listings, optionally filtered by category."""
     selected_category = request.GET.get('q', '')
+    active_listings, listings = _feed_listings(selected_category)
 
-    listings = AuctionListing.objects.filter(is_active=True)
-    if selected_category:
-        listings = listings.filter(category__name=selected_category)
+    category_counts = active_listings.category_counts()
+    page = paginate_listings(listings, request.GET.get('cursor'))
+
+    context = _index_context(page, Category.objects.all(), category_counts, selected_category,
+                             watched_listing_ids(request.user))
+    return render(request, "auctions/index.html", context)
+
+
+@query_budget(7)
+@conditional_page(index_validators)
+async def aindex(request):
+    """Async version of index(), served by the ASGI entry point (see AuctionApp/asgi_urls.py)."""
+    selected_category = request.GET.get('q', '')
+    user = await aviewer(request)
+    active_listings, listings = _feed_listings(selected_category)
+
+    # none of these depends on another, so they are awaited together
+    category_counts, page, categories, watched_ids = await asyncio.gather(
+        active_listings.acategory_counts(),
+        apaginate_listings(listings, request.GET.get('cursor')),
+        sync_to_async(list)(Category.objects.all()),
+        sync_to_async(watched_listing_ids)(user),
+    )
+
+    context = _index_context(page, categories, category_counts, selected_category, watched_ids)
+    return await sync_to_async(render)(request, "auctions/index.html", context)
 
-    for listing in listings:
-        annotate_listing_with_max_bid(listing)
+
+@query_budget(6)
+def search(request):
+    """Display active listings matching a full-text query, optionally within a category."""
+    query = request.GET.get('query', '').strip()
+    selected_category = request.GET.get('q', '')
+
+    try:
+        page = search_listings(query, selected_category, request.GET.get('cursor'))
+    except InvalidCursor:
+        page = search_listings(query, selected_category)
 
     context = {
-        'listings': listings,
+        'listings': page.object_list,
+        'page': page,
+        'query': query,
         'Categories': Category.objects.all(),
-        'category_counts': {
-            category.name: AuctionListing.objects.filter(
-                category=category, is_active=True).count()
-            for category in Category.objects.all()
-        },
-        'total_listings': AuctionListing.objects.filter(is_active=True).count(),
-        'selected_category': selected_category
+        'selected_category': selected_category,
+        'watched_ids': watched_listing_ids(request.user),
     }
-    return render(request, "auctions/index.html", context)
+    return render(request, "auctions/search.html", context)
 
 
 @login_required(login_url='login')
+@query_budget(4)
 def profile(request):
-    listings = AuctionListing.objects.filter(owner=request.user)
-
-    # Update the max_bid attribute for each listing
-    for listing in listings:
-        highest_bid = Bid.objects.filter(listing=listing).first()
-        listing.max_bid = highest_bid.amount if highest_bid else None
+    listings = AuctionListing.objects.filter(owner=request.user).with_feed_data()
+    page = paginate_listings(listings, request.GET.get('cursor'))
 
-    context = {"listings": listings}
+    context = {"listings": page.object_list, "page": page}
     return render(request, "auctions/profile.html", context)
 
 
@@ -85,6 +184,7 @@ def logout_view(request):
     return HttpResponseRedirect(reverse("index"))
 
 
+@rate_limit('register', '10/h', message="Too many registration attempts. Please try again later.")
 def register(request):
     if request.method == "POST":
         username = request.POST["username"]
@@ -135,6 +235,57 @@ def create_listing(request):
     return render(request, 'auctions/listing_form.html', context)
 
 
+@login_required(login_url='login')
+def import_listings_view(request):
+    """Create listings in bulk from an uploaded CSV or XLSX file."""
+    result = None
+    if request.method == 'POST':
+        upload = request.FILES.get('file')
+        if upload is None:
+            messages.error(request, "Choose a CSV or XLSX file to import.")
+        else:
+            try:
+                result = import_listings(iter_import_rows(upload, upload.name), request.user)
+            except ImportFileError as exc:
+                messages.error(request, str(exc))
+                if exc.created:
+                    messages.warning(request, f"{exc.created} listing(s) were imported before the error.")
+            else:
+                messages.success(request, f"Imported {result.created} listing(s).")
+                if result.failed:
+                    messages.warning(request, f"{result.failed} row(s) were rejected.")
+
+    return render(request, 'auctions/listing_import.html', {'result': result})
+
+
+def export_response(rows, name, file_format):
+    """Stream rows as a CSV download, or send them as an XLSX workbook."""
+    if file_format == 'xlsx':
+        # the workbook is assembled in a temporary file, never in memory
+        output = tempfile.TemporaryFile()
+        write_xlsx(rows, output)
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename=f'{name}.xlsx')
+
+    response = StreamingHttpResponse(stream_csv(rows), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{name}.csv"'
+    return response
+
+
+@login_required(login_url='login')
+def export_listings(request):
+    """Download the user's listings as CSV (default) or XLSX (?format=xlsx)."""
+    rows = listing_export_rows(AuctionListing.objects.filter(owner=request.user))
+    return export_response(rows, 'listings', request.GET.get('format', 'csv'))
+
+
+@login_required(login_url='login')
+def export_bids(request):
+    """Download the bids placed on the user's listings as CSV (default) or XLSX."""
+    rows = bid_export_rows(Bid.objects.live().filter(listing__owner=request.user))
+    return export_response(rows, 'bids', request.GET.get('format', 'csv'))
+
+
 def confirm_email(request, token):
     try:
         user = User.objects.get(confirmation_token=token)
@@ -149,7 +300,8 @@ def confirm_email(request, token):
         user.email_confirmed = True
         user.is_active = True
         user.confirmation_token = ''
-        user.save()
+        # a full save would write back counters that may have moved since the user was read
+        user.save(update_fields=['email_confirmed', 'is_active', 'confirmation_token'])
 
         messages.success(request,
                          "Email confirmed! You can now log in to your account.")
@@ -161,116 +313,195 @@ def confirm_email(request, token):
 
 
 # a view for geting the listing page
-def place_bid(request, listing_page, bid_amount):
+def place_bid(request, listing_id, bid_amount, automatic=False):
     """
     Helper function to handle bid placement with rate limiting and self-bid prevention
 
+    The listing is not loaded here: the bid engine checks that it exists,
+    is open and is not the bidder's own inside its transaction.
+
     Args:
         request: The HTTP request object
-        listing_page: The AuctionListing instance
+        listing_id: Primary key of the AuctionListing
         bid_amount: The amount of the bid
+        automatic: Treat the amount as a maximum the engine bids up to
 
     Returns:
         tuple: (bool, str) - (success status, message)
     """
-    # Basic validation checks
-    if not listing_page.is_active:
-        return False, "This auction is closed"
-
-    if listing_page.owner == request.user:
-        return False, "You cannot bid on your own listing"
-
     # Validate bid amount is numeric and positive
     try:
-        bid_amount = float(bid_amount)
+        bid_amount = to_money(bid_amount)
         if bid_amount <= 0:
             return False, "Bid amount must be positive"
-    except (TypeError, ValueError):
+    except ValueError:
         return False, "Invalid bid amount"
 
     # Rate limiting check
-    cache_key = f'user_{request.user.id}_bid_count'
-    bid_count = cache.get(cache_key, 0)
-
-    if bid_count >= 10:
+    if not RateLimiter('bid', settings.BID_RATE_LIMIT).hit(request.user.pk):
         return False, "Too many bid attempts. Please wait a minute"
 
-    # Get the last bid for validation
-    last_bid = Bid.objects.filter(listing=listing_page).order_by('-amount').first()
+    if automatic:
+        result = submit_max_bid(listing_id, request.user, bid_amount)
+    else:
+        result = submit_bid(listing_id, request.user, bid_amount)
+    return result.accepted, result.message
 
-    # Check if the user is trying to outbid themselves
-    if last_bid and last_bid.bidder == request.user:
-        return False, "You already have the highest bid on this item"
 
-    # Validate bid amount against starting price and current highest bid
-    if not last_bid and bid_amount <= listing_page.starting_price:
-        return False, f"Bid must be higher than the starting price (${listing_page.starting_price})"
-    elif last_bid and bid_amount <= last_bid.amount:
-        return False, f"Bid must be higher than the current highest bid (${last_bid.amount})"
+def listing_page_validators(request, listing_id):
+    """
+    Validators for a listing page, from one query over the listing row.
 
+    Every accepted bid, edit and close bumps the listing's version or
+    `updated`; comments are folded in with an aggregate, and the viewer's
+    watchlist comes from viewer_state().
+    """
+    if not listing_id.isdigit() or len(messages.get_messages(request)):
+        return None
+    state = (AuctionListing.objects.filter(pk=listing_id).order_by()
+             .annotate(comments=Count('comment'), last_comment=Max('comment__created'))
+             .values_list('version', 'updated', 'is_active', 'comments', 'last_comment').first())
+    if state is None:
+        return None  # let the view answer 404
+    viewer = viewer_state(request)
+    last_modified = max(filter(None, (state[1], state[4]))) if viewer is None else None
+    return (viewer, state), last_modified
+
+
+def _page_queryset(paginator, cursor):
+    # a tampered or stale cursor restarts from the first page
     try:
-        # Create and save the new bid within a transaction
-        from django.db import transaction
-        with transaction.atomic():
-            bid = Bid.objects.create(
-                bidder=request.user,
-                listing=listing_page,
-                amount=bid_amount
-            )
-
-            # Update cache for rate limiting
-            cache.set(cache_key, bid_count + 1, 60)  # Expires in 60 seconds
-
-        return True, "Bid placed successfully!"
+        return paginator.page_queryset(cursor)
+    except InvalidCursor:
+        return paginator.page_queryset()
 
-    except Exception as e:
-        return False, f"Error processing bid: {str(e)}"
 
-
-def listing_page(request, listing_id):  # Renamed from listingPage
-    """Display details of a specific listing."""
-    listing_page = get_object_or_404(AuctionListing, id=listing_id)
-    context = {
+def _listing_page_query(request, listing_id):
+    """
+    The paginators of a listing's comments and bids, and the query loading
+    the listing with the requested page of each.
+    """
+    comments = CursorPaginator(Comment.objects.select_related('creator'),
+                               per_page=settings.LISTING_COMMENTS_PER_PAGE)
+    bids = CursorPaginator(Bid.objects.live().select_related('bidder'), ordering=('-amount', '-id'),
+                           per_page=settings.LISTING_BIDS_PER_PAGE)
+    listing = AuctionListing.objects.select_related('category', 'owner', 'high_bidder').prefetch_related(
+        Prefetch('comment_set', _page_queryset(comments, request.GET.get('comments')), to_attr='comment_rows'),
+        Prefetch('bid_set', _page_queryset(bids, request.GET.get('bids')), to_attr='bid_rows'),
+    ).filter(id=listing_id)
+    return comments, bids, listing
+
+
+def _listing_page_context(listing_page, comments, bids, is_in_watchlist):
+    return {
         'listing_page': listing_page,
-        'comments': get_listing_comments(listing_page),
-        'last_bid': get_last_bid(listing_page),
-        'Bidders': get_listing_bidders(listing_page),
-        'is_in_watchlist': check_watchlist_status(request.user, listing_page),
+        'comments': comments.make_page(listing_page.comment_rows),
+        'Bidders': bids.make_page(listing_page.bid_rows),
+        'is_in_watchlist': is_in_watchlist,
         'form': BidForm()
     }
 
+
+# logged in: session, user and, on a cold cache, watched ids on top of the
+# validators, the listing, one page of comments and one page of bids; a
+# maximum bid posted here costs session, user, the listing, the competing
+# maximums, the listing update, the new bids and the bidder's maximum, plus
+# the savepoint pair of the engine's transaction when tests wrap it in theirs,
+# plus the two rate-limit counter queries without a shared cache
+@query_budget(11)
+@conditional_page(listing_page_validators)
+def listing_page(request, listing_id):  # Renamed from listingPage
+    """Display details of a specific listing, with one page each of its comments and bids."""
     if request.method == 'POST':
-        return handle_bid_submission(request, listing_page)
+        return handle_bid_submission(request, listing_id)
+
+    comments, bids, listing = _listing_page_query(request, listing_id)
+    listing_page = get_object_or_404(listing)
 
+    context = _listing_page_context(listing_page, comments, bids, check_watchlist_status(request.user, listing_page))
     return render(request, 'auctions/listing_page.html', context)
 
 
-def handle_bid_submission(request, listing_page):
+@query_budget(11)
+@conditional_page(listing_page_validators)
+async def alisting_page(request, listing_id):
+    """Async version of listing_page(), served by the ASGI entry point (see AuctionApp/asgi_urls.py)."""
+    if request.method == 'POST':
+        return await sync_to_async(handle_bid_submission)(request, listing_id)
+    user = await aviewer(request)
+
+    comments, bids, listing = _listing_page_query(request, listing_id)
+    listing_page, watched_ids = await asyncio.gather(
+        aget_object_or_404(listing),
+        sync_to_async(watched_listing_ids)(user),
+    )
+
+    context = _listing_page_context(listing_page, comments, bids, listing_page.pk in watched_ids)
+    return await sync_to_async(render)(request, 'auctions/listing_page.html', context)
+
+
+async def listing_events(request, listing_id):
+    """
+    Stream bid and close events of a listing as server-sent events.
+
+    Streaming needs the ASGI server (AuctionApp/asgi.py); under WSGI the view
+    answers 204, which tells EventSource clients not to reconnect.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    if not listing_id.isdigit() or not await AuctionListing.objects.filter(id=listing_id).aexists():
+        raise Http404("No such listing")
+
+    async def event_stream():
+        subscription = broker.subscribe(int(listing_id))
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.get(), settings.LISTING_EVENTS_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(event_stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def handle_bid_submission(request, listing_id):
     """
     Handle the submission of a new bid.
 
     Args:
         request: The HTTP request object
-        listing_page: The AuctionListing instance
+        listing_id: Primary key of the AuctionListing
 
     Returns:
         HttpResponse: Redirect to the listing page with appropriate message
     """
+    if not request.user.is_authenticated:
+        return redirect("login")
+
     form = BidForm(request.POST)
     if form.is_valid():
         bid_amount = form.cleaned_data['amount']
-        success, message = place_bid(request, listing_page, bid_amount)
+        success, message = place_bid(request, listing_id, bid_amount, form.cleaned_data['automatic'])
 
         if success:
             messages.success(request, message)
         else:
             messages.warning(request, message)
 
-    return redirect("listing_page", listing_id=listing_page.id)
+    return redirect("listing_page", listing_id=listing_id)
 
 
 # user add a comment
 @login_required(login_url='login')
+@rate_limit('comment', '10/m', message="You are commenting too fast. Please wait a minute.")
 def listing_comment(request, listing_id):
     listing_page = get_object_or_404(AuctionListing, id=listing_id)
     if request.method == "POST":
@@ -300,23 +531,31 @@ def listing_comment(request, listing_id):
     return redirect("listing_page", listing_id=listing_id)
 
 
+def _watched_listings(user):
+    # one query joining the watchlist to the listings, their category and owner;
+    # current_price already is the highest bid
+    return AuctionListing.objects.filter(whatchedListings__user=user).with_feed_data()
+
+
+def _watchlist_context(page):
+    return {'watched_listings': page.object_list, 'page': page}
+
+
 # Watchlist view
 @login_required(login_url='login')
+@query_budget(4)
 def watchlist_page(request):
-    # get the objects associated with the watchlist of the user
-    watched_listings = Watchlist.objects.filter(user=request.user).values('listing')
-    # get the primary key of the listings in the watched_listings queryset
-    listing_pks = watched_listings.values_list('listing', flat=True)
-    # get the listings from there primary keys
-    watched_listings_data = AuctionListing.objects.filter(pk__in=listing_pks)
+    page = paginate_listings(_watched_listings(request.user), request.GET.get('cursor'))
+    return render(request, 'auctions/watchlist.html', _watchlist_context(page))
 
-    # Update the max_bid attribute for each listing
-    for listing in watched_listings_data:
-        highest_bid = Bid.objects.filter(listing=listing).first()
-        listing.max_bid = highest_bid.amount if highest_bid else None
 
-    context = {'watched_listings': watched_listings_data}
-    return render(request, 'auctions/watchlist.html', context)
+@login_required(login_url='login')
+@query_budget(4)
+async def awatchlist_page(request):
+    """Async version of watchlist_page(), served by the ASGI entry point (see AuctionApp/asgi_urls.py)."""
+    user = await aviewer(request)
+    page = await apaginate_listings(_watched_listings(user), request.GET.get('cursor'))
+    return await sync_to_async(render)(request, 'auctions/watchlist.html', _watchlist_context(page))
 
 
 # add
@@ -325,18 +564,15 @@ def add_watchlist(request, listing_id):
     if request.method == "POST":
         listing_page = get_object_or_404(AuctionListing, id=listing_id)
 
-        # Check if already in watchlist
-        if Watchlist.objects.filter(user=request.user, listing=listing_page).exists():
-            messages.warning(request, "Item already in watchlist")
-            return redirect("listing_page", listing_id=listing_id)
-
         # Validate owner isn't adding their own listing
         if listing_page.owner == request.user:
             messages.warning(request, "Cannot add your own listing to watchlist")
             return redirect("listing_page", listing_id=listing_id)
 
-        Watchlist.objects.create(user=request.user, listing=listing_page)
-        messages.success(request, "Added to watchlist")
+        if update_watchlist(request.user, [listing_page.pk], watch=True):
+            messages.success(request, "Added to watchlist")
+        else:
+            messages.warning(request, "Item already in watchlist")
     return redirect("listing_page", listing_id=listing_id)
 
 
@@ -345,37 +581,97 @@ def add_watchlist(request, listing_id):
 def remove_watchlist(request, listing_id):  # Changed from pk
     listing_page = get_object_or_404(AuctionListing, id=listing_id)
     if request.method == "POST":
-        Watchlist.objects.filter(user=request.user, listing=listing_page).delete()
+        update_watchlist(request.user, [listing_page.pk], watch=False)
         return redirect("listing_page", listing_id=listing_id)
 
 
+@login_required(login_url='login')
+@query_budget(6)
+def bulk_watchlist(request):
+    """
+    Add or remove several listings at once.
+
+    POST action=add|remove with one or more listing=<id> fields. Clients
+    asking for JSON get the new set of watched ids back; forms are
+    redirected to the watchlist page with a message.
+    """
+    if request.method != "POST":
+        return HttpResponseNotAllowed(["POST"])
+    wants_json = 'application/json' in request.headers.get('Accept', '')
+
+    action = request.POST.get('action')
+    try:
+        listing_ids = {int(pk) for pk in request.POST.getlist('listing')}
+    except ValueError:
+        listing_ids = set()
+    if action not in ('add', 'remove') or not listing_ids:
+        error = "Choose add or remove and at least one listing"
+    elif len(listing_ids) > settings.WATCHLIST_BULK_LIMIT:
+        error = f"At most {settings.WATCHLIST_BULK_LIMIT} listings can be changed at once"
+    else:
+        error = None
+    if error:
+        if wants_json:
+            return JsonResponse({'error': error}, status=400)
+        messages.error(request, error)
+        return redirect("watchlist")
+
+    changed = update_watchlist(request.user, listing_ids, watch=action == 'add')
+    if wants_json:
+        return JsonResponse({'changed': changed, 'watched': sorted(watched_listing_ids(request.user))})
+    messages.success(request, f"{'Added' if action == 'add' else 'Removed'} {changed} listing(s)")
+    return redirect("watchlist")
+
+
 # Auction Control
 @login_required(login_url='login')
 def auction_control(request, listing_id):
     listing_page = get_object_or_404(AuctionListing, id=listing_id)
+    if settings.ORDER_BOOK_ENABLED:
+        # the last bids may still be waiting in the listing's order book
+        order_books.release(listing_page.pk)
+        listing_page.refresh_from_db()
 
     if not listing_page.is_active:
-        listing_page.is_active = True
-        listing_page.save()
-        messages.success(request, "Auction activated successfully.")
+        if reopen_auction(listing_page):
+            messages.success(request, "Auction activated successfully.")
+        else:
+            messages.info(request, "Auction is already active.")
         return redirect("listing_page", listing_id=listing_id)
 
-    last_bid = get_last_bid(listing_page)
-    message = handle_auction_close(listing_page, last_bid)
-    messages.success(request, message)
+    winner = handle_auction_close(listing_page)
+    messages.success(request, f"Auction closed. New owner: {winner}" if winner else "Auction closed successfully.")
     return redirect("listing_page", listing_id=listing_id)
 
 
+def _user_notifications(user):
+    # the cards link to and price their listing
+    return Notification.objects.filter(user=user).select_related('listing')
+
+
 # Notifications view
 @login_required(login_url='login')
 def notifications(request):
-    notifications = Notification.objects.filter(user=request.user)
+    notifications = _user_notifications(request.user)
 
-    notifications.update(is_read=True)
+    mark_notifications_read(request.user)
     context = {"notifications": notifications}
     return render(request, 'auctions/notifications.html', context)
 
 
+@login_required(login_url='login')
+async def anotifications(request):
+    """Async version of notifications(), served by the ASGI entry point (see AuctionApp/asgi_urls.py)."""
+    user = await aviewer(request)
+    # marked read before they are listed, as notifications() renders them
+    await sync_to_async(mark_notifications_read)(user)
+    notifications = [notification async for notification in _user_notifications(user)]
+
+    context = {"notifications": notifications}
+    return await sync_to_async(render)(request, 'auctions/notifications.html', context)
+
+
+@rate_limit('password_reset', '5/h', message="Too many password reset requests. Please try again later.")
 def password_reset_request(request):
     if request.method == "POST":
         email = request.POST.get('email')
@@ -385,11 +681,11 @@ def password_reset_request(request):
             token = secrets.token_urlsafe(48)
             user.confirmation_token = token
             user.token_created_at = timezone.now()
-            user.save()
+            user.save(update_fields=['confirmation_token', 'token_created_at'])
 
             # Send email
             reset_link = f"http://{settings.SITE_URL}/password-reset/{token}"
-            send_mail(
+            queue_email(
                 'Password Reset Request',
                 f'''Hi {user.username},
 
@@ -399,9 +695,7 @@ You requested a password reset. Click this link to reset your password:
 This link will expire in 24 hours.
 
 If you did not request a password reset, please ignore this email.''',
-                'noreply@auctionsite.com',
                 [user.email],
-                fail_silently=False,
             )
 
             messages.success(request, "Password reset instructions have been sent to your email.")
@@ -431,7 +725,7 @@ def password_reset_confirm(request, token):
 
             user.set_password(password)
             user.confirmation_token = ''
-            user.save()
+            user.save(update_fields=['password', 'confirmation_token'])
 
             messages.success(request, "Password has been reset successfully. You can now log in.")
             return HttpResponseRedirect(reverse("login"))
@@ -440,3 +734,12 @@ def password_reset_confirm(request, token):
     except User.DoesNotExist:
         messages.error(request, "Invalid password reset link.")
         return HttpResponseRedirect(reverse("login"))
+
+
+@staff_member_required
+def instrumentation_stats(request):
+    """Per-view request metrics and fragment cache counters of this process, as JSON."""
+    return JsonResponse({
+        'views': view_stats.snapshot(),
+        'fragment_cache': fragment_stats.snapshot(),
+    })
@@ -0,0 +1,211 @@
+"""
+Throughput and tail latency of the read-heavy pages under WSGI and under ASGI.
+
+    python -m benchmarks.bench_async_views [--concurrency N [N ...]] [--requests N]
+
+Seeds a throwaway SQLite file (see benchmarks/seed.py) and replays the same
+mix of index, listing_page, watchlist_page and notifications requests
+through Django's own handlers, in this process, in three modes:
+
+    wsgi       the WSGI handler and the sync views, called from --concurrency
+               threads, as a threaded WSGI server would
+    asgi_sync  the ASGI handler and the same sync views
+    asgi       the ASGI handler and the async views of AuctionApp/asgi_urls.py,
+               with --concurrency requests in flight on one event loop
+
+No HTTP server is involved, so the report compares handlers and views, not
+servers. Every client sends its next request as soon as the previous one is
+answered. Per mode and concurrency level the report has requests/second,
+latency percentiles overall and per page, and the status codes seen.
+"""
+import argparse
+import asyncio
+import io
+import json
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from tempfile import TemporaryDirectory
+
+from .common import setup_django, summarize, test_database
+
+PAGES = ('index', 'listing_page', 'watchlist_page', 'notifications')
+# mode -> URLconf it is served with
+MODES = {'wsgi': 'AuctionApp.urls', 'asgi_sync': 'AuctionApp.urls', 'asgi': 'AuctionApp.asgi_urls'}
+
+
+def build_plan(rng, listing_ids, cookies, requests):
+    """The request mix: (page, path, cookie) tuples, one of each page per round."""
+    from django.urls import reverse
+
+    plan = []
+    for _ in range(requests):
+        cookie = rng.choice(cookies)
+        plan.append(('index', reverse('index'), cookie))
+        plan.append(('listing_page', reverse('listing_page', args=[rng.choice(listing_ids)]), cookie))
+        plan.append(('watchlist_page', reverse('watchlist'), cookie))
+        plan.append(('notifications', reverse('notifications'), cookie))
+    return plan
+
+
+def wsgi_request(application, path, cookie):
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': '', 'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1', 'HTTP_HOST': 'testserver', 'HTTP_COOKIE': cookie,
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    statuses = []
+    body = application(environ, lambda status, headers, exc_info=None: statuses.append(status))
+    try:
+        for _ in body:
+            pass
+    finally:
+        body.close()  # sends request_finished, which closes the connection
+    return int(statuses[0].split()[0])
+
+
+async def asgi_request(application, path, cookie):
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+        'headers': [(b'host', b'testserver'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 50000), 'server': ('testserver', 80),
+    }
+    body_sent = False
+    status = None
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        # the client never disconnects; Django cancels this wait once it has responded
+        await asyncio.Future()
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(scope, receive, send)
+    return status
+
+
+def run_wsgi(application, plan, concurrency):
+    def send(item):
+        page, path, cookie = item
+        start = time.perf_counter()
+        status = wsgi_request(application, path, cookie)
+        return page, status, time.perf_counter() - start
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        return list(pool.map(send, plan))
+
+
+def run_asgi(application, plan, concurrency):
+    async def main():
+        pending = iter(plan)
+        results = []
+
+        async def client():
+            for page, path, cookie in pending:
+                start = time.perf_counter()
+                status = await asgi_request(application, path, cookie)
+                results.append((page, status, time.perf_counter() - start))
+
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        return results
+
+    return asyncio.run(main())
+
+
+def report(results, elapsed):
+    latencies = {page: [] for page in PAGES}
+    statuses = Counter()
+    for page, status, latency in results:
+        latencies[page].append(latency)
+        statuses[str(status)] += 1
+    return {
+        'requests_per_s': round(len(results) / elapsed, 1),
+        'latency': summarize([latency for _, _, latency in results]),
+        'pages': {page: summarize(samples) for page, samples in latencies.items()},
+        'status': dict(statuses),
+    }
+
+
+def run(args):
+    from django.core.asgi import get_asgi_application
+    from django.core.wsgi import get_wsgi_application
+    from django.test import Client
+    from django.test.utils import override_settings
+    from auctions.models import AuctionListing, Notification, User
+
+    from .seed import seed
+
+    data = seed(users=args.users, listings=args.listings, bids=args.bids,
+                comments=args.comments, random_seed=args.seed)
+    rng = random.Random(args.seed)
+    users = list(User.objects.filter(username__in=data['usernames']))
+    listing_ids = list(AuctionListing.objects.filter(is_active=True).values_list('pk', flat=True))
+    Notification.objects.bulk_create(Notification(user=user, listing_id=rng.choice(listing_ids))
+                                     for user in users for _ in range(5))
+    cookies = []
+    for user in users:
+        client = Client()
+        client.force_login(user)
+        cookies.append(f"sessionid={client.cookies['sessionid'].value}")
+
+    plan = build_plan(rng, listing_ids, cookies, args.requests)
+    warmup = build_plan(rng, listing_ids, cookies, args.warmup)
+    handlers = {'wsgi': (get_wsgi_application(), run_wsgi)}
+    handlers['asgi_sync'] = handlers['asgi'] = (get_asgi_application(), run_asgi)
+
+    results = {}
+    for mode, urlconf in MODES.items():
+        application, runner = handlers[mode]
+        results[mode] = {}
+        with override_settings(ROOT_URLCONF=urlconf):
+            runner(application, warmup, 1)
+            for concurrency in args.concurrency:
+                start = time.perf_counter()
+                outcome = runner(application, plan, concurrency)
+                results[mode][str(concurrency)] = report(outcome, time.perf_counter() - start)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--listings', type=int, default=1000)
+    parser.add_argument('--bids', type=int, default=5000)
+    parser.add_argument('--comments', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=100, help='rounds of one request per page')
+    parser.add_argument('--warmup', type=int, default=5, help='untimed rounds per mode')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32],
+                        help='requests in flight at once; each level is a separate run')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.db import connection
+
+    if connection.vendor != 'sqlite':
+        parser.error('DATABASE_URL points at another database; this benchmark is for SQLite only')
+
+    results = {'requests': args.requests * len(PAGES), 'concurrency': args.concurrency}
+    with TemporaryDirectory() as directory:
+        # a file rather than the in-memory test database, so that the threads
+        # serving requests each open their own connection to the seeded data
+        connection.settings_dict['TEST']['NAME'] = str(Path(directory) / 'bench.sqlite3')
+        with test_database():
+            results.update(run(args))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
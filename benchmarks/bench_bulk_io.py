@@ -0,0 +1,82 @@
+"""
+Throughput and peak memory of bulk listing import and export.
+
+    python -m benchmarks.bench_bulk_io [--rows N] [--batch-size N]
+
+Generates an N-row CSV (1,000,000 by default), imports it through
+import_listings, then exports the listings again as streamed CSV and as
+XLSX. With --memory, peak Python memory of each phase is measured with
+tracemalloc (which slows the run down); it should stay flat as --rows grows.
+"""
+import argparse
+import csv
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from .common import setup_django, test_database
+
+
+def measure(func, trace_memory):
+    if trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    stats = {'seconds': round(time.perf_counter() - start, 3)}
+    if trace_memory:
+        stats['peak_mib'] = round(tracemalloc.get_traced_memory()[1] / 2 ** 20, 2)
+        tracemalloc.stop()
+    return result, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--memory', action='store_true', help='also measure peak memory of each phase')
+    args = parser.parse_args()
+
+    setup_django()
+    from auctions.models import Category, User
+    from auctions.utils.bulk_io import import_listings, iter_import_rows, listing_export_rows, stream_csv, write_xlsx
+
+    results = {'rows': args.rows}
+    with test_database(), tempfile.TemporaryDirectory() as tmp:
+        seller = User.objects.create_user(username='bench', password='bench')
+        Category.objects.create(name='Electronics')
+
+        source = os.path.join(tmp, 'import.csv')
+        with open(source, 'w', newline='') as fh:
+            writer = csv.writer(fh)
+            writer.writerow(['title', 'description', 'starting_price', 'category'])
+            for i in range(args.rows):
+                writer.writerow([f'Listing {i}', 'Imported in bulk', 10 + i % 90, 'Electronics'])
+
+        def run_import():
+            with open(source, 'rb') as fh:
+                return import_listings(iter_import_rows(fh, source), seller, batch_size=args.batch_size)
+
+        result, results['import'] = measure(run_import, args.memory)
+        results['import']['created'] = result.created
+        results['import']['rows_per_second'] = round(result.created / results['import']['seconds'])
+
+        def run_csv_export():
+            written = 0
+            with open(os.path.join(tmp, 'export.csv'), 'w', newline='') as fh:
+                for line in stream_csv(listing_export_rows()):
+                    written += fh.write(line)
+            return written
+
+        size, results['export_csv'] = measure(run_csv_export, args.memory)
+        results['export_csv']['mib'] = round(size / 2 ** 20, 2)
+
+        _, results['export_xlsx'] = measure(
+            lambda: write_xlsx(listing_export_rows(), os.path.join(tmp, 'export.xlsx')), args.memory)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
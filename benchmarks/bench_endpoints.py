@@ -0,0 +1,235 @@
+"""
+Latency and query counts of the main pages under a scripted load.
+
+    python -m benchmarks.bench_endpoints [--requests N] [--transport client|live]
+                                         [--output results.json]
+
+Seeds a throwaway database (see benchmarks/seed.py), then replays the same
+request mix against index, listing_page, place_bid, watchlist_page and
+profile. The 'client' transport goes through the Django test client; the
+'live' transport starts a local HTTP server and sends real requests to it.
+Per endpoint the JSON report has latency percentiles, query counts and the
+status codes seen, plus the commit and parameters of the run, so reports of
+two commits can be diffed directly.
+"""
+import argparse
+import datetime
+import http.client
+import json
+import platform
+import random
+import subprocess
+from collections import Counter
+from decimal import Decimal
+from urllib.parse import urlencode, urlsplit
+
+from .common import ROOT_DIR, setup_django, summarize, test_database
+
+ENDPOINTS = ('index', 'listing_page', 'place_bid', 'watchlist_page', 'profile')
+
+
+class ClientTransport:
+    """Sends requests through the Django test client, one client per user."""
+
+    def __init__(self):
+        from django.test import Client
+        self._client_class = Client
+        self._clients = {}
+
+    def login(self, user):
+        client = self._client_class()
+        if user is not None:
+            client.force_login(user)
+        self._clients[user.pk if user else None] = client
+
+    def request(self, user, method, path, data=None):
+        client = self._clients[user.pk if user else None]
+        response = client.post(path, data) if method == 'POST' else client.get(path)
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class LiveTransport:
+    """Sends HTTP requests to a local server running in a background thread."""
+
+    def __init__(self):
+        from django.db import connections
+        from django.test.testcases import LiveServerThread, _StaticFilesHandler
+
+        # sharing the connections lets the server see the seeded, uncommitted
+        # test data and lets the driver count the queries the server runs
+        self._override = {conn.alias: conn for conn in connections.all()}
+        for conn in self._override.values():
+            conn.inc_thread_sharing()
+        self._thread = LiveServerThread('localhost', _StaticFilesHandler, self._override)
+        self._thread.daemon = True
+        self._thread.start()
+        self._thread.is_ready.wait()
+        if self._thread.error:
+            raise self._thread.error
+        self._http = http.client.HTTPConnection('localhost', self._thread.port)
+        self._cookies = {}
+
+    def login(self, user):
+        from django.middleware.csrf import _get_new_csrf_string
+        from django.test import Client
+
+        cookies = {'csrftoken': _get_new_csrf_string()}
+        if user is not None:
+            client = Client()
+            client.force_login(user)
+            cookies['sessionid'] = client.cookies['sessionid'].value
+        self._cookies[user.pk if user else None] = cookies
+
+    def request(self, user, method, path, data=None):
+        cookies = self._cookies[user.pk if user else None]
+        headers = {'Cookie': '; '.join(f'{k}={v}' for k, v in cookies.items())}
+        body = None
+        if method == 'POST':
+            body = urlencode(data or {})
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            headers['X-CSRFToken'] = cookies['csrftoken']
+        # a fresh connection per request: on a kept-alive one the server's
+        # separately sent headers and body stall on delayed ACKs (~40ms)
+        headers['Connection'] = 'close'
+        self._http.request(method, urlsplit(path).path, body=body, headers=headers)
+        response = self._http.getresponse()
+        response.read()
+        self._http.close()
+        return response.status
+
+    def close(self):
+        self._http.close()
+        self._thread.terminate()
+        for conn in self._override.values():
+            conn.dec_thread_sharing()
+
+
+def build_plan(rng, listings, users, requests):
+    """The request mix: (endpoint, user or None, method, path, data) tuples."""
+    from django.urls import reverse
+
+    plan = []
+    for _ in range(requests):
+        user = rng.choice(users)
+        listing = rng.choice(listings)
+        plan.append(('index', None, 'GET', reverse('index'), None))
+        plan.append(('listing_page', user, 'GET', reverse('listing_page', args=[listing.pk]), None))
+        plan.append(('watchlist_page', user, 'GET', reverse('watchlist'), None))
+        plan.append(('profile', user, 'GET', reverse('profile'), None))
+        # the amount is filled in when the request is sent, above the live price
+        plan.append(('place_bid', user, 'POST', reverse('listing_page', args=[listing.pk]), listing.pk))
+    return plan
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=ROOT_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args):
+    import time
+
+    import django
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from auctions.models import AuctionListing, User
+
+    from .seed import seed
+
+    data = seed(users=args.users, listings=args.listings, bids=args.bids,
+                comments=args.comments, random_seed=args.seed)
+
+    rng = random.Random(args.seed)
+    users = list(User.objects.filter(username__in=data['usernames']))
+    listings = list(AuctionListing.objects.filter(is_active=True).only('id'))
+    plan = build_plan(rng, listings, users, args.warmup + args.requests)
+
+    transport = LiveTransport() if args.transport == 'live' else ClientTransport()
+    latencies = {name: [] for name in ENDPOINTS}
+    queries = {name: [] for name in ENDPOINTS}
+    statuses = {name: Counter() for name in ENDPOINTS}
+    try:
+        transport.login(None)
+        for user in users:
+            transport.login(user)
+
+        warmup = args.warmup * len(ENDPOINTS)
+        for i, (name, user, method, path, data) in enumerate(plan):
+            if name == 'place_bid':
+                price = AuctionListing.objects.values_list('current_price', flat=True).get(pk=data)
+                data = {'amount': price + Decimal(rng.randint(100, 1000)) / 100}
+
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                status = transport.request(user, method, path, data)
+                elapsed = time.perf_counter() - start
+            if i < warmup:
+                continue
+            latencies[name].append(elapsed)
+            queries[name].append(len(captured))
+            statuses[name][str(status)] += 1
+    finally:
+        transport.close()
+
+    return {
+        'meta': {
+            'commit': git_commit(),
+            'created': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'transport': args.transport,
+            'params': {key: getattr(args, key) for key in
+                       ('users', 'listings', 'bids', 'comments', 'requests', 'warmup', 'seed')},
+        },
+        'endpoints': {
+            name: {
+                'latency': summarize(latencies[name]),
+                'queries': {
+                    'min': min(queries[name], default=0),
+                    'mean': round(sum(queries[name]) / len(queries[name]), 2) if queries[name] else 0,
+                    'max': max(queries[name], default=0),
+                },
+                'status': dict(statuses[name]),
+            }
+            for name in ENDPOINTS
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--listings', type=int, default=1000)
+    parser.add_argument('--bids', type=int, default=5000)
+    parser.add_argument('--comments', type=int, default=2000)
+    parser.add_argument('--requests', type=int, default=200, help='timed requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=10, help='untimed requests per endpoint')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--transport', choices=('client', 'live'), default='client')
+    parser.add_argument('--output', help='write the JSON report to this file instead of stdout')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.test.utils import override_settings
+
+    # the benchmark bids far faster than any person, so lift the bid rate limit
+    with test_database(), override_settings(BID_RATE_LIMIT='1000000/m', ALLOWED_HOSTS=['*']):
+        report = run(args)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fh:
+            fh.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,65 @@
+"""
+Render time of a large index page with and without the listing card cache.
+
+    python -m benchmarks.bench_fragment_cache [--cards N] [--renders N]
+
+Seeds N listings (1,000 by default) and times the listing grid template
+and the full index view with the fragment cache disabled, then warm.
+"""
+import argparse
+import json
+
+from .common import setup_django, summarize, test_database, timed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--cards', type=int, default=1000)
+    parser.add_argument('--renders', type=int, default=30)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.core.cache import caches
+    from django.template.loader import get_template
+    from django.test import Client, override_settings
+    from django.urls import reverse
+    from auctions.models import AuctionListing, Category, User
+    from auctions.utils.fragment_cache import stats
+
+    results = {'cards': args.cards}
+    with test_database(), override_settings(LISTINGS_PER_PAGE=args.cards, ALLOWED_HOSTS=['*']):
+        owner = User.objects.create_user(username='bench', password='bench')
+        category = Category.objects.create(name='Electronics')
+        AuctionListing.objects.bulk_create([
+            AuctionListing(owner=owner, category=category, title=f'Listing {i}',
+                           description='A well kept item in its original box. ' * 5,
+                           starting_price=10.0 + i, current_price=10.0 + i)
+            for i in range(args.cards)
+        ])
+        listings = list(AuctionListing.objects.filter(is_active=True).with_feed_data())
+        grid = get_template('auctions/listings.html')
+        client = Client()
+
+        def render_grid():
+            grid.render({'listings': listings, 'page': None})
+
+        def render_index():
+            assert client.get(reverse('index')).status_code == 200
+
+        for enabled in (False, True):
+            label = 'cached' if enabled else 'uncached'
+            with override_settings(FRAGMENT_CACHE_ENABLED=enabled):
+                caches[settings.FRAGMENT_CACHE_ALIAS].clear()
+                stats.reset()
+                # one untimed render fills the cache (and warms the template loader)
+                render_grid()
+                results[f'grid_{label}'] = summarize(timed(render_grid, args.renders))
+                results[f'index_view_{label}'] = summarize(timed(render_index, args.renders))
+        results['cache_stats'] = stats.snapshot()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
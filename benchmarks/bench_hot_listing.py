@@ -0,0 +1,84 @@
+"""
+Bid throughput of one hot listing, through the database and through an order book.
+
+    python -m benchmarks.bench_hot_listing [--bids N] [--bidders N] [--flush-size N]
+
+Runs the same stream of ever higher bids against a throwaway SQLite file
+with the tuned OPTIONS from settings, once through the bid engine's
+database path and once with ORDER_BOOK_ENABLED. The order book writes
+behind in batches of --flush-size; the final flush is inside the timing,
+so both runs end with every bid in the database.
+"""
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+
+from .bench_sqlite_writes import prepare, use_database
+from .common import setup_django, summarize
+
+
+def run(bids, bidders, listing_id):
+    from auctions.utils import order_books, submit_bid
+
+    samples = []
+    accepted = 0
+    started = time.perf_counter()
+    for i in range(bids):
+        begin = time.perf_counter()
+        accepted += submit_bid(listing_id, bidders[i % len(bidders)], 2 + i).accepted
+        samples.append(time.perf_counter() - begin)
+    order_books.flush()
+    elapsed = time.perf_counter() - started
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'accepted_bids_per_s': round(accepted / elapsed, 1),
+        'accepted': accepted,
+        'bid_latency': summarize(samples),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bids', type=int, default=5000)
+    parser.add_argument('--bidders', type=int, default=2, help='bidders taking turns on the listing')
+    parser.add_argument('--flush-size', type=int, default=200, help='bids written per order book flush')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.db import connection
+    from django.test.utils import override_settings
+    from auctions.models import AuctionListing, Bid, User
+
+    if connection.vendor != 'sqlite':
+        parser.error('DATABASE_URL points at another database; this benchmark is for SQLite only')
+
+    options = settings.DATABASES['default'].get('OPTIONS', {})
+    modes = {
+        'database': {'ORDER_BOOK_ENABLED': False},
+        # hot from the first bid; no background thread, flushes by size only
+        'order_book': {'ORDER_BOOK_ENABLED': True, 'ORDER_BOOK_HOT_BIDS_PER_MINUTE': 1,
+                       'ORDER_BOOK_FLUSH_INTERVAL': 0, 'ORDER_BOOK_FLUSH_SIZE': args.flush_size},
+    }
+    results = {'bids': args.bids, 'bidders': args.bidders, 'flush_size': args.flush_size}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, overrides in modes.items():
+            path = Path(directory) / f'{name}.sqlite3'
+            prepare(path, options, args.bidders, 1)
+            use_database(path, options)
+            bidders = list(User.objects.filter(username__startswith='bench-bidder-'))
+            listing = AuctionListing.objects.get()
+            with override_settings(**overrides):
+                results[name] = run(args.bids, bidders, listing.pk)
+            listing.refresh_from_db()
+            results[name]['stored_bids'] = Bid.objects.count()
+            results[name]['final_price'] = str(listing.current_price)
+            connection.close()
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""
+Per-check overhead of the bid rate limiter.
+
+    python -m benchmarks.bench_rate_limit [--checks N]
+
+Compares the cache and database counter backends against the previous
+get/set implementation used by place_bid.
+"""
+import argparse
+import json
+
+from .common import setup_django, summarize, test_database, timed
+
+
+def legacy_check(cache, key):
+    # the non-atomic get/set check place_bid used before the RateLimiter
+    count = cache.get(key, 0)
+    if count < 10:
+        cache.set(key, count + 1, 60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--checks', type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django()
+    from django.core.cache import cache
+    from auctions.utils.rate_limit import CacheBackend, DatabaseBackend, RateLimiter
+
+    results = {}
+    with test_database():
+        cache.clear()
+        results['legacy_get_set'] = summarize(timed(lambda: legacy_check(cache, 'legacy'), args.checks))
+
+        # a huge limit keeps every check on the full (allowed) code path
+        for name, backend in (('cache', CacheBackend()), ('database', DatabaseBackend())):
+            limiter = RateLimiter(f'bench-{name}', f'{args.checks * 10}/m', backend=backend)
+            results[f'sliding_window_{name}'] = summarize(timed(lambda: limiter.hit('user:1'), args.checks))
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Latency of full-text listing search against a naive icontains scan.
+
+    python -m benchmarks.bench_search [--rows N] [--queries N]
+
+Seeds N synthetic listings (1,000,000 by default; seeding takes a few
+minutes at that size) and times each query through search_listings and
+through the title/description icontains filter it replaces.
+"""
+import argparse
+import json
+import random
+
+from .common import setup_django, summarize, test_database, timed
+
+WORDS = (
+    'vintage camera lens tripod guitar amplifier bicycle helmet watch leather jacket '
+    'wooden chair table lamp vinyl record novel comic poster painting canvas ceramic '
+    'vase silver ring necklace console controller keyboard monitor drone kayak tent '
+    'telescope microscope sneaker boots scarf puzzle figurine stamp coin antique'
+).split()
+
+QUERIES = ['camera', 'vintage lens', 'guit', 'silver necklace', 'telescope tripod', 'antiq']
+
+
+def seed(owner, categories, rows, batch_size=5000):
+    from auctions.models import AuctionListing
+
+    rng = random.Random(42)
+    for start in range(0, rows, batch_size):
+        AuctionListing.objects.bulk_create([
+            AuctionListing(
+                owner=owner,
+                category=rng.choice(categories),
+                title=' '.join(rng.choices(WORDS, k=3)).capitalize(),
+                description=' '.join(rng.choices(WORDS, k=25)),
+                starting_price=10.0,
+                current_price=10.0,
+            )
+            for _ in range(min(batch_size, rows - start))
+        ])
+
+
+def icontains_page(query, per_page):
+    from django.db.models import Q
+    from auctions.models import AuctionListing
+
+    matches = Q()
+    for term in query.split():
+        matches &= Q(title__icontains=term) | Q(description__icontains=term)
+    return list(AuctionListing.objects.filter(matches, is_active=True)
+                .with_feed_data().order_by('-created', 'id')[:per_page])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--queries', type=int, default=20, help='repetitions of each query')
+    parser.add_argument('--per-page', type=int, default=24)
+    args = parser.parse_args()
+
+    setup_django()
+    from auctions.models import Category, User
+    from auctions.utils import search_listings
+
+    results = {'rows': args.rows}
+    with test_database():
+        owner = User.objects.create_user(username='bench', password='bench')
+        categories = [Category.objects.create(name=name) for name in ('Electronics', 'Fashion', 'Collectibles')]
+        seed(owner, categories, args.rows)
+
+        for query in QUERIES:
+            results[query] = {
+                'fts': summarize(timed(lambda: list(search_listings(query, per_page=args.per_page)),
+                                       args.queries)),
+                'fts_category': summarize(timed(
+                    lambda: list(search_listings(query, 'Electronics', per_page=args.per_page)), args.queries)),
+                'icontains': summarize(timed(lambda: icontains_page(query, args.per_page), args.queries)),
+            }
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+Bid throughput of several processes writing to one SQLite file.
+
+    python -m benchmarks.bench_sqlite_writes [--processes N] [--bids N] [--listings N]
+
+Runs the same workload against two throwaway database files: one with
+SQLite's defaults (rollback journal, deferred transactions) and one with
+the OPTIONS from settings (WAL, synchronous=NORMAL, busy timeout, BEGIN
+IMMEDIATE). Every process reads a listing's price and outbids it, the way
+a user would, and the script reports bids/second and how attempts ended.
+"""
+import argparse
+import json
+import multiprocessing
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from .common import setup_django, summarize
+
+# sqlite3's own defaults: rollback journal, synchronous=FULL, deferred transactions
+DEFAULT_OPTIONS = {}
+
+
+def use_database(path, options):
+    """Point the default connection at path, with the given OPTIONS."""
+    from django.db import connection
+    connection.close()
+    connection.settings_dict['NAME'] = str(path)
+    connection.settings_dict['OPTIONS'] = dict(options)
+
+
+def prepare(path, options, processes, listings):
+    """Migrate a fresh database file and seed bidders and listings."""
+    from django.core.management import call_command
+    from django.db import connection
+    from auctions.models import AuctionListing, User
+
+    use_database(path, options)
+    call_command('migrate', verbosity=0, interactive=False)
+    owner = User.objects.create(username='bench-owner', password='!')
+    User.objects.bulk_create(User(username=f'bench-bidder-{i}', password='!') for i in range(processes))
+    AuctionListing.objects.bulk_create(
+        AuctionListing(owner=owner, title=f'Contended listing {i}', description='Benchmark listing',
+                       starting_price=1, current_price=1)
+        for i in range(listings))
+    connection.close()
+
+
+def worker(path, options, worker_id, bids, barrier, results):
+    setup_django()
+    from django.db import OperationalError, connection
+    from auctions.models import AuctionListing, User
+    from auctions.utils import BidResult, submit_bid
+
+    use_database(path, options)
+    bidder = User.objects.get(username=f'bench-bidder-{worker_id}')
+    listing_ids = list(AuctionListing.objects.values_list('pk', flat=True))
+    outcomes = {BidResult.ACCEPTED: 0, BidResult.REJECTED: 0, BidResult.CONFLICT: 0, 'error': 0}
+    samples = []
+
+    barrier.wait()
+    started = time.time()
+    for _ in range(bids):
+        listing_id = random.choice(listing_ids)
+        begin = time.perf_counter()
+        try:
+            price = AuctionListing.objects.values_list('current_price', flat=True).get(pk=listing_id)
+            outcomes[submit_bid(listing_id, bidder, price + 1).status] += 1
+        except OperationalError:
+            outcomes['error'] += 1
+        samples.append(time.perf_counter() - begin)
+    results.put({'started': started, 'finished': time.time(), 'outcomes': outcomes, 'samples': samples})
+    connection.close()
+
+
+def run(path, options, processes, bids):
+    """Let every process place its bids at once and aggregate what they report."""
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(processes)
+    results = context.Queue()
+    workers = [context.Process(target=worker, args=(path, options, i, bids, barrier, results))
+               for i in range(processes)]
+    for process in workers:
+        process.start()
+    reports = [results.get() for _ in workers]
+    for process in workers:
+        process.join()
+
+    elapsed = max(r['finished'] for r in reports) - min(r['started'] for r in reports)
+    outcomes = {key: sum(r['outcomes'][key] for r in reports) for key in reports[0]['outcomes']}
+    return {
+        'elapsed_s': round(elapsed, 3),
+        'accepted_bids_per_s': round(outcomes['accepted'] / elapsed, 1),
+        'attempts_per_s': round(processes * bids / elapsed, 1),
+        'outcomes': outcomes,
+        'attempt_latency': summarize([sample for r in reports for sample in r['samples']]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--processes', type=int, default=8)
+    parser.add_argument('--bids', type=int, default=200, help='bids per process')
+    parser.add_argument('--listings', type=int, default=4, help='fewer listings mean more contention')
+    args = parser.parse_args()
+
+    setup_django()
+    from django.conf import settings
+    from django.db import connection
+
+    if connection.vendor != 'sqlite':
+        parser.error('DATABASE_URL points at another database; this benchmark is for SQLite only')
+
+    profiles = {'defaults': DEFAULT_OPTIONS, 'tuned': settings.DATABASES['default'].get('OPTIONS', {})}
+    results = {'processes': args.processes, 'bids_per_process': args.bids, 'listings': args.listings}
+    with tempfile.TemporaryDirectory() as directory:
+        for name, options in profiles.items():
+            path = Path(directory) / f'{name}.sqlite3'
+            prepare(path, options, args.processes, args.listings)
+            results[name] = run(path, options, args.processes, args.bids)
+
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
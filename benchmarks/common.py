@@ -0,0 +1,77 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Every benchmark runs against a throwaway test database, never against
+db.sqlite3, and is started from the project root, e.g.
+
+    python -m benchmarks.bench_rate_limit
+"""
+import os
+import statistics
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django():
+    """Configure Django for a standalone script."""
+    if str(ROOT_DIR) not in sys.path:
+        sys.path.insert(0, str(ROOT_DIR))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'AuctionApp.settings')
+
+    import django
+    django.setup()
+
+
+@contextmanager
+def test_database(verbosity=0):
+    """Create a fresh, migrated test database and destroy it afterwards."""
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    # DEBUG would log every query, which skews both timings and memory
+    setup_test_environment(debug=False)
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity)
+        teardown_test_environment()
+
+
+def percentile(samples, pct):
+    """Return the pct-th percentile (0-100) of samples using linear interpolation."""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples):
+    """Summary statistics, in milliseconds, of durations measured in seconds."""
+    ms = [sample * 1000 for sample in samples]
+    return {
+        'count': len(ms),
+        'mean_ms': round(statistics.fmean(ms), 4) if ms else 0.0,
+        'p50_ms': round(percentile(ms, 50), 4),
+        'p95_ms': round(percentile(ms, 95), 4),
+        'p99_ms': round(percentile(ms, 99), 4),
+        'max_ms': round(max(ms), 4) if ms else 0.0,
+    }
+
+
+def timed(func, repeat):
+    """Call func repeat times and return the duration of each call in seconds."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
@@ -0,0 +1,109 @@
+"""
+Synthetic data generator shared by the benchmarks.
+
+Everything is created with bulk inserts and a fixed random seed, so two
+runs with the same arguments produce the same data set. Only call it
+inside benchmarks.common.test_database().
+"""
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+PASSWORD = 'bench-pass-123'
+
+WORDS = (
+    'vintage camera lens tripod guitar amplifier bicycle helmet watch leather jacket '
+    'wooden chair table lamp vinyl record novel comic poster painting canvas ceramic '
+    'vase silver ring necklace console controller keyboard monitor drone kayak tent'
+).split()
+
+CATEGORIES = ('Electronics', 'Fashion', 'Home & Garden', 'Sports & Outdoors',
+              'Books & Magazines', 'Collectibles & Antiques')
+
+
+def _text(rng, words):
+    return ' '.join(rng.choices(WORDS, k=words))
+
+
+def seed(users=50, listings=1000, bids=5000, comments=2000, watched=20, random_seed=42, batch_size=1000):
+    """
+    Populate the database with a reproducible marketplace.
+
+    Args:
+        users: Number of confirmed users, all with the password PASSWORD
+        listings: Number of active listings, owned round-robin by the users
+        bids: Number of bids; each one outbids the previous bid on its listing
+        comments: Number of comments spread over random listings
+        watched: Number of listings on each user's watchlist
+        random_seed: Seed of the generator
+        batch_size: Rows per bulk insert
+
+    Returns:
+        dict: Number of rows created per model and the usernames created
+    """
+    from django.contrib.auth.hashers import make_password
+    from django.utils import timezone
+    from auctions.models import AuctionListing, Bid, Category, Comment, User, Watchlist
+    from auctions.utils import reconcile_listing_bid_state
+
+    rng = random.Random(random_seed)
+    now = timezone.now()
+
+    # hashing once keeps seeding fast; every user shares the same password
+    password = make_password(PASSWORD)
+    User.objects.bulk_create([
+        User(username=f'bench{i}', email=f'bench{i}@example.com', password=password, email_confirmed=True)
+        for i in range(users)
+    ], batch_size=batch_size)
+    user_objs = list(User.objects.filter(username__startswith='bench').order_by('id'))
+
+    category_objs = [Category.objects.get_or_create(name=name)[0] for name in CATEGORIES]
+
+    listing_rows = []
+    for i in range(listings):
+        # bulk_create skips save(), which is what normally sets current_price
+        price = Decimal(rng.randint(5, 500))
+        listing_rows.append(AuctionListing(
+            owner=user_objs[i % users],
+            category=rng.choice(category_objs),
+            title=_text(rng, 3).capitalize(),
+            description=_text(rng, 30),
+            starting_price=price,
+            current_price=price,
+            ends_at=now + timedelta(days=rng.randint(1, 30)),
+        ))
+    AuctionListing.objects.bulk_create(listing_rows, batch_size=batch_size)
+    listing_objs = list(AuctionListing.objects.order_by('id').only('id', 'owner_id', 'starting_price'))
+
+    # every bid beats the previous one on its listing, as the bid engine would require
+    prices = {listing.pk: listing.starting_price for listing in listing_objs}
+    bid_rows = []
+    for _ in range(bids):
+        listing = rng.choice(listing_objs)
+        bidder = rng.choice(user_objs)
+        if bidder.pk == listing.owner_id:
+            bidder = user_objs[(user_objs.index(bidder) + 1) % users]
+        prices[listing.pk] += Decimal(rng.randint(100, 2500)) / 100
+        bid_rows.append(Bid(bidder=bidder, listing_id=listing.pk, amount=prices[listing.pk]))
+    Bid.objects.bulk_create(bid_rows, batch_size=batch_size)
+
+    Comment.objects.bulk_create([
+        Comment(creator=rng.choice(user_objs), listing=rng.choice(listing_objs), body=_text(rng, 12))
+        for _ in range(comments)
+    ], batch_size=batch_size)
+
+    Watchlist.objects.bulk_create([
+        Watchlist(user=user, listing=listing)
+        for user in user_objs
+        for listing in rng.sample(listing_objs, min(watched, len(listing_objs)))
+    ], batch_size=batch_size)
+
+    reconcile_listing_bid_state(batch_size=batch_size)
+    return {
+        'users': len(user_objs),
+        'listings': len(listing_objs),
+        'bids': len(bid_rows),
+        'comments': comments,
+        'watchlist': len(user_objs) * min(watched, len(listing_objs)),
+        'usernames': [user.username for user in user_objs],
+    }